@@ -19,6 +19,7 @@ from .models import (
     Receita,
     CategoriaReceita,
 )
+from .services import exportacao
 
 
 class ItemPedidoInline(admin.TabularInline):
@@ -93,9 +94,21 @@ class PedidoVendedorAdmin(admin.ModelAdmin):
         "valor_subtotal",
         "data_pedido",
     )
-    list_filter = ("status", "vendedor")
+    list_filter = ("status", "vendedor", "data_criacao")
+    date_hierarchy = "data_criacao"
     search_fields = ("vendedor__nome_negocio", "pedido_principal__numero_pedido")
     inlines = [ItemPedidoInline]
+    actions = ("exportar_csv", "exportar_ndjson")
+
+    # Exportam os sub-pedidos selecionados (ou todos os do filtro, com
+    # "selecionar todos") e seus itens, em streaming.
+    @admin.action(description="Exportar sub-pedidos e itens (CSV)")
+    def exportar_csv(self, request, queryset):
+        return exportacao.resposta(queryset, "csv")
+
+    @admin.action(description="Exportar sub-pedidos e itens (NDJSON)")
+    def exportar_ndjson(self, request, queryset):
+        return exportacao.resposta(queryset, "ndjson")
 
     @admin.display(
         description="Pedido Principal", ordering="pedido_principal__numero_pedido"
@@ -1,5 +1,11 @@
-from core.models import CategoriaProduto
+from decimal import Decimal
+
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject, new_method_proxy
+
+from core.services import categorias
+from core.services.carrinho import CHAVE_RESUMO, NOME_VERSAO_PRECOS, CarrinhoService
+from core.services.versoes import versao
 
 def global_settings(request):
     """
@@ -19,31 +25,52 @@ def jivo_context(request):
         "JIVO_SUPPORT": settings.JIVO_SUPPORT
     }
 
-def carrinho_context(request):
-    """
-    Adiciona informações do carrinho de compras no contexto de todos os templates.
-    """
+class _Preguicoso(SimpleLazyObject):
+    # A formatação de números do template (localize) usa format().
+    __format__ = new_method_proxy(format)
+
+
+def _resumo_carrinho(request):
+    guardado = request.session.get(CHAVE_RESUMO)
+    if guardado:
+        # Resumo de preços do carrinho (CarrinhoService.precos) já calculado;
+        # se algum preço mudou depois dele, é refeito (e guardado de novo).
+        if guardado.get("versao") != versao(NOME_VERSAO_PRECOS):
+            resumo = CarrinhoService.da_sessao(request).precos()
+            return {"total_itens": resumo.total_itens, "valor_total": resumo.total}
+        return {
+            "total_itens": guardado["total_itens"],
+            "valor_total": Decimal(guardado["total"]),
+        }
+
     carrinho = request.session.get("carrinho", {})
+    total_itens = 0
+    valor_total = Decimal("0.00")
+    for item in carrinho.values():
+        quantidade = item.get("quantidade", 0)
+        total_itens += quantidade
+        valor_total += Decimal(item.get("preco", 0)) * quantidade
+    return {"total_itens": total_itens, "valor_total": valor_total}
 
-    # Exemplo: total de itens
-    total_itens = sum(item.get("quantidade", 0) for item in carrinho.values())
 
-    # Exemplo: valor total
-    valor_total = sum(
-        float(item.get("quantidade", 0)) * float(item.get("preco", 0)) for item in carrinho.values()
-    )
+def carrinho_context(request):
+    """
+    Adiciona informações do carrinho de compras no contexto de todos os templates.
 
+    Os valores são preguiçosos: a sessão só é lida (e o resumo calculado,
+    uma vez) se o template usar alguma dessas variáveis.
+    """
+    resumo = SimpleLazyObject(lambda: _resumo_carrinho(request))
     return {
-        "carrinho": carrinho,
-        "total_itens": total_itens,
-        "valor_total": valor_total,
+        "carrinho": SimpleLazyObject(lambda: request.session.get("carrinho", {})),
+        "total_itens": _Preguicoso(lambda: resumo["total_itens"]),
+        "valor_total": _Preguicoso(lambda: resumo["valor_total"]),
     }
 
 def categorias_context(request):
     """
     Deixa as categorias disponíveis em todos os templates.
-    """
-    categorias = CategoriaProduto.objects.all()
-    return {"categorias": categorias}
-
 
+    Só consulta (o cache de ``core.services.categorias``) se o template usar.
+    """
+    return {"categorias": SimpleLazyObject(categorias.listar)}
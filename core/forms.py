@@ -35,7 +35,8 @@ class CadastroPacoteSurpresa(forms.ModelForm):
             "instrucoes_especiais",
             "preco",
             "imagem",
-            "quantidade_estoque"
+            "quantidade_estoque",
+            "venda_relampago",
         ]
         widgets = {
             "data_disponibilidade_inicio": forms.DateInput(
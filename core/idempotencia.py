@@ -0,0 +1,147 @@
+"""
+Chaves de idempotência para POSTs que gravam (checkout, pedido, cupom,
+carrinho).
+
+O cliente manda ``Idempotency-Key: <valor único>`` (ou, em formulários
+HTML, o campo ``idempotency_key``). A primeira requisição com a chave
+roda normalmente e a resposta fica no cache por ``TIMEOUT``; repetições
+com a mesma chave e o mesmo corpo recebem a resposta guardada sem
+executar a view nem tocar no banco. Isso cobre o duplo clique em
+"Finalizar" e o app que reenvia o POST depois de um timeout.
+
+* mesma chave com outro corpo: 422;
+* mesma chave enquanto a primeira ainda está rodando: 409;
+* resposta 5xx ou exceção: a chave é liberada para uma nova tentativa.
+
+A chave vale por usuário (ou sessão), para um cliente não reaproveitar
+a resposta de outro. Sem chave nada muda.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from rest_framework.response import Response
+
+CABECALHO = "Idempotency-Key"
+CAMPO_FORMULARIO = "idempotency_key"
+TIMEOUT = 24 * 60 * 60
+# Quanto tempo a primeira requisição segura a chave enquanto roda.
+TIMEOUT_EM_ANDAMENTO = 60
+TAMANHO_MAXIMO = 255
+# Cabeçalhos que precisam voltar na repetição.
+CABECALHOS_GUARDADOS = ("Content-Type", "Location")
+
+FORMULARIOS = ("application/x-www-form-urlencoded", "multipart/form-data")
+
+
+def _chave_informada(request):
+    chave = request.headers.get(CABECALHO)
+    if not chave and request.content_type in FORMULARIOS:
+        chave = request.POST.get(CAMPO_FORMULARIO)
+    return (chave or "").strip()[:TAMANHO_MAXIMO]
+
+
+def _escopo(request):
+    """Dono da chave; ``None`` para visitante ainda sem sessão."""
+    if request.user.is_authenticated:
+        return f"u{request.user.pk}"
+    if request.session.session_key:
+        return f"s{request.session.session_key}"
+    return None
+
+
+def _chave_cache(escopo, request, chave):
+    bruto = f"{escopo}:{request.path}:{chave}".encode()
+    return f"idempotencia:{hashlib.sha256(bruto).hexdigest()}"
+
+
+def _impressao(request):
+    """Impressão digital do corpo: a chave não pode ser reusada com outro conteúdo."""
+    if request.content_type in FORMULARIOS:
+        # Formulário já lido; o token CSRF muda entre abas sem mudar o pedido.
+        dados = request.POST.copy()
+        dados.pop("csrfmiddlewaretoken", None)
+        corpo = dados.urlencode().encode()
+    else:
+        corpo = request.body
+    return hashlib.sha256(request.method.encode() + b"\0" + corpo).hexdigest()
+
+
+def _guardar(resposta):
+    if isinstance(resposta, Response):
+        # Ainda não renderizada (o DRF negocia o formato depois): guarda os dados.
+        return {"status": resposta.status_code, "dados": resposta.data}
+    return {
+        "status": resposta.status_code,
+        "conteudo": resposta.content,
+        "cabecalhos": {
+            nome: resposta[nome]
+            for nome in CABECALHOS_GUARDADOS
+            if resposta.has_header(nome)
+        },
+    }
+
+
+def _repetir(guardada):
+    if "dados" in guardada:
+        resposta = Response(guardada["dados"], status=guardada["status"])
+    else:
+        resposta = HttpResponse(guardada["conteudo"], status=guardada["status"])
+        for nome, valor in guardada["cabecalhos"].items():
+            resposta[nome] = valor
+    resposta["Idempotent-Replayed"] = "true"
+    return resposta
+
+
+def idempotente(view):
+    """
+    Decorator para views de função; em métodos de viewset use
+    ``method_decorator(idempotente)``. Deve ficar por fora do
+    ``transaction.atomic`` da view, para só guardar respostas já
+    confirmadas no banco.
+    """
+
+    @wraps(view)
+    def envoltorio(request, *args, **kwargs):
+        chave = _chave_informada(request)
+        escopo = _escopo(request)
+        if not chave or escopo is None:
+            return view(request, *args, **kwargs)
+
+        chave_cache = _chave_cache(escopo, request, chave)
+        impressao = _impressao(request)
+        guardada = cache.get(chave_cache)
+        # Sem "resposta" a chave está em andamento.
+        if guardada is None and cache.add(
+            chave_cache, {"impressao": impressao}, TIMEOUT_EM_ANDAMENTO
+        ):
+            try:
+                resposta = view(request, *args, **kwargs)
+            except Exception:
+                cache.delete(chave_cache)
+                raise
+            if resposta.status_code >= 500:
+                cache.delete(chave_cache)
+            else:
+                cache.set(
+                    chave_cache,
+                    {"impressao": impressao, "resposta": _guardar(resposta)},
+                    TIMEOUT,
+                )
+            return resposta
+
+        # Perdeu a corrida do add(): a outra requisição acabou de começar.
+        guardada = guardada or cache.get(chave_cache) or {"impressao": impressao}
+        if guardada["impressao"] != impressao:
+            return JsonResponse(
+                {"error": f"{CABECALHO} já usada com outro conteúdo."}, status=422
+            )
+        if "resposta" not in guardada:
+            return JsonResponse(
+                {"error": "Requisição com esta chave ainda em andamento."}, status=409
+            )
+        return _repetir(guardada["resposta"])
+
+    return envoltorio
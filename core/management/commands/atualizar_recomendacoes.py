@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from core.services import recomendacoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Atualiza as recomendações \"quem comprou também levou\" com os "
+        "pedidos feitos desde a última execução."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--do-zero",
+            action="store_true",
+            help=(
+                "Apaga a matriz de compras em conjunto e relê todo o histórico "
+                "(necessário para descontar sub-pedidos cancelados depois de lidos)."
+            ),
+        )
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=recomendacoes.TOP_K,
+            help="Quantos vizinhos guardar por produto.",
+        )
+
+    def handle(self, *args, **options):
+        processamento = recomendacoes.atualizar(
+            do_zero=options["do_zero"], top_k=options["top_k"]
+        )
+        if processamento is None:
+            self.stdout.write("Nenhum pedido novo desde a última execução.")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{processamento.pedidos_processados} pedido(s) processado(s); "
+                f"{processamento.produtos_atualizados} produto(s) atualizado(s)."
+            )
+        )
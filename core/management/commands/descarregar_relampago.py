@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.services import venda_relampago
+
+
+class Command(BaseCommand):
+    help = (
+        "Grava no estoque dos pacotes as vendas relâmpago acumuladas no "
+        "cache. Pensado para rodar periodicamente (cron)."
+    )
+
+    def handle(self, *args, **options):
+        atualizados = venda_relampago.descarregar()
+        if atualizados is None:
+            self.stdout.write(
+                self.style.WARNING("Outra descarga ou reconciliação já está em andamento.")
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"{atualizados} pacote(s) atualizado(s).")
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.services import visualizacoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Grava no banco as visualizações de produtos acumuladas no cache. "
+        "Pensado para rodar periodicamente (cron)."
+    )
+
+    def handle(self, *args, **options):
+        atualizados = visualizacoes.descarregar()
+        if atualizados is None:
+            self.stdout.write(
+                self.style.WARNING("Outra descarga já está em andamento.")
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"{atualizados} produto(s) atualizado(s).")
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.services import reservas
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga as reservas de estoque vencidas. Elas já não contam no "
+        "estoque; isto só mantém a tabela pequena (cron)."
+    )
+
+    def handle(self, *args, **options):
+        apagadas = reservas.limpar_vencidas()
+        self.stdout.write(self.style.SUCCESS(f"{apagadas} reserva(s) apagada(s)."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.services import relacionados
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula a tabela de produtos relacionados a partir de compras em "
+        "conjunto, categoria, vendedor e popularidade."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=relacionados.TOP_K,
+            help="Quantos relacionados guardar por produto.",
+        )
+
+    def handle(self, *args, **options):
+        total = relacionados.recalcular(options["top_k"])
+        self.stdout.write(self.style.SUCCESS(f"{total} relação(ões) gravada(s)."))
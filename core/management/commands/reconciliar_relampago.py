@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.services import venda_relampago
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere o saldo das vendas relâmpago no cache contra o estoque do "
+        "banco e corrige as diferenças (cron, depois de descarregar_relampago)."
+    )
+
+    def handle(self, *args, **options):
+        ajustes = venda_relampago.reconciliar()
+        if ajustes is None:
+            self.stdout.write(
+                self.style.WARNING("Outra descarga ou reconciliação já está em andamento.")
+            )
+            return
+        for pacote_id, ajuste in sorted(ajustes.items()):
+            self.stdout.write(f"Pacote {pacote_id}: saldo ajustado em {ajuste:+d}.")
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(ajustes)} pacote(s) com diferença corrigida.")
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import avaliacoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara os agregados de avaliações com uma agregação ao vivo e "
+        "regrava agregados e médias dos vendedores do zero."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Apenas verifica; não reconstrói. Sai com erro se houver divergência.",
+        )
+
+    def handle(self, *args, **options):
+        divergentes = avaliacoes.divergencias()
+        for (content_type_id, object_id), (armazenado, ao_vivo) in sorted(
+            divergentes.items()
+        ):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{content_type_id}/{object_id}: "
+                    f"armazenado={armazenado} ao_vivo={ao_vivo}"
+                )
+            )
+
+        if options["verificar"]:
+            if divergentes:
+                raise CommandError(f"{len(divergentes)} agregado(s) divergente(s).")
+            self.stdout.write(self.style.SUCCESS("Agregados de avaliações conferem."))
+            return
+
+        total = avaliacoes.reconstruir()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} objeto(s) avaliado(s) regravado(s); "
+                f"{len(divergentes)} estavam divergentes."
+            )
+        )
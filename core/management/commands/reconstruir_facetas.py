@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import facetas
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara as contagens de facetas da vitrine com uma agregação ao vivo "
+        "e reconstrói a tabela do zero."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Apenas verifica; não reconstrói. Sai com erro se houver divergência.",
+        )
+
+    def handle(self, *args, **options):
+        divergentes = facetas.divergencias()
+        for (tipo, dimensao, valor), (armazenado, ao_vivo) in sorted(
+            divergentes.items()
+        ):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{tipo}/{dimensao}={valor or '-'}: "
+                    f"armazenado={armazenado} ao_vivo={ao_vivo}"
+                )
+            )
+
+        if options["verificar"]:
+            if divergentes:
+                raise CommandError(f"{len(divergentes)} faceta(s) divergente(s).")
+            self.stdout.write(self.style.SUCCESS("Contagens de facetas conferem."))
+            return
+
+        total = facetas.reconstruir()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} faceta(s) regravada(s); "
+                f"{len(divergentes)} estavam divergentes."
+            )
+        )
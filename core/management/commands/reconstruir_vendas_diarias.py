@@ -0,0 +1,49 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import vendas_diarias
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara as vendas diárias dos vendedores com uma agregação ao vivo "
+        "dos sub-pedidos e regrava as linhas do zero (ou a partir de --desde)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde",
+            type=datetime.date.fromisoformat,
+            help="Primeiro dia (AAAA-MM-DD) a conferir e regravar; padrão: todos.",
+        )
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Apenas verifica; não reconstrói. Sai com erro se houver divergência.",
+        )
+
+    def handle(self, *args, **options):
+        desde = options["desde"]
+        divergentes = vendas_diarias.divergencias(desde)
+        for (vendedor_id, dia), (armazenado, ao_vivo) in sorted(divergentes.items()):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"vendedor {vendedor_id} em {dia}: "
+                    f"armazenado={armazenado} ao_vivo={ao_vivo}"
+                )
+            )
+
+        if options["verificar"]:
+            if divergentes:
+                raise CommandError(f"{len(divergentes)} dia(s) divergente(s).")
+            self.stdout.write(self.style.SUCCESS("Vendas diárias conferem."))
+            return
+
+        total = vendas_diarias.reconstruir(desde=desde)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} dia(s) de venda regravado(s); "
+                f"{len(divergentes)} estavam divergentes."
+            )
+        )
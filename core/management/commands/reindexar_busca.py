@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.services import trigramas
+from core.services.busca import obter_backend, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói do zero o índice full-text de produtos e pacotes surpresa "
+        "e os trigramas da busca aproximada."
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for tipo, total in trigramas.reconstruir().items():
+            self.stdout.write(
+                self.style.SUCCESS(f"Trigramas: {total} {tipo}(s) indexado(s).")
+            )
+
+        backend = obter_backend()
+        if not backend.suporta_indice:
+            self.stdout.write(
+                self.style.WARNING(
+                    "O banco atual não tem índice full-text; a busca usa icontains."
+                )
+            )
+            return
+
+        totais = reconstruir_indice()
+        for tipo, total in totais.items():
+            self.stdout.write(self.style.SUCCESS(f"{total} {tipo}(s) indexado(s)."))
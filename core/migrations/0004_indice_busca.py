@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# Cópia congelada do esquema de ``core.services.busca`` no momento desta
+# migração: mudanças futuras no serviço não podem alterar o que ela cria.
+TABELAS = ("core_produto_busca", "core_pacotesurpresa_busca")
+COLUNAS = "nome, descricao, categoria, vendedor"
+
+CRIAR = {
+    "sqlite": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {tabela} USING fts5("
+        f"{COLUNAS}, tokenize='unicode61 remove_diacritics 2')"
+    ),
+    "mysql": (
+        "CREATE TABLE IF NOT EXISTS {tabela} ("
+        "id BIGINT NOT NULL PRIMARY KEY, "
+        "nome VARCHAR(255) NOT NULL DEFAULT '', "
+        "descricao LONGTEXT NOT NULL, "
+        "categoria VARCHAR(255) NOT NULL DEFAULT '', "
+        "vendedor VARCHAR(255) NOT NULL DEFAULT '', "
+        "FULLTEXT KEY {tabela}_nome_ft (nome), "
+        f"FULLTEXT KEY {{tabela}}_ft ({COLUNAS})"
+        ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 "
+        "COLLATE=utf8mb4_unicode_ci"
+    ),
+}
+INSERIR = {
+    "sqlite": f"INSERT INTO {{tabela}} (rowid, {COLUNAS}) VALUES (%s, %s, %s, %s, %s)",
+    "mysql": f"INSERT INTO {{tabela}} (id, {COLUNAS}) VALUES (%s, %s, %s, %s, %s)",
+}
+
+
+def criar_indice(apps, schema_editor):
+    # Outros bancos ficam sem índice (a busca cai no ``icontains``).
+    vendor = schema_editor.connection.vendor
+    if vendor not in CRIAR:
+        return
+
+    Produto = apps.get_model("core", "Produto")
+    PacoteSurpresa = apps.get_model("core", "PacoteSurpresa")
+    documentos = {
+        "core_produto_busca": Produto.objects.values_list(
+            "pk", "nome", "descricao", "categoria__nome", "vendedor__nome_negocio"
+        ),
+        "core_pacotesurpresa_busca": PacoteSurpresa.objects.values_list(
+            "pk", "nome", "descricao", "tipo_conteudo", "vendedor__nome_negocio"
+        ),
+    }
+    with schema_editor.connection.cursor() as cursor:
+        for tabela in TABELAS:
+            cursor.execute(CRIAR[vendor].format(tabela=tabela))
+            linhas = [
+                (pk, *(valor or "" for valor in valores))
+                for pk, *valores in documentos[tabela]
+            ]
+            if linhas:
+                cursor.executemany(INSERIR[vendor].format(tabela=tabela), linhas)
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor not in CRIAR:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for tabela in TABELAS:
+            cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_alter_perfil_cnpj"),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:25
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, CharField, Count, F, Value, When
+
+# Cópia congelada de ``core.services.facetas`` no momento desta migração.
+FAIXAS_PRECO = (
+    ("0-10", Decimal("0"), Decimal("10")),
+    ("10-25", Decimal("10"), Decimal("25")),
+    ("25-50", Decimal("25"), Decimal("50")),
+    ("50-100", Decimal("50"), Decimal("100")),
+    ("100+", Decimal("100"), None),
+)
+DIMENSOES = {
+    "Produto": {
+        "categoria": "categoria_id",
+        "vendedor": "vendedor_id",
+        "motivo": "motivo_desconto",
+    },
+    "PacoteSurpresa": {"vendedor": "vendedor_id"},
+}
+TIPOS = {"Produto": "produto", "PacoteSurpresa": "pacote"}
+
+
+def _expressao_faixa():
+    casos = []
+    for rotulo, minimo, maximo in FAIXAS_PRECO:
+        filtro = {"preco__gte": minimo}
+        if maximo is not None:
+            filtro["preco__lt"] = maximo
+        casos.append(When(**filtro, then=Value(rotulo)))
+    return Case(*casos, default=Value(""), output_field=CharField())
+
+
+def popular_facetas(apps, schema_editor):
+    """
+    Carga inicial das contagens a partir dos itens disponíveis (o comando
+    ``reconstruir_facetas`` continua sendo o caminho para refazer).
+    """
+    ContagemFaceta = apps.get_model("core", "ContagemFaceta")
+
+    totais = {}
+    for modelo, dimensoes in DIMENSOES.items():
+        disponiveis = apps.get_model("core", modelo).objects.filter(
+            ativo=True, quantidade_estoque__gt=0
+        ).order_by()
+        expressoes = {dimensao: F(campo) for dimensao, campo in dimensoes.items()}
+        expressoes["faixa_preco"] = _expressao_faixa()
+        for dimensao, expressao in expressoes.items():
+            for valor, total in (
+                disponiveis.annotate(chave=expressao)
+                .values_list("chave")
+                .annotate(n=Count("pk"))
+            ):
+                chave = (TIPOS[modelo], dimensao, "" if valor is None else str(valor))
+                totais[chave] = totais.get(chave, 0) + total
+    ContagemFaceta.objects.bulk_create(
+        ContagemFaceta(tipo=tipo, dimensao=dimensao, valor=valor, total=total)
+        for (tipo, dimensao, valor), total in totais.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_indice_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContagemFaceta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('produto', 'Produto'), ('pacote', 'Pacote Surpresa')], max_length=10)),
+                ('dimensao', models.CharField(choices=[('categoria', 'Categoria'), ('vendedor', 'Vendedor'), ('motivo', 'Motivo do Desconto'), ('faixa_preco', 'Faixa de Preço')], max_length=20)),
+                ('valor', models.CharField(blank=True, help_text='Id ou código do valor da faceta.', max_length=50)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contagem de Faceta',
+                'verbose_name_plural': 'Contagens de Facetas',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'dimensao', 'valor'), name='unique_contagem_faceta')],
+            },
+        ),
+        migrations.RunPython(popular_facetas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:32
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópia congelada de ``core.services.trigramas`` no momento desta migração.
+MODELOS = {
+    "produto": "Produto",
+    "pacote": "PacoteSurpresa",
+    "receita": "Receita",
+}
+
+
+def _trigramas(texto):
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    normalizado = "".join(c for c in decomposto if not unicodedata.combining(c)).lower()
+    conjunto = set()
+    for palavra in re.findall(r"\w+", normalizado):
+        preenchida = f"  {palavra} "
+        conjunto.update(preenchida[i : i + 3] for i in range(len(preenchida) - 2))
+    return conjunto
+
+
+def popular_trigramas(apps, schema_editor):
+    """
+    Carga inicial dos trigramas de todos os nomes (o comando
+    ``reindexar_busca`` continua sendo o caminho para refazer).
+    """
+    TrigramaBusca = apps.get_model("core", "TrigramaBusca")
+
+    for tipo, modelo in MODELOS.items():
+        lote = []
+        for pk, nome in apps.get_model("core", modelo).objects.values_list(
+            "pk", "nome"
+        ).iterator():
+            conjunto = _trigramas(nome)
+            lote.extend(
+                TrigramaBusca(
+                    tipo=tipo,
+                    objeto_id=pk,
+                    trigrama=trigrama,
+                    total_trigramas=len(conjunto),
+                )
+                for trigrama in sorted(conjunto)
+            )
+            if len(lote) >= 5000:
+                TrigramaBusca.objects.bulk_create(lote)
+                lote = []
+        TrigramaBusca.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_contagem_faceta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrigramaBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('produto', 'Produto'), ('pacote', 'Pacote Surpresa'), ('receita', 'Receita')], max_length=10)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('trigrama', models.CharField(max_length=3)),
+                ('total_trigramas', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Trigrama de Busca',
+                'verbose_name_plural': 'Trigramas de Busca',
+                'indexes': [models.Index(fields=['tipo', 'objeto_id'], name='trigrama_objeto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'trigrama', 'objeto_id'), name='unique_trigrama_busca')],
+            },
+        ),
+        migrations.RunPython(popular_trigramas, migrations.RunPython.noop),
+    ]
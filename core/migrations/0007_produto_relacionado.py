@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_trigrama_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProdutoRelacionado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pontuacao', models.FloatField()),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionados', to='core.produto')),
+                ('relacionado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.produto')),
+            ],
+            options={
+                'verbose_name': 'Produto Relacionado',
+                'verbose_name_plural': 'Produtos Relacionados',
+                'ordering': ['-pontuacao'],
+                'indexes': [models.Index(fields=['produto', '-pontuacao'], name='relacionado_produto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('produto', 'relacionado'), name='unique_produto_relacionado')],
+            },
+        ),
+    ]
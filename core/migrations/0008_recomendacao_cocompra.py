@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_produto_relacionado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessamentoCoCompra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_pedido_id', models.PositiveBigIntegerField()),
+                ('pedidos_processados', models.PositiveIntegerField(default=0)),
+                ('produtos_atualizados', models.PositiveIntegerField(default=0)),
+                ('data_execucao', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Processamento de Compras em Conjunto',
+                'verbose_name_plural': 'Processamentos de Compras em Conjunto',
+                'ordering': ['-ultimo_pedido_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecomendacaoCoCompra',
+            fields=[
+                ('produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recomendacao_cocompra', serialize=False, to='core.produto')),
+                ('vizinhos', models.JSONField(default=list)),
+                ('data_atualizacao', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Recomendação por Compra em Conjunto',
+                'verbose_name_plural': 'Recomendações por Compra em Conjunto',
+            },
+        ),
+        migrations.CreateModel(
+            name='CoCompra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('outro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.produto')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.produto')),
+            ],
+            options={
+                'verbose_name': 'Compra em Conjunto',
+                'verbose_name_plural': 'Compras em Conjunto',
+                'constraints': [models.UniqueConstraint(fields=('produto', 'outro'), name='unique_cocompra')],
+            },
+        ),
+    ]
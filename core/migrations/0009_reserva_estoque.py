@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recomendacao_cocompra'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dono', models.CharField(db_index=True, max_length=64)),
+                ('quantidade', models.PositiveIntegerField()),
+                ('expira_em', models.DateTimeField()),
+                ('pacote', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='core.pacotesurpresa')),
+                ('produto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='core.produto')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Estoque',
+                'verbose_name_plural': 'Reservas de Estoque',
+                'indexes': [models.Index(fields=['produto', 'expira_em'], name='reserva_produto_idx'), models.Index(fields=['pacote', 'expira_em'], name='reserva_pacote_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dono', 'produto'), name='unique_reserva_produto'), models.UniqueConstraint(fields=('dono', 'pacote'), name='unique_reserva_pacote')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_reserva_estoque'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pacotesurpresa',
+            name='venda_relampago',
+            field=models.BooleanField(default=False, help_text='Saldo controlado no cache durante a venda (ver core.services.venda_relampago).'),
+        ),
+    ]
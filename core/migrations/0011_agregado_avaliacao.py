@@ -0,0 +1,117 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:23
+
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+NOTAS = range(1, 6)
+
+
+def popular_agregados(apps, schema_editor):
+    """
+    Carga inicial dos agregados e da reputação dos vendedores, com a
+    lógica de ``avaliacoes.reconstruir`` congelada aqui (o comando
+    ``reconstruir_avaliacoes`` continua sendo o caminho para refazer).
+    """
+    Avaliacao = apps.get_model("core", "Avaliacao")
+    AgregadoAvaliacao = apps.get_model("core", "AgregadoAvaliacao")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Perfil = apps.get_model("core", "Perfil")
+
+    contagens = {f"nota_{nota}": Count("pk", filter=Q(nota=nota)) for nota in NOTAS}
+    agregados = {
+        (linha.pop("content_type_id"), linha.pop("object_id")): linha
+        for linha in Avaliacao.objects.order_by()
+        .values("content_type_id", "object_id")
+        .annotate(total=Count("pk"), soma=Sum("nota"), **contagens)
+    }
+    AgregadoAvaliacao.objects.bulk_create(
+        AgregadoAvaliacao(content_type_id=content_type_id, object_id=object_id, **campos)
+        for (content_type_id, object_id), campos in agregados.items()
+    )
+
+    # Vendedor de cada alvo: o dono de produtos e pacotes, o próprio
+    # perfil quando avaliado direto; receitas ficam de fora.
+    por_tipo = defaultdict(set)
+    for content_type_id, object_id in agregados:
+        por_tipo[content_type_id].add(object_id)
+    vendedores = {}
+    for tipo in ContentType.objects.filter(pk__in=list(por_tipo)):
+        try:
+            modelo = apps.get_model(tipo.app_label, tipo.model)
+        except LookupError:
+            continue
+        ids = por_tipo[tipo.pk]
+        if modelo is Perfil:
+            vendedores.update(((tipo.pk, pk), pk) for pk in ids)
+        elif any(campo.name == "vendedor" for campo in modelo._meta.concrete_fields):
+            vendedores.update(
+                ((tipo.pk, pk), vendedor_id)
+                for pk, vendedor_id in modelo._default_manager.filter(
+                    pk__in=ids
+                ).values_list("pk", "vendedor_id")
+            )
+
+    por_vendedor = defaultdict(lambda: [0, 0])
+    for alvo, campos in agregados.items():
+        vendedor_id = vendedores.get(alvo)
+        if vendedor_id:
+            por_vendedor[vendedor_id][0] += campos["total"]
+            por_vendedor[vendedor_id][1] += campos["soma"]
+
+    Perfil.objects.exclude(pk__in=list(por_vendedor)).update(
+        avaliacao_media=Decimal("0.00"), total_avaliacoes=0, soma_avaliacoes=0
+    )
+    perfis = list(Perfil.objects.filter(pk__in=list(por_vendedor)).only("pk"))
+    for perfil in perfis:
+        total, soma = por_vendedor[perfil.pk]
+        perfil.total_avaliacoes = total
+        perfil.soma_avaliacoes = soma
+        perfil.avaliacao_media = (Decimal(soma) / total).quantize(
+            Decimal("0.01"), ROUND_HALF_UP
+        )
+    Perfil.objects.bulk_update(
+        perfis,
+        ["total_avaliacoes", "soma_avaliacoes", "avaliacao_media"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0010_pacote_venda_relampago'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfil',
+            name='soma_avaliacoes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='AgregadoAvaliacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('total', models.IntegerField(default=0)),
+                ('soma', models.IntegerField(default=0)),
+                ('nota_1', models.IntegerField(default=0)),
+                ('nota_2', models.IntegerField(default=0)),
+                ('nota_3', models.IntegerField(default=0)),
+                ('nota_4', models.IntegerField(default=0)),
+                ('nota_5', models.IntegerField(default=0)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Agregado de Avaliações',
+                'verbose_name_plural': 'Agregados de Avaliações',
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id'), name='unique_agregado_avaliacao')],
+            },
+        ),
+        migrations.RunPython(popular_agregados, migrations.RunPython.noop),
+    ]
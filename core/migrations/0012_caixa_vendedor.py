@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_agregado_avaliacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedidovendedor',
+            index=models.Index(fields=['vendedor', 'status', '-data_criacao'], name='pedvend_caixa_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedidovendedor',
+            index=models.Index(fields=['vendedor', '-data_criacao'], name='pedvend_caixa_idx'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:35
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+CANCELADO = "CANCELADO"
+
+
+def popular_vendas_diarias(apps, schema_editor):
+    """
+    Carga inicial a partir dos sub-pedidos, com a lógica de
+    ``vendas_diarias.reconstruir`` congelada aqui (o comando
+    ``reconstruir_vendas_diarias`` continua sendo o caminho para refazer).
+    """
+    PedidoVendedor = apps.get_model("core", "PedidoVendedor")
+    ItemPedido = apps.get_model("core", "ItemPedido")
+    VendaDiariaVendedor = apps.get_model("core", "VendaDiariaVendedor")
+    fuso = timezone.get_current_timezone()
+
+    vendas = {}
+    for vendedor_id, dia, pedidos, cancelados, receita in (
+        PedidoVendedor.objects.order_by()
+        .annotate(dia=TruncDate("data_criacao", tzinfo=fuso))
+        .values("vendedor_id", "dia")
+        .annotate(
+            pedidos=Count("pk"),
+            cancelados=Count("pk", filter=Q(status=CANCELADO)),
+            receita=Sum("valor_subtotal", filter=~Q(status=CANCELADO)),
+        )
+        .values_list("vendedor_id", "dia", "pedidos", "cancelados", "receita")
+    ):
+        vendas[(vendedor_id, dia)] = {
+            "pedidos": pedidos,
+            "cancelados": cancelados,
+            "itens": 0,
+            "receita": receita or Decimal("0.00"),
+        }
+    for vendedor_id, dia, quantidade in (
+        ItemPedido.objects.order_by()
+        .exclude(sub_pedido__status=CANCELADO)
+        .annotate(dia=TruncDate("sub_pedido__data_criacao", tzinfo=fuso))
+        .values("sub_pedido__vendedor_id", "dia")
+        .annotate(quantidade=Sum("quantidade"))
+        .values_list("sub_pedido__vendedor_id", "dia", "quantidade")
+    ):
+        vendas[(vendedor_id, dia)]["itens"] = quantidade
+
+    VendaDiariaVendedor.objects.bulk_create(
+        (
+            VendaDiariaVendedor(vendedor_id=vendedor_id, dia=dia, **campos)
+            for (vendedor_id, dia), campos in vendas.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_caixa_vendedor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendaDiariaVendedor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('pedidos', models.IntegerField(default=0)),
+                ('cancelados', models.IntegerField(default=0)),
+                ('itens', models.IntegerField(default=0)),
+                ('receita', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendas_diarias', to='core.perfil')),
+            ],
+            options={
+                'verbose_name': 'Venda Diária do Vendedor',
+                'verbose_name_plural': 'Vendas Diárias dos Vendedores',
+                'ordering': ['-dia'],
+                'constraints': [models.UniqueConstraint(fields=('vendedor', 'dia'), name='unique_venda_diaria_vendedor')],
+            },
+        ),
+        migrations.RunPython(popular_vendas_diarias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Mesmo valor de ``recomendacoes.JANELA_PEDIDOS`` nesta migração.
+JANELA_PEDIDOS = 1000
+
+
+def marcar_janela_processada(apps, schema_editor):
+    """
+    Os pedidos da janela até a última marca já foram somados pela marca
+    antiga: entram no conjunto para não serem somados de novo.
+    """
+    Pedido = apps.get_model("core", "Pedido")
+    PedidoCoCompra = apps.get_model("core", "PedidoCoCompra")
+    ProcessamentoCoCompra = apps.get_model("core", "ProcessamentoCoCompra")
+
+    anterior = ProcessamentoCoCompra.objects.order_by("-ultimo_pedido_id").first()
+    if anterior is None:
+        return
+    marca = anterior.ultimo_pedido_id
+    PedidoCoCompra.objects.bulk_create(
+        (
+            PedidoCoCompra(pedido_id=pedido_id)
+            for pedido_id in Pedido.objects.filter(
+                pk__gt=marca - JANELA_PEDIDOS, pk__lte=marca
+            ).values_list("pk", flat=True)
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_venda_diaria_vendedor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoCoCompra',
+            fields=[
+                ('pedido', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='core.pedido')),
+            ],
+            options={
+                'verbose_name': 'Pedido Processado em Compras em Conjunto',
+                'verbose_name_plural': 'Pedidos Processados em Compras em Conjunto',
+            },
+        ),
+        migrations.RunPython(marcar_janela_processada, migrations.RunPython.noop),
+    ]
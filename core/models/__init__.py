@@ -1,8 +1,10 @@
+from .agregado_avaliacao import *
 from .avaliacao import *
 from .cupom import *
 from .dicas_sustentaveis import *
 from .doacoes import *
 from .equipe import *
+from .faceta import *
 from .fale_conosco import *
 from .item_pedido import *
 from .notificacao import *
@@ -10,5 +12,10 @@ from .pedido import *
 from .pedido_vendedor import *
 from .perfil import *
 from .produto import *
+from .produto_relacionado import *
 from .receita import *
-from .time_stamp import *
\ No newline at end of file
+from .recomendacao import *
+from .reserva import *
+from .time_stamp import *
+from .trigrama import *
+from .venda_diaria import *
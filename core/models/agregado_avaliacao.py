@@ -0,0 +1,53 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class AgregadoAvaliacao(models.Model):
+    """
+    Resumo das avaliações de um objeto (produto, receita, perfil...):
+    quantidade, soma das notas e quantas avaliações de cada nota.
+
+    Mantido incrementalmente pelos signals de Avaliacao (ver
+    ``core.services.avaliacoes``) e reconstruído pelo comando
+    ``reconstruir_avaliacoes``. Objeto sem linha = sem avaliações.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey("content_type", "object_id")
+
+    total = models.IntegerField(default=0)
+    soma = models.IntegerField(default=0)
+    nota_1 = models.IntegerField(default=0)
+    nota_2 = models.IntegerField(default=0)
+    nota_3 = models.IntegerField(default=0)
+    nota_4 = models.IntegerField(default=0)
+    nota_5 = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Agregado de Avaliações"
+        verbose_name_plural = "Agregados de Avaliações"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id"], name="unique_agregado_avaliacao"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.content_type_id}/{self.object_id}: {self.media} ({self.total})"
+
+    @property
+    def media(self):
+        if not self.total:
+            return Decimal("0.00")
+        return (Decimal(self.soma) / self.total).quantize(
+            Decimal("0.01"), ROUND_HALF_UP
+        )
+
+    @property
+    def histograma(self):
+        """``{nota: quantidade}``, da nota 5 para a 1 (ordem de exibição)."""
+        return {nota: getattr(self, f"nota_{nota}") for nota in range(5, 0, -1)}
@@ -3,8 +3,56 @@ from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
 from .time_stamp import TimeStampedModel
 
+
+class AvaliacaoManager(models.Manager):
+    """Manager customizado para o modelo Avaliacao"""
+
+    def com_alvos(self):
+        """
+        Avaliações prontas para listagem: autor e tipo no mesmo SELECT e os
+        objetos avaliados buscados em lote, uma consulta por modelo (não
+        uma por avaliação). ``__str__`` e os templates não vão mais ao banco.
+        """
+        from core.models import PacoteSurpresa, Perfil, Produto, Receita
+
+        return self.select_related("autor", "content_type").prefetch_related(
+            GenericPrefetch(
+                "content_object",
+                [
+                    Produto.objects.select_related("vendedor__usuario"),
+                    PacoteSurpresa.objects.select_related("vendedor__usuario"),
+                    Perfil.objects.select_related("usuario"),
+                    Receita.objects.all(),
+                ],
+            )
+        )
+
+    def do_vendedor(self, perfil):
+        """
+        Avaliações que entram na média do vendedor: dos seus produtos e
+        pacotes e as feitas direto no perfil.
+        """
+        from core.models import PacoteSurpresa, Perfil, Produto
+
+        tipos = ContentType.objects.get_for_models(Produto, PacoteSurpresa, Perfil)
+        return self.com_alvos().filter(
+            models.Q(
+                content_type=tipos[Produto],
+                object_id__in=Produto.objects.filter(vendedor=perfil).values("pk"),
+            )
+            | models.Q(
+                content_type=tipos[PacoteSurpresa],
+                object_id__in=PacoteSurpresa.objects.filter(vendedor=perfil).values(
+                    "pk"
+                ),
+            )
+            | models.Q(content_type=tipos[Perfil], object_id=perfil.pk)
+        )
+
+
 class Avaliacao(TimeStampedModel):
     """ Modelo para avaliações (nota) e comentários (texto) de qualquer objeto. """
     autor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='avaliacoes_feitas')
@@ -23,6 +71,8 @@ class Avaliacao(TimeStampedModel):
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
 
+    objects = AvaliacaoManager()
+
     class Meta:
         ordering = ['-data_criacao']
         indexes = [
@@ -123,7 +123,10 @@ class Cupom(TimeStampedModel):
         return max(0, self.limite_uso - self.usos_realizados)
     
     def calcular_desconto(self, valor_pedido):
-        """Calcula o valor do desconto para um pedido"""
+        """
+        Calcula o valor do desconto para um pedido, sem olhar categorias e
+        vendedores. Para um carrinho use ``core.services.cupons``.
+        """
         if not self.esta_valido or valor_pedido < self.valor_minimo_compra:
             return Decimal('0.00')
         
@@ -138,7 +141,14 @@ class Cupom(TimeStampedModel):
         return min(desconto, valor_pedido)
     
     def usar_cupom(self):
-        """Incrementa o contador de uso do cupom"""
-        self.usos_realizados += 1
-        self.save(update_fields=['usos_realizados']) 
+        """
+        Conta um uso com ``UPDATE`` condicional (não passa de ``limite_uso``
+        em checkouts simultâneos). Retorna se o uso foi contado.
+        """
+        from core.services import cupons
+
+        usado = cupons.resgatar(self.pk)
+        if usado:
+            self.refresh_from_db(fields=['usos_realizados'])
+        return usado 
  
\ No newline at end of file
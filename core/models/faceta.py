@@ -0,0 +1,41 @@
+from django.db import models
+
+
+class ContagemFaceta(models.Model):
+    """
+    Quantidade de itens disponíveis (ativos e com estoque) por faceta da
+    vitrine: categoria, vendedor, motivo do desconto e faixa de preço.
+
+    Mantida incrementalmente pelos signals de Produto/PacoteSurpresa
+    (ver ``core.services.facetas``) e reconstruída pelo comando
+    ``reconstruir_facetas``.
+    """
+
+    class Tipo(models.TextChoices):
+        PRODUTO = "produto", "Produto"
+        PACOTE = "pacote", "Pacote Surpresa"
+
+    class Dimensao(models.TextChoices):
+        CATEGORIA = "categoria", "Categoria"
+        VENDEDOR = "vendedor", "Vendedor"
+        MOTIVO = "motivo", "Motivo do Desconto"
+        FAIXA_PRECO = "faixa_preco", "Faixa de Preço"
+
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    dimensao = models.CharField(max_length=20, choices=Dimensao.choices)
+    valor = models.CharField(
+        max_length=50, blank=True, help_text="Id ou código do valor da faceta."
+    )
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contagem de Faceta"
+        verbose_name_plural = "Contagens de Facetas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tipo", "dimensao", "valor"], name="unique_contagem_faceta"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.tipo}/{self.dimensao}={self.valor or '-'}: {self.total}"
@@ -42,6 +42,17 @@ class PedidoVendedor(TimeStampedModel):
         verbose_name = "Sub-Pedido (Vendedor)"
         verbose_name_plural = "Sub-Pedidos (Vendedores)"
         ordering = ['-data_criacao']
+        indexes = [
+            # Caixa de entrada do vendedor (core.services.caixa_vendedor):
+            # com e sem filtro de status.
+            models.Index(
+                fields=["vendedor", "status", "-data_criacao"],
+                name="pedvend_caixa_status_idx",
+            ),
+            models.Index(
+                fields=["vendedor", "-data_criacao"], name="pedvend_caixa_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Sub-Pedido para {self.vendedor.nome_negocio} ({self.pedido_principal.numero_pedido})"
\ No newline at end of file
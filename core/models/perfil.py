@@ -104,6 +104,8 @@ class Perfil(TimeStampedModel):
         help_text="Avaliação média do vendedor (0-5).",
     )
     total_avaliacoes = models.PositiveIntegerField(default=0)
+    # Soma das notas, para recalcular a média a cada avaliação sem ler todas.
+    soma_avaliacoes = models.PositiveIntegerField(default=0, editable=False)
 
     verificado = models.BooleanField(
         default=False, help_text="Perfil verificado pela administração."
@@ -3,7 +3,6 @@ import uuid
 from django.contrib.contenttypes.fields import GenericRelation
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import Q
 from django.urls import reverse
 
 from .time_stamp import TimeStampedModel
@@ -38,12 +37,24 @@ class ProdutoManager(models.Manager):
         return self.disponiveis().filter(categoria__slug=categoria_slug)
 
     def buscar(self, termo):
-        """Busca produtos disponíveis por um termo de pesquisa"""
-        return self.disponiveis().filter(
-            Q(nome__icontains=termo)
-            | Q(descricao__icontains=termo)
-            | Q(categoria__nome__icontains=termo)
-        )
+        """
+        Busca produtos disponíveis por um termo de pesquisa.
+
+        Usa o índice full-text (FTS5 no SQLite, FULLTEXT no MySQL) e devolve
+        o queryset anotado com ``relevancia``, do mais para o menos relevante.
+        """
+        from core.services.busca import ranquear
+
+        return ranquear(self.disponiveis(), "produto", termo)
+
+    def buscar_aproximado(self, termo):
+        """
+        Busca tolerante a erros de digitação (trigramas do nome), anotada
+        com ``relevancia``. Plano B quando ``buscar`` não acha nada.
+        """
+        from core.services.trigramas import ranquear_aproximado
+
+        return ranquear_aproximado(self.disponiveis(), termo)
 
 
 class Produto(TimeStampedModel):
@@ -136,6 +147,9 @@ class Produto(TimeStampedModel):
 
     objects = ProdutoManager()
 
+    # Identifica o tipo do item no feed da vitrine e nas chaves do carrinho.
+    tipo_item = "produto"
+
     class Meta:
         verbose_name = "Produto"
         verbose_name_plural = "Produtos"
@@ -183,6 +197,26 @@ class Produto(TimeStampedModel):
         )
 
 
+class PacoteSurpresaManager(models.Manager):
+    """Manager customizado para o modelo PacoteSurpresa"""
+
+    def disponiveis(self):
+        """Retorna apenas pacotes ativos e com estoque"""
+        return self.filter(ativo=True, quantidade_estoque__gt=0)
+
+    def buscar(self, termo):
+        """Busca pacotes disponíveis pelo índice full-text, ordenados por relevância"""
+        from core.services.busca import ranquear
+
+        return ranquear(self.disponiveis(), "pacote", termo)
+
+    def buscar_aproximado(self, termo):
+        """Busca por nomes parecidos (trigramas), anotada com ``relevancia``"""
+        from core.services.trigramas import ranquear_aproximado
+
+        return ranquear_aproximado(self.disponiveis(), termo)
+
+
 class PacoteSurpresa(TimeStampedModel):
     # Campos para aprimorar a ideia de pacotes surpresa
     tipo_conteudo = models.CharField(
@@ -220,6 +254,14 @@ class PacoteSurpresa(TimeStampedModel):
     imagem = models.ImageField(upload_to="pacotes/", blank=True, null=True)
     quantidade_estoque = models.PositiveIntegerField(default=0)
     ativo = models.BooleanField(default=True)
+    venda_relampago = models.BooleanField(
+        default=False,
+        help_text="Saldo controlado no cache durante a venda (ver core.services.venda_relampago).",
+    )
+
+    objects = PacoteSurpresaManager()
+
+    tipo_item = "pacote"
 
     class Meta:
         verbose_name = "Pacote Surpresa"
@@ -0,0 +1,39 @@
+from django.db import models
+
+
+class ProdutoRelacionado(models.Model):
+    """
+    Sugestão pré-calculada de "produtos relacionados": para cada produto,
+    os ``top-K`` candidatos com maior pontuação (compras em conjunto,
+    mesma categoria, mesmo vendedor e popularidade).
+
+    Regravada pelo comando ``recalcular_relacionados`` (ver
+    ``core.services.relacionados``). Estoque e ``ativo`` são conferidos na
+    leitura, então a tabela pode ficar um pouco defasada sem problema.
+    """
+
+    produto = models.ForeignKey(
+        "core.Produto", on_delete=models.CASCADE, related_name="relacionados"
+    )
+    relacionado = models.ForeignKey(
+        "core.Produto", on_delete=models.CASCADE, related_name="+"
+    )
+    pontuacao = models.FloatField()
+
+    class Meta:
+        verbose_name = "Produto Relacionado"
+        verbose_name_plural = "Produtos Relacionados"
+        ordering = ["-pontuacao"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["produto", "relacionado"], name="unique_produto_relacionado"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["produto", "-pontuacao"], name="relacionado_produto_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.produto_id} -> {self.relacionado_id} ({self.pontuacao:.2f})"
@@ -0,0 +1,93 @@
+from django.db import models
+
+
+class CoCompra(models.Model):
+    """
+    Entrada da matriz esparsa item-item de compras em conjunto: em quantos
+    pedidos ``produto`` e ``outro`` apareceram juntos. A diagonal
+    (``produto == outro``) guarda em quantos pedidos o produto apareceu.
+
+    Guardada nos dois sentidos para que os vizinhos de um produto saiam de
+    uma faixa do índice. Alimentada pelo comando ``atualizar_recomendacoes``
+    (ver ``core.services.recomendacoes``).
+    """
+
+    produto = models.ForeignKey(
+        "core.Produto", on_delete=models.CASCADE, related_name="+"
+    )
+    outro = models.ForeignKey(
+        "core.Produto", on_delete=models.CASCADE, related_name="+"
+    )
+    pedidos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compra em Conjunto"
+        verbose_name_plural = "Compras em Conjunto"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["produto", "outro"], name="unique_cocompra"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.produto_id} + {self.outro_id}: {self.pedidos}"
+
+
+class RecomendacaoCoCompra(models.Model):
+    """
+    Lista compacta dos vizinhos mais próximos de um produto na matriz de
+    compras em conjunto (``[[produto_id, pontuacao], ...]``), lida pela
+    chave primária no bloco "quem comprou também levou".
+    """
+
+    produto = models.OneToOneField(
+        "core.Produto",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="recomendacao_cocompra",
+    )
+    vizinhos = models.JSONField(default=list)
+    data_atualizacao = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Recomendação por Compra em Conjunto"
+        verbose_name_plural = "Recomendações por Compra em Conjunto"
+
+    def __str__(self):
+        return f"{self.produto_id}: {len(self.vizinhos)} vizinho(s)"
+
+
+class ProcessamentoCoCompra(models.Model):
+    """Cada execução do recomendador; a última diz até que pedido já foi lido."""
+
+    ultimo_pedido_id = models.PositiveBigIntegerField()
+    pedidos_processados = models.PositiveIntegerField(default=0)
+    produtos_atualizados = models.PositiveIntegerField(default=0)
+    data_execucao = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Processamento de Compras em Conjunto"
+        verbose_name_plural = "Processamentos de Compras em Conjunto"
+        ordering = ["-ultimo_pedido_id"]
+
+    def __str__(self):
+        return f"Até o pedido {self.ultimo_pedido_id} ({self.data_execucao:%d/%m/%Y %H:%M})"
+
+
+class PedidoCoCompra(models.Model):
+    """
+    Pedido já somado na matriz de compras em conjunto. Só guarda os da
+    janela relida a cada execução (ver ``core.services.recomendacoes``),
+    para que um pedido gravado fora de ordem entre uma vez, e uma só.
+    """
+
+    pedido = models.OneToOneField(
+        "core.Pedido", on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+
+    class Meta:
+        verbose_name = "Pedido Processado em Compras em Conjunto"
+        verbose_name_plural = "Pedidos Processados em Compras em Conjunto"
+
+    def __str__(self):
+        return f"Pedido {self.pedido_id}"
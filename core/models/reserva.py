@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class ReservaEstoque(models.Model):
+    """
+    Unidades de um produto ou pacote seguradas para um carrinho por pouco
+    tempo (ver ``core.services.reservas``). Uma reserva vencida simplesmente
+    deixa de contar; o comando ``limpar_reservas`` apaga as antigas.
+    """
+
+    # Token da sessão ("sessao:<hex>") ou do perfil ("perfil:<id>").
+    dono = models.CharField(max_length=64, db_index=True)
+    produto = models.ForeignKey(
+        "core.Produto",
+        on_delete=models.CASCADE,
+        related_name="reservas",
+        null=True,
+        blank=True,
+    )
+    pacote = models.ForeignKey(
+        "core.PacoteSurpresa",
+        on_delete=models.CASCADE,
+        related_name="reservas",
+        null=True,
+        blank=True,
+    )
+    quantidade = models.PositiveIntegerField()
+    expira_em = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Reserva de Estoque"
+        verbose_name_plural = "Reservas de Estoque"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dono", "produto"], name="unique_reserva_produto"
+            ),
+            models.UniqueConstraint(
+                fields=["dono", "pacote"], name="unique_reserva_pacote"
+            ),
+        ]
+        indexes = [
+            # Soma das reservas ativas de um item.
+            models.Index(fields=["produto", "expira_em"], name="reserva_produto_idx"),
+            models.Index(fields=["pacote", "expira_em"], name="reserva_pacote_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.dono}: {self.quantidade}x {self.produto or self.pacote}"
@@ -0,0 +1,40 @@
+from django.db import models
+
+
+class TrigramaBusca(models.Model):
+    """
+    Trigramas (sem acento, minúsculos) do nome de cada Produto,
+    PacoteSurpresa e Receita, usados na busca tolerante a erros de
+    digitação.
+
+    ``total_trigramas`` repete em cada linha quantos trigramas o nome tem,
+    para calcular a similaridade sem voltar à tabela de origem. Mantida
+    pelos signals (ver ``core.services.trigramas``) e reconstruída pelo
+    comando ``reindexar_busca``.
+    """
+
+    class Tipo(models.TextChoices):
+        PRODUTO = "produto", "Produto"
+        PACOTE = "pacote", "Pacote Surpresa"
+        RECEITA = "receita", "Receita"
+
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    objeto_id = models.PositiveBigIntegerField()
+    trigrama = models.CharField(max_length=3)
+    total_trigramas = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = "Trigrama de Busca"
+        verbose_name_plural = "Trigramas de Busca"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tipo", "trigrama", "objeto_id"],
+                name="unique_trigrama_busca",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["tipo", "objeto_id"], name="trigrama_objeto_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo}#{self.objeto_id}: {self.trigrama}"
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db import models
+
+
+class VendaDiariaVendedor(models.Model):
+    """
+    Vendas de um vendedor num dia (data local da criação do sub-pedido):
+    sub-pedidos recebidos, quantos foram cancelados e, dos não cancelados,
+    itens vendidos e faturamento.
+
+    Mantida pela gravação do pedido e pelos signals de ``PedidoVendedor``
+    (ver ``core.services.vendas_diarias``), na mesma transação, e
+    reconstruída pelo comando ``reconstruir_vendas_diarias``.
+    """
+
+    vendedor = models.ForeignKey(
+        "core.Perfil", on_delete=models.CASCADE, related_name="vendas_diarias"
+    )
+    dia = models.DateField()
+    pedidos = models.IntegerField(default=0)
+    cancelados = models.IntegerField(default=0)
+    itens = models.IntegerField(default=0)
+    receita = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal("0.00")
+    )
+
+    class Meta:
+        verbose_name = "Venda Diária do Vendedor"
+        verbose_name_plural = "Vendas Diárias dos Vendedores"
+        ordering = ["-dia"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vendedor", "dia"], name="unique_venda_diaria_vendedor"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.vendedor_id} {self.dia}: {self.pedidos} pedido(s), R$ {self.receita}"
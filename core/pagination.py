@@ -0,0 +1,359 @@
+"""
+Paginação por keyset (cursor) para views Django e para a API.
+
+Em vez de ``OFFSET``, cada página filtra a partir da última linha vista
+(``WHERE (data_criacao, id) < (...)``), então a página 500 custa o mesmo
+que a página 1 e não é preciso um ``COUNT(*)`` para navegar. O cursor é
+opaco para o cliente: um JSON com os valores da ordenação em base64.
+
+Observação sobre NULL: segue a convenção do SQLite e do MySQL (NULL vem
+primeiro em ordem crescente e por último em ordem decrescente).
+"""
+
+import base64
+import binascii
+import datetime
+import decimal
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ValidationError,
+)
+from django.db.models import Model, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Tempo (s) que a contagem total de um queryset fica em cache.
+TIMEOUT_CONTAGEM = 60
+
+
+class CursorInvalido(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Cursor
+# ---------------------------------------------------------------------------
+
+
+def _serializar_valor(valor):
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        # isoformat() completo: o DjangoJSONEncoder corta os microssegundos,
+        # o que faria o cursor "pular" registros criados no mesmo milissegundo.
+        return valor.isoformat()
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(valores, para_tras=False):
+    dados = {"v": [_serializar_valor(v) for v in valores]}
+    if para_tras:
+        dados["r"] = 1
+    texto = json.dumps(dados, separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Retorna ``(valores, para_tras)`` ou levanta ``CursorInvalido``."""
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        return list(dados["v"]), bool(dados.get("r"))
+    except (TypeError, ValueError, KeyError, binascii.Error) as erro:
+        raise CursorInvalido(str(erro)) from erro
+
+
+# ---------------------------------------------------------------------------
+# Ordenação e filtro
+# ---------------------------------------------------------------------------
+
+
+def ordenacao_do_queryset(queryset):
+    """
+    Ordenação efetiva do queryset (``order_by`` ou ``Meta.ordering``),
+    sempre terminando com a pk para desempatar.
+
+    Levanta ``ImproperlyConfigured`` para ordenações que não dá para
+    expressar num cursor (expressões, ``"?"``): trocá-las pela pk mudaria
+    a ordem da listagem sem aviso. Nesses casos, anote a expressão e ordene
+    pelo nome, ou passe ``ordenacao`` ao paginador.
+    """
+    campos = list(queryset.query.order_by) or list(
+        queryset.model._meta.ordering or []
+    )
+    invalidos = [c for c in campos if not isinstance(c, str) or c == "?"]
+    if invalidos:
+        raise ImproperlyConfigured(
+            f"Paginação por keyset não suporta a ordenação {invalidos!r} "
+            f"de {queryset.model.__name__}."
+        )
+
+    for posicao, campo in enumerate(campos):
+        if campo.lstrip("-") in ("pk", "id"):
+            # Depois da pk a ordem já é total; o resto não faz diferença.
+            return tuple(campos[: posicao + 1])
+
+    desc = campos[-1].startswith("-") if campos else True
+    return tuple(campos) + ("-pk" if desc else "pk",)
+
+
+def campo_do_modelo(model, caminho):
+    """Resolve ``a__b__c`` até o Field final (ou None para anotações)."""
+    campo = None
+    for parte in caminho.split("__"):
+        if model is None:
+            return None
+        try:
+            campo = model._meta.pk if parte == "pk" else model._meta.get_field(parte)
+        except FieldDoesNotExist:
+            return None
+        model = campo.related_model
+    return campo
+
+
+def _valor_do_objeto(obj, caminho):
+    for parte in caminho.split("__"):
+        if obj is None:
+            return None
+        obj = getattr(obj, parte)
+    if isinstance(obj, Model):
+        return obj.pk
+    return obj
+
+
+def _depois(campo, desc, valor):
+    """Registros estritamente depois de ``valor`` na ordem de ``campo``."""
+    if valor is None:
+        return Q(pk__in=[]) if desc else Q(**{f"{campo}__isnull": False})
+    filtro = Q(**{f"{campo}__{'lt' if desc else 'gt'}": valor})
+    if desc:
+        filtro |= Q(**{f"{campo}__isnull": True})
+    return filtro
+
+
+def filtro_igual(campo, valor):
+    if valor is None:
+        return Q(**{f"{campo}__isnull": True})
+    return Q(**{campo: valor})
+
+
+def filtro_keyset(campos, valores, para_tras=False):
+    """
+    ``(a, b, c) > (x, y, z)`` expandido em OR/AND, respeitando a direção
+    de cada campo. Com ``para_tras`` a comparação é invertida.
+    """
+    filtro = Q(pk__in=[])
+    prefixo = Q()
+    for campo, valor in zip(campos, valores):
+        nome = campo.lstrip("-")
+        desc = campo.startswith("-") != para_tras
+        filtro |= prefixo & _depois(nome, desc, valor)
+        prefixo &= filtro_igual(nome, valor)
+    return filtro
+
+
+# ---------------------------------------------------------------------------
+# Paginador
+# ---------------------------------------------------------------------------
+
+
+class PaginaKeyset:
+    """Página de resultados; imita o suficiente de ``django.core.paginator.Page``."""
+
+    def __init__(self, paginador, object_list, has_next, has_previous):
+        self.paginator = paginador
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def cursor_proximo(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.cursor_para(self.object_list[-1])
+
+    @property
+    def cursor_anterior(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.cursor_para(self.object_list[0], para_tras=True)
+
+    @property
+    def total(self):
+        """Total de registros; evita o ``COUNT(*)`` quando cabe numa página só."""
+        if not self.has_other_pages():
+            return len(self.object_list)
+        return self.paginator.count
+
+
+class PaginadorKeyset:
+    """
+    Paginador por keyset.
+
+    ``ordenacao`` é uma tupla de campos (``("-data_criacao", "-id")``);
+    sem ela, usa a ordenação do próprio queryset com a pk no final.
+    """
+
+    def __init__(self, queryset, por_pagina, ordenacao=None):
+        self.campos = tuple(ordenacao or ordenacao_do_queryset(queryset))
+        self.queryset = queryset.order_by(*self.campos)
+        self.por_pagina = por_pagina
+
+    def cursor_para(self, obj, para_tras=False):
+        valores = [_valor_do_objeto(obj, c.lstrip("-")) for c in self.campos]
+        return codificar_cursor(valores, para_tras)
+
+    def _converter(self, valores):
+        if len(valores) != len(self.campos):
+            raise CursorInvalido("Cursor não corresponde à ordenação.")
+        convertidos = []
+        for campo, valor in zip(self.campos, valores):
+            field = campo_do_modelo(self.queryset.model, campo.lstrip("-"))
+            if field is not None and valor is not None:
+                if field.is_relation:
+                    field = field.target_field
+                try:
+                    valor = field.to_python(valor)
+                except ValidationError as erro:
+                    raise CursorInvalido(str(erro)) from erro
+            convertidos.append(valor)
+        return convertidos
+
+    def pagina(self, cursor=None):
+        """Levanta ``CursorInvalido`` se o cursor não puder ser lido."""
+        queryset = self.queryset
+        para_tras = False
+        if cursor:
+            valores, para_tras = decodificar_cursor(cursor)
+            queryset = queryset.filter(
+                filtro_keyset(self.campos, self._converter(valores), para_tras)
+            )
+            if para_tras:
+                queryset = queryset.reverse()
+
+        itens = list(queryset[: self.por_pagina + 1])
+        tem_mais = len(itens) > self.por_pagina
+        itens = itens[: self.por_pagina]
+
+        if para_tras:
+            itens.reverse()
+            return PaginaKeyset(self, itens, has_next=True, has_previous=tem_mais)
+        return PaginaKeyset(self, itens, has_next=tem_mais, has_previous=bool(cursor))
+
+    @property
+    def count(self):
+        """``COUNT(*)`` do queryset, guardado em cache por ``TIMEOUT_CONTAGEM``."""
+        sql = str(self.queryset.order_by().query)
+        chave = "keyset:count:" + hashlib.md5(sql.encode()).hexdigest()
+        total = cache.get(chave)
+        if total is None:
+            total = self.queryset.order_by().count()
+            cache.set(chave, total, TIMEOUT_CONTAGEM)
+        return total
+
+
+def paginar_keyset(request, queryset, por_pagina, ordenacao=None, parametro="cursor"):
+    """
+    Helper para views Django: pagina pelo ``?cursor=`` da requisição.
+    Cursores inválidos ou adulterados voltam para a primeira página.
+    """
+    paginador = PaginadorKeyset(queryset, por_pagina, ordenacao)
+    try:
+        return paginador.pagina(request.GET.get(parametro))
+    except CursorInvalido:
+        return paginador.pagina()
+
+
+# ---------------------------------------------------------------------------
+# DRF
+# ---------------------------------------------------------------------------
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação padrão da API. Resposta no mesmo formato da
+    ``PageNumberPagination`` (``count``/``next``/``previous``/``results``),
+    mas navegando por ``?cursor=``. O ``count`` só é calculado quando o
+    resultado não cabe numa página, e fica em cache por alguns segundos.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = None
+    incluir_total = True
+    invalid_cursor_message = "Cursor inválido."
+
+    def get_page_size(self, request):
+        return self.page_size or settings.REST_FRAMEWORK.get("PAGE_SIZE", 20)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        paginador = PaginadorKeyset(queryset, self.get_page_size(request))
+        try:
+            self.page = paginador.pagina(
+                request.query_params.get(self.cursor_query_param)
+            )
+        except CursorInvalido:
+            raise NotFound(self.invalid_cursor_message)
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.page.cursor_proximo)
+
+    def get_previous_link(self):
+        cursor = self.page.cursor_anterior
+        if cursor is None and self.page.has_previous():
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(cursor)
+
+    def get_paginated_response(self, data):
+        corpo = {}
+        if self.incluir_total:
+            corpo["count"] = self.page.total
+        corpo.update(
+            next=self.get_next_link(),
+            previous=self.get_previous_link(),
+            results=data,
+        )
+        return Response(corpo)
+
+    def get_paginated_response_schema(self, schema):
+        propriedades = {
+            "next": {"type": "string", "nullable": True, "format": "uri"},
+            "previous": {"type": "string", "nullable": True, "format": "uri"},
+            "results": schema,
+        }
+        if self.incluir_total:
+            propriedades["count"] = {"type": "integer"}
+        return {"type": "object", "required": ["results"], "properties": propriedades}
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from core.models.agregado_avaliacao import AgregadoAvaliacao
 from core.models.avaliacao import Avaliacao
 
 from .usuario_serializer import UserSerializer
@@ -9,6 +10,7 @@ class AvaliacaoSerializer(serializers.ModelSerializer):
     """Serializador para avaliações e comentários."""
 
     autor = UserSerializer(read_only=True)
+    alvo = serializers.SerializerMethodField()
 
     class Meta:
         model = Avaliacao
@@ -20,8 +22,28 @@ class AvaliacaoSerializer(serializers.ModelSerializer):
             "data_criacao",
             "content_type",
             "object_id",
+            "alvo",
         )
         extra_kwargs = {
             "content_type": {"write_only": True},
             "object_id": {"write_only": True},
         }
+
+    def get_alvo(self, obj):
+        # Listagens usam Avaliacao.objects.com_alvos(): tipo e objeto já carregados.
+        return {
+            "tipo": obj.content_type.model,
+            "id": obj.object_id,
+            "nome": str(obj.content_object) if obj.content_object else None,
+        }
+
+
+class AgregadoAvaliacaoSerializer(serializers.ModelSerializer):
+    """Resumo das avaliações de um objeto (média, total e histograma)."""
+
+    media = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+    histograma = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = AgregadoAvaliacao
+        fields = ("total", "media", "histograma")
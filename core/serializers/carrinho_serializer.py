@@ -1,8 +1,11 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 
 from core.models.carrinho import Carrinho, ItemCarrinho
+from core.services.carrinho import OPERACOES
 
 from .pacote_surpresa_serializer import PacoteSurpresaSerializer
+from .perfil_serializer import prefetch_perfil
 from .produto_serializer import ProdutoListSerializer
 
 
@@ -24,13 +27,48 @@ class ItemCarrinhoSerializer(serializers.ModelSerializer):
         read_only_fields = ["subtotal"]
 
 
+def _itens(obj):
+    # CarrinhoService já deixa os itens carregados (com os produtos).
+    itens = getattr(obj, "itens_carregados", None)
+    return obj.itens.all() if itens is None else itens
+
+
 class CarrinhoSerializer(serializers.ModelSerializer):
-    itens = ItemCarrinhoSerializer(many=True, read_only=True)
+    itens = serializers.SerializerMethodField()
     total = serializers.SerializerMethodField()
 
     class Meta:
         model = Carrinho
         fields = ["id", "usuario", "itens", "total"]
 
+    def get_itens(self, obj):
+        itens = list(_itens(obj))
+        # Vendedores aninhados (usuário e avaliações) em lote, não item a item.
+        prefetch_related_objects(
+            itens,
+            *prefetch_perfil("produto__vendedor__"),
+            *prefetch_perfil("pacote__vendedor__"),
+            "pacote__produtos_possiveis__categoria",
+            *prefetch_perfil("pacote__produtos_possiveis__vendedor__"),
+        )
+        return ItemCarrinhoSerializer(itens, many=True, context=self.context).data
+
     def get_total(self, obj):
-        return sum(item.subtotal for item in obj.itens.all())
+        return sum(item.subtotal for item in _itens(obj))
+
+
+class OperacaoCarrinhoSerializer(serializers.Serializer):
+    """Uma operação de ``POST /api/carrinho/lote/``."""
+
+    op = serializers.ChoiceField(choices=OPERACOES, default="adicionar")
+    produto_id = serializers.IntegerField(required=False, min_value=1)
+    pacote_id = serializers.IntegerField(required=False, min_value=1)
+    quantidade = serializers.IntegerField(default=1, min_value=0)
+
+    def validate(self, attrs):
+        if ("produto_id" in attrs) == ("pacote_id" in attrs):
+            raise serializers.ValidationError(
+                "Informe produto_id ou pacote_id (um dos dois)."
+            )
+        return attrs
+
@@ -1,10 +1,23 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 
-from ..models import Perfil
+from ..models import Avaliacao, Perfil
 from .avaliacao_serializer import AvaliacaoSerializer
 from .usuario_serializer import UserSerializer
 
 
+def prefetch_perfil(caminho=""):
+    """
+    Lookups de ``prefetch_related`` para serializar com ``PerfilSerializer``
+    os perfis em ``caminho`` (ex.: ``"vendedor__"``) sem uma consulta por
+    perfil para o usuário e as avaliações.
+    """
+    return [
+        f"{caminho}usuario",
+        Prefetch(f"{caminho}avaliacoes", queryset=Avaliacao.objects.com_alvos()),
+    ]
+
+
 class PerfilSerializer(serializers.ModelSerializer):
     """Serializador detalhado para o Perfil do usuário."""
 
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from core.models import Produto
+from core.services import visualizacoes
+from core.services.avaliacoes import agregado_de
+from .avaliacao_serializer import AgregadoAvaliacaoSerializer
 from .perfil_serializer import PerfilSerializer
 from .categoria_serializer import CategoriaProdutoSerializer
 
@@ -18,6 +21,8 @@ class ProdutoDetailSerializer(serializers.ModelSerializer):
     """Serializador completo para a PÁGINA DE DETALHE de um produto."""
     vendedor = PerfilSerializer(read_only=True)
     categoria = CategoriaProdutoSerializer(read_only=True)
+    visualizacoes = serializers.SerializerMethodField()
+    avaliacao = serializers.SerializerMethodField()
 
     class Meta:
         model = Produto
@@ -25,4 +30,12 @@ class ProdutoDetailSerializer(serializers.ModelSerializer):
             'id', 'nome', 'descricao', 'preco', 'preco_original', 'motivo_desconto',
             'imagem_principal', 'codigo_produto', 'data_validade', 'quantidade_estoque',
             'ativo', 'destaque', 'vendedor', 'categoria', 'disponivel_para_venda', 
-        ]
\ No newline at end of file
+            'visualizacoes', 'avaliacao',
+        ]
+
+    def get_visualizacoes(self, obj):
+        # Gravadas no banco mais as que ainda estão no cache.
+        return visualizacoes.total(obj)
+
+    def get_avaliacao(self, obj):
+        return AgregadoAvaliacaoSerializer(agregado_de(obj)).data
@@ -1,7 +1,11 @@
 from rest_framework import serializers
 
 from core.models import EtapaPreparo, Ingrediente, Receita
-from core.serializers.avaliacao_serializer import AvaliacaoSerializer
+from core.serializers.avaliacao_serializer import (
+    AgregadoAvaliacaoSerializer,
+    AvaliacaoSerializer,
+)
+from core.services.avaliacoes import agregado_de
 
 from .usuario_serializer import UserSerializer
 
@@ -25,6 +29,7 @@ class ReceitaDetailSerializer(serializers.ModelSerializer):
     autor = UserSerializer(read_only=True)
     ingredientes = IngredienteSerializer(many=True, read_only=True)
     etapas = EtapaPreparoSerializer(many=True, read_only=True)
+    avaliacao = serializers.SerializerMethodField()
 
     class Meta:
         model = Receita
@@ -40,9 +45,13 @@ class ReceitaDetailSerializer(serializers.ModelSerializer):
             "ingredientes",
             "etapas",
             "avaliacoes",
+            "avaliacao",
         ]
         read_only_fields = ("avaliacoes",)
 
+    def get_avaliacao(self, obj):
+        return AgregadoAvaliacaoSerializer(agregado_de(obj)).data
+
 
 class ReceitaListSerializer(serializers.ModelSerializer):
     """
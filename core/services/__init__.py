@@ -0,0 +1,6 @@
+"""
+Serviços de domínio da aplicação (busca, carrinho, pedidos, etc.).
+
+Os módulos daqui não dependem de request/response: views e viewsets
+chamam estas funções e cuidam apenas da camada HTTP.
+"""
@@ -0,0 +1,265 @@
+"""
+Agregados de avaliações (``AgregadoAvaliacao``) e reputação do vendedor.
+
+Cada avaliação contribui para o agregado do objeto avaliado com +1 no
+total, ``nota`` na soma e +1 no histograma da nota. Criar, editar ou
+apagar uma avaliação aplica só a diferença com ``UPDATE ... SET campo =
+campo + delta``; páginas e serializers leem a média pronta em vez de
+carregar as avaliações.
+
+A mesma diferença sobe para o vendedor dono do objeto (produtos e
+pacotes, pelo ``vendedor_id``; o próprio perfil, quando avaliado
+direto) em ``Perfil.total_avaliacoes`` / ``soma_avaliacoes`` /
+``avaliacao_media``.
+"""
+
+from collections import Counter, defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Greatest
+
+NOTAS = range(1, 6)
+CAMPOS = ("content_type_id", "object_id", "nota")
+
+
+def contribuicao(alvo, nota):
+    """
+    ``Counter`` com a contribuição de uma avaliação ``nota`` para ``alvo``
+    (``(content_type_id, object_id)``), no formato de ``aplicar_delta``.
+    """
+    return Counter(
+        {(alvo, "total"): 1, (alvo, "soma"): nota, (alvo, f"nota_{nota}"): 1}
+    )
+
+
+def estado_da_instancia(avaliacao):
+    """``(alvo, nota)`` da avaliação, ou ``None`` se algum campo foi adiado."""
+    if avaliacao.get_deferred_fields() & set(CAMPOS):
+        return None
+    return (avaliacao.content_type_id, avaliacao.object_id), avaliacao.nota
+
+
+def estado_no_banco(avaliacao_id):
+    from core.models import Avaliacao
+
+    linha = Avaliacao.objects.filter(pk=avaliacao_id).values_list(*CAMPOS).first()
+    if linha is None:
+        return None
+    content_type_id, object_id, nota = linha
+    return (content_type_id, object_id), nota
+
+
+# ---------------------------------------------------------------------------
+# Escrita
+# ---------------------------------------------------------------------------
+
+
+def aplicar_delta(antes=None, depois=None):
+    """
+    Aplica a troca do estado ``antes`` pelo ``depois`` (``(alvo, nota)``
+    ou ``None``) nos agregados e nos vendedores.
+    """
+    delta = Counter()
+    if depois:
+        delta.update(contribuicao(*depois))
+    if antes:
+        delta.subtract(contribuicao(*antes))
+
+    por_alvo = defaultdict(dict)
+    for (alvo, campo), quantidade in delta.items():
+        if quantidade:
+            por_alvo[alvo][campo] = quantidade
+
+    vendedores = vendedores_dos_alvos(por_alvo)
+    for alvo, campos in por_alvo.items():
+        _incrementar(alvo, campos)
+        if vendedores.get(alvo) and ("total" in campos or "soma" in campos):
+            _incrementar_vendedor(
+                vendedores[alvo], campos.get("total", 0), campos.get("soma", 0)
+            )
+
+
+def _incrementar(alvo, campos):
+    from core.models import AgregadoAvaliacao
+
+    content_type_id, object_id = alvo
+    filtro = AgregadoAvaliacao.objects.filter(
+        content_type_id=content_type_id, object_id=object_id
+    )
+    expressoes = {campo: F(campo) + quantidade for campo, quantidade in campos.items()}
+    if filtro.update(**expressoes):
+        return
+    try:
+        with transaction.atomic():
+            AgregadoAvaliacao.objects.create(
+                content_type_id=content_type_id, object_id=object_id, **campos
+            )
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT.
+        filtro.update(**expressoes)
+
+
+def _incrementar_vendedor(vendedor_id, total, soma):
+    from core.models import Perfil
+
+    # A média vem primeiro e usa os valores antigos mais o delta: o MySQL
+    # aplica as atribuições do SET em ordem, então as seguintes já veriam
+    # total e soma novos.
+    Perfil.objects.filter(pk=vendedor_id).update(
+        avaliacao_media=Cast(
+            Cast(F("soma_avaliacoes") + soma, FloatField())
+            / Greatest(F("total_avaliacoes") + total, Value(1)),
+            DecimalField(max_digits=3, decimal_places=2),
+        ),
+        total_avaliacoes=F("total_avaliacoes") + total,
+        soma_avaliacoes=F("soma_avaliacoes") + soma,
+    )
+
+
+def vendedores_dos_alvos(alvos, apps=global_apps):
+    """
+    ``{alvo: perfil_id}`` de quem recebe as avaliações de cada alvo: o
+    vendedor de produtos e pacotes, o próprio perfil quando avaliado
+    direto. Alvos sem vendedor (receitas) ficam de fora. Uma consulta por
+    modelo.
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Perfil = apps.get_model("core", "Perfil")
+
+    por_tipo = defaultdict(set)
+    for content_type_id, object_id in alvos:
+        por_tipo[content_type_id].add(object_id)
+
+    vendedores = {}
+    for content_type_id, ids in por_tipo.items():
+        # get_for_id usa o cache de tipos do ContentTypeManager.
+        tipo = ContentType.objects.get_for_id(content_type_id)
+        try:
+            modelo = apps.get_model(tipo.app_label, tipo.model)
+        except LookupError:
+            # Tipo de um modelo que não existe mais.
+            continue
+        if modelo is Perfil:
+            vendedores.update(((tipo.pk, pk), pk) for pk in ids)
+        elif any(campo.name == "vendedor" for campo in modelo._meta.concrete_fields):
+            vendedores.update(
+                ((tipo.pk, pk), vendedor_id)
+                for pk, vendedor_id in modelo._default_manager.filter(
+                    pk__in=ids
+                ).values_list("pk", "vendedor_id")
+            )
+    return vendedores
+
+
+# ---------------------------------------------------------------------------
+# Leitura
+# ---------------------------------------------------------------------------
+
+
+def agregado_de(objeto):
+    """
+    ``AgregadoAvaliacao`` de ``objeto``; um vazio (não salvo) se ele ainda
+    não foi avaliado.
+    """
+    from django.contrib.contenttypes.models import ContentType
+
+    from core.models import AgregadoAvaliacao
+
+    content_type = ContentType.objects.get_for_model(objeto)
+    return AgregadoAvaliacao.objects.filter(
+        content_type=content_type, object_id=objeto.pk
+    ).first() or AgregadoAvaliacao(content_type=content_type, object_id=objeto.pk)
+
+
+# ---------------------------------------------------------------------------
+# Reconstrução
+# ---------------------------------------------------------------------------
+
+
+def agregado_ao_vivo(apps=global_apps):
+    """``{alvo: {campo: valor}}`` calculado direto das avaliações."""
+    Avaliacao = apps.get_model("core", "Avaliacao")
+
+    contagens = {f"nota_{nota}": Count("pk", filter=Q(nota=nota)) for nota in NOTAS}
+    linhas = (
+        Avaliacao.objects.order_by()
+        .values("content_type_id", "object_id")
+        .annotate(total=Count("pk"), soma=Sum("nota"), **contagens)
+    )
+    return {
+        (linha.pop("content_type_id"), linha.pop("object_id")): linha
+        for linha in linhas
+    }
+
+
+def agregado_armazenado():
+    from core.models import AgregadoAvaliacao
+
+    campos = ["total", "soma", *(f"nota_{nota}" for nota in NOTAS)]
+    return {
+        (linha.pop("content_type_id"), linha.pop("object_id")): linha
+        for linha in AgregadoAvaliacao.objects.exclude(total=0).values(
+            "content_type_id", "object_id", *campos
+        )
+    }
+
+
+def divergencias():
+    """``{alvo: (armazenado, ao_vivo)}`` para todo agregado que não bate."""
+    armazenado = agregado_armazenado()
+    ao_vivo = agregado_ao_vivo()
+    return {
+        alvo: (armazenado.get(alvo), ao_vivo.get(alvo))
+        for alvo in set(armazenado) | set(ao_vivo)
+        if armazenado.get(alvo) != ao_vivo.get(alvo)
+    }
+
+
+def _media(soma, total):
+    if not total:
+        return Decimal("0.00")
+    return (Decimal(soma) / total).quantize(Decimal("0.01"), ROUND_HALF_UP)
+
+
+@transaction.atomic
+def reconstruir(apps=global_apps):
+    """
+    Regrava os agregados e a reputação dos vendedores a partir das
+    avaliações. Retorna quantos objetos avaliados há.
+    """
+    AgregadoAvaliacao = apps.get_model("core", "AgregadoAvaliacao")
+    Perfil = apps.get_model("core", "Perfil")
+
+    ao_vivo = agregado_ao_vivo(apps)
+    AgregadoAvaliacao.objects.all().delete()
+    AgregadoAvaliacao.objects.bulk_create(
+        AgregadoAvaliacao(content_type_id=content_type_id, object_id=object_id, **campos)
+        for (content_type_id, object_id), campos in ao_vivo.items()
+    )
+
+    por_vendedor = defaultdict(lambda: [0, 0])
+    vendedores = vendedores_dos_alvos(ao_vivo, apps)
+    for alvo, campos in ao_vivo.items():
+        vendedor_id = vendedores.get(alvo)
+        if vendedor_id:
+            por_vendedor[vendedor_id][0] += campos["total"]
+            por_vendedor[vendedor_id][1] += campos["soma"]
+
+    Perfil.objects.exclude(pk__in=list(por_vendedor)).update(
+        avaliacao_media=Decimal("0.00"), total_avaliacoes=0, soma_avaliacoes=0
+    )
+    perfis = list(Perfil.objects.filter(pk__in=list(por_vendedor)).only("pk"))
+    for perfil in perfis:
+        total, soma = por_vendedor[perfil.pk]
+        perfil.total_avaliacoes = total
+        perfil.soma_avaliacoes = soma
+        perfil.avaliacao_media = _media(soma, total)
+    Perfil.objects.bulk_update(
+        perfis,
+        ["total_avaliacoes", "soma_avaliacoes", "avaliacao_media"],
+        batch_size=500,
+    )
+    return len(ao_vivo)
@@ -0,0 +1,462 @@
+"""
+Índice de busca textual para Produto e PacoteSurpresa.
+
+Cada banco usa o recurso nativo de full-text:
+
+* SQLite (desenvolvimento): tabela virtual FTS5, com remoção de acentos;
+* MySQL (produção): tabela InnoDB com índices FULLTEXT;
+* outros bancos: sem índice, filtro ``icontains`` (``BackendSemIndice``).
+
+As tabelas do índice são criadas pela migração ``0004_indice_busca`` e
+mantidas em sincronia pelos signals de ``core.signals``. Para reconstruir
+tudo do zero use ``python manage.py reindexar_busca``.
+"""
+
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+
+from django.apps import apps
+from django.db import connection as default_connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABELAS = {
+    "produto": "core_produto_busca",
+    "pacote": "core_pacotesurpresa_busca",
+}
+
+# Pesos de cada coluna no ranking (nome pesa mais que a descrição).
+COLUNAS = ("nome", "descricao", "categoria", "vendedor")
+PESOS = (10.0, 1.0, 4.0, 3.0)
+
+# Quantos ids ``BackendBusca.buscar`` devolve no máximo (consultas diretas
+# ao índice; a vitrine usa ``ranquear``, que não corta resultados).
+LIMITE_RESULTADOS = 500
+MAX_TERMOS = 8
+
+MODELOS = {"produto": "Produto", "pacote": "PacoteSurpresa"}
+# Campos em que cada termo é procurado quando o banco não tem índice.
+FILTROS_FALLBACK = {
+    "produto": ("nome", "descricao", "categoria__nome", "vendedor__nome_negocio"),
+    "pacote": ("nome", "descricao", "tipo_conteudo", "vendedor__nome_negocio"),
+}
+
+
+def extrair_termos(termo):
+    """Quebra o texto digitado em palavras (no máximo ``MAX_TERMOS``)."""
+    return re.findall(r"\w+", (termo or "").lower())[:MAX_TERMOS]
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: ``"Pão de Maçã"`` vira ``"pao de maca"``."""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+
+class BackendBusca(ABC):
+    """
+    Operações de um backend de busca; ``obter_backend`` escolhe a
+    implementação pelo banco da conexão.
+    """
+
+    suporta_indice = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    @abstractmethod
+    def criar_tabelas(self):
+        """Cria as tabelas do índice, se o backend tiver índice."""
+
+    @abstractmethod
+    def remover_tabelas(self):
+        """Remove as tabelas do índice."""
+
+    @abstractmethod
+    def indexar(self, tipo, documentos):
+        """Grava ``[(id, nome, descricao, categoria, vendedor), ...]``."""
+
+    @abstractmethod
+    def remover(self, tipo, ids):
+        """Tira ``ids`` do índice."""
+
+    @abstractmethod
+    def limpar(self, tipo):
+        """Esvazia o índice de ``tipo``."""
+
+    @abstractmethod
+    def buscar(self, tipo, termos, limite=LIMITE_RESULTADOS):
+        """Retorna ``[(id, score), ...]`` do mais para o menos relevante."""
+
+    @abstractmethod
+    def ranquear(self, queryset, tipo, termos):
+        """
+        ``queryset`` restrito aos objetos que casam com todos os ``termos``
+        e anotado com ``relevancia``.
+        """
+
+
+class BackendSemIndice(BackendBusca):
+    """
+    Bancos sem full-text nativo: cada termo precisa aparecer (``icontains``)
+    em algum dos campos de ``FILTROS_FALLBACK``. Sem tabelas de índice e
+    sem nota de relevância (todas 0).
+    """
+
+    def criar_tabelas(self):
+        pass
+
+    def remover_tabelas(self):
+        pass
+
+    def indexar(self, tipo, documentos):
+        pass
+
+    def remover(self, tipo, ids):
+        pass
+
+    def limpar(self, tipo):
+        pass
+
+    @staticmethod
+    def _filtro(tipo, termos):
+        filtro = Q()
+        for termo in termos:
+            algum_campo = Q()
+            for campo in FILTROS_FALLBACK[tipo]:
+                algum_campo |= Q(**{f"{campo}__icontains": termo})
+            filtro &= algum_campo
+        return filtro
+
+    def buscar(self, tipo, termos, limite=LIMITE_RESULTADOS):
+        if not termos:
+            return []
+        model = apps.get_model("core", MODELOS[tipo])
+        ids = (
+            model.objects.filter(self._filtro(tipo, termos))
+            .order_by("-pk")
+            .values_list("pk", flat=True)[:limite]
+        )
+        return [(pk, 0.0) for pk in ids]
+
+    def ranquear(self, queryset, tipo, termos):
+        return queryset.filter(self._filtro(tipo, termos)).annotate(
+            relevancia=Value(0.0, output_field=FloatField())
+        )
+
+
+class BackendComIndice(BackendBusca):
+    """
+    Backends com full-text nativo. Filtro e nota entram no próprio SQL do
+    queryset (``sql_ids`` e ``sql_relevancia``).
+    """
+
+    suporta_indice = True
+
+    @abstractmethod
+    def sql_ids(self, tipo, termos):
+        """``(sql, params)`` de um ``SELECT`` com os ids que casam."""
+
+    @abstractmethod
+    def sql_relevancia(self, tipo, termos, coluna_id):
+        """
+        ``(sql, params)`` do score de relevância da linha cujo id está em
+        ``coluna_id`` (subconsulta correlacionada, lida pela chave do índice).
+        """
+
+    def ranquear(self, queryset, tipo, termos):
+        # Disponibilidade e filtros da vitrine são aplicados pelo banco
+        # junto com o MATCH, sem corte de resultados antes deles e sem um
+        # CASE com um ramo por id.
+        model = queryset.model
+        coluna_id = "{}.{}".format(
+            self.connection.ops.quote_name(model._meta.db_table),
+            self.connection.ops.quote_name(model._meta.pk.column),
+        )
+        return (
+            queryset.filter(pk__in=RawSQL(*self.sql_ids(tipo, termos)))
+            .annotate(
+                relevancia=RawSQL(
+                    *self.sql_relevancia(tipo, termos, coluna_id),
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-relevancia", "-pk")
+        )
+
+
+class BackendSQLite(BackendComIndice):
+    """FTS5 com ``rowid`` igual ao id do objeto indexado."""
+
+    def criar_tabelas(self):
+        with self.connection.cursor() as cursor:
+            for tabela in TABELAS.values():
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabela} USING fts5("
+                    f"{', '.join(COLUNAS)}, "
+                    "tokenize='unicode61 remove_diacritics 2')"
+                )
+
+    def remover_tabelas(self):
+        with self.connection.cursor() as cursor:
+            for tabela in TABELAS.values():
+                cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+
+    def indexar(self, tipo, documentos):
+        documentos = list(documentos)
+        if not documentos:
+            return
+        tabela = TABELAS[tipo]
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {tabela} (rowid, {', '.join(COLUNAS)}) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                documentos,
+            )
+
+    def remover(self, tipo, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        placeholders = ", ".join(["%s"] * len(ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {TABELAS[tipo]} WHERE rowid IN ({placeholders})", ids
+            )
+
+    def limpar(self, tipo):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABELAS[tipo]}")
+
+    @staticmethod
+    def _consulta(termos):
+        # Cada palavra vira um prefixo ("pao"*), para funcionar enquanto o
+        # usuário ainda está digitando. Todas as palavras precisam casar.
+        return " ".join(f'"{t}"*' for t in termos)
+
+    def _score(self, tabela):
+        # bm25() é negativo: quanto menor, mais relevante.
+        return f"-bm25({tabela}, {', '.join(str(p) for p in PESOS)})"
+
+    def buscar(self, tipo, termos, limite=LIMITE_RESULTADOS):
+        if not termos:
+            return []
+        tabela = TABELAS[tipo]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, {self._score(tabela)} AS score FROM {tabela} "
+                f"WHERE {tabela} MATCH %s ORDER BY score DESC LIMIT %s",
+                [self._consulta(termos), limite],
+            )
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+
+    def sql_ids(self, tipo, termos):
+        tabela = TABELAS[tipo]
+        return (
+            f"SELECT rowid FROM {tabela} WHERE {tabela} MATCH %s",
+            [self._consulta(termos)],
+        )
+
+    def sql_relevancia(self, tipo, termos, coluna_id):
+        tabela = TABELAS[tipo]
+        return (
+            f"SELECT {self._score(tabela)} FROM {tabela} "
+            f"WHERE {tabela} MATCH %s AND rowid = {coluna_id}",
+            [self._consulta(termos)],
+        )
+
+
+class BackendMySQL(BackendComIndice):
+    """Tabela InnoDB com FULLTEXT em todas as colunas e outro só no nome."""
+
+    def criar_tabelas(self):
+        with self.connection.cursor() as cursor:
+            for tabela in TABELAS.values():
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {tabela} ("
+                    "id BIGINT NOT NULL PRIMARY KEY, "
+                    "nome VARCHAR(255) NOT NULL DEFAULT '', "
+                    "descricao LONGTEXT NOT NULL, "
+                    "categoria VARCHAR(255) NOT NULL DEFAULT '', "
+                    "vendedor VARCHAR(255) NOT NULL DEFAULT '', "
+                    f"FULLTEXT KEY {tabela}_nome_ft (nome), "
+                    f"FULLTEXT KEY {tabela}_ft ({', '.join(COLUNAS)})"
+                    ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 "
+                    "COLLATE=utf8mb4_unicode_ci"
+                )
+
+    def remover_tabelas(self):
+        with self.connection.cursor() as cursor:
+            for tabela in TABELAS.values():
+                cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+
+    def indexar(self, tipo, documentos):
+        documentos = list(documentos)
+        if not documentos:
+            return
+        atualizacoes = ", ".join(f"{c} = VALUES({c})" for c in COLUNAS)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABELAS[tipo]} (id, {', '.join(COLUNAS)}) "
+                f"VALUES (%s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE {atualizacoes}",
+                documentos,
+            )
+
+    def remover(self, tipo, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        placeholders = ", ".join(["%s"] * len(ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {TABELAS[tipo]} WHERE id IN ({placeholders})", ids
+            )
+
+    def limpar(self, tipo):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABELAS[tipo]}")
+
+    @staticmethod
+    def _consulta(termos):
+        return " ".join(f"+{t}*" for t in termos)
+
+    # Score com dois parâmetros (a consulta) e o filtro com um.
+    SCORE = (
+        f"MATCH (nome) AGAINST (%s IN BOOLEAN MODE) * {PESOS[0]} "
+        f"+ MATCH ({', '.join(COLUNAS)}) AGAINST (%s IN BOOLEAN MODE)"
+    )
+    CASA = f"MATCH ({', '.join(COLUNAS)}) AGAINST (%s IN BOOLEAN MODE)"
+
+    def buscar(self, tipo, termos, limite=LIMITE_RESULTADOS):
+        if not termos:
+            return []
+        consulta = self._consulta(termos)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, {self.SCORE} AS score FROM {TABELAS[tipo]} "
+                f"WHERE {self.CASA} ORDER BY score DESC LIMIT %s",
+                [consulta, consulta, consulta, limite],
+            )
+            return [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+    def sql_ids(self, tipo, termos):
+        return (
+            f"SELECT id FROM {TABELAS[tipo]} WHERE {self.CASA}",
+            [self._consulta(termos)],
+        )
+
+    def sql_relevancia(self, tipo, termos, coluna_id):
+        consulta = self._consulta(termos)
+        return (
+            f"SELECT {self.SCORE} FROM {TABELAS[tipo]} WHERE id = {coluna_id}",
+            [consulta, consulta],
+        )
+
+
+def obter_backend(connection=None):
+    """Escolhe o backend de busca de acordo com o banco da conexão."""
+    connection = connection or default_connection
+    if connection.vendor == "sqlite":
+        return BackendSQLite(connection)
+    if connection.vendor == "mysql":
+        return BackendMySQL(connection)
+    return BackendSemIndice(connection)
+
+
+# ---------------------------------------------------------------------------
+# Documentos do índice
+# ---------------------------------------------------------------------------
+
+
+def _documentos_produto(ids=None):
+    from core.models import Produto
+
+    queryset = Produto.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    for pk, nome, descricao, categoria, vendedor in queryset.values_list(
+        "pk", "nome", "descricao", "categoria__nome", "vendedor__nome_negocio"
+    ).iterator(chunk_size=1000):
+        yield (pk, nome or "", descricao or "", categoria or "", vendedor or "")
+
+
+def _documentos_pacote(ids=None):
+    from core.models import PacoteSurpresa
+
+    queryset = PacoteSurpresa.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    for pk, nome, descricao, conteudo, vendedor in queryset.values_list(
+        "pk", "nome", "descricao", "tipo_conteudo", "vendedor__nome_negocio"
+    ).iterator(chunk_size=1000):
+        yield (pk, nome or "", descricao or "", conteudo or "", vendedor or "")
+
+
+DOCUMENTOS = {"produto": _documentos_produto, "pacote": _documentos_pacote}
+
+
+def indexar(tipo, ids):
+    """(Re)indexa os objetos ``ids`` do tipo informado."""
+    ids = list(ids)
+    if not ids:
+        return
+    backend = obter_backend()
+    if backend.suporta_indice:
+        backend.indexar(tipo, DOCUMENTOS[tipo](ids))
+
+
+def remover(tipo, ids):
+    """Tira os objetos ``ids`` do índice."""
+    backend = obter_backend()
+    if backend.suporta_indice:
+        backend.remover(tipo, ids)
+
+
+def reconstruir_indice():
+    """Apaga e recria o índice inteiro. Retorna ``{tipo: total_indexado}``."""
+    backend = obter_backend()
+    totais = {}
+    for tipo, documentos in DOCUMENTOS.items():
+        if not backend.suporta_indice:
+            totais[tipo] = 0
+            continue
+        backend.limpar(tipo)
+        lote, total = [], 0
+        for documento in documentos():
+            lote.append(documento)
+            if len(lote) >= 1000:
+                backend.indexar(tipo, lote)
+                total += len(lote)
+                lote = []
+        backend.indexar(tipo, lote)
+        totais[tipo] = total + len(lote)
+    return totais
+
+
+# ---------------------------------------------------------------------------
+# Consulta
+# ---------------------------------------------------------------------------
+
+
+def sem_resultados(queryset):
+    # Anotado mesmo vazio, para que ``order_by("-relevancia")`` continue válido.
+    return queryset.annotate(
+        relevancia=Value(0.0, output_field=FloatField())
+    ).none()
+
+
+def ranquear(queryset, tipo, termo):
+    """
+    Restringe ``queryset`` aos objetos que casam com ``termo`` e anota
+    ``relevancia`` (com índice, já ordenando do mais para o menos relevante).
+    """
+    termos = extrair_termos(termo)
+    if not termos:
+        return sem_resultados(queryset)
+    return obter_backend().ranquear(queryset, tipo, termos)
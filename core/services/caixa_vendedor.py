@@ -0,0 +1,91 @@
+"""
+Caixa de entrada de pedidos do vendedor.
+
+Cada vendedor tem o seu ``PedidoVendedor`` por pedido, então a caixa é
+uma leitura direta dessa tabela (``vendedor``, ``status``,
+``data_criacao``), coberta pelo índice composto do modelo, e não uma
+junção de ``Pedido`` com os itens seguida de ``DISTINCT``. Produtos e
+pacotes surpresa entram do mesmo jeito, porque o sub-pedido já é do
+vendedor.
+
+A paginação é por keyset (``core.pagination``) em ``-data_criacao, -pk``:
+a página 50 da caixa custa o mesmo que a primeira.
+"""
+
+from django.db.models import Count, Prefetch
+
+ORDENACAO = ("-data_criacao", "-pk")
+POR_PAGINA = 20
+
+
+def _status():
+    from core.models import PedidoVendedor
+
+    return PedidoVendedor.StatusPedidoVendedor
+
+
+def filtros():
+    """``{nome do filtro: status incluídos}``; ``None`` = todos."""
+    status = _status()
+    return {
+        "todos": None,
+        "abertos": (status.AGUARDANDO, status.EM_PREPARO, status.A_CAMINHO),
+        **{valor.lower(): (valor,) for valor in status.values},
+    }
+
+
+def caixa_de_entrada(vendedor, filtro=None):
+    """
+    Sub-pedidos de ``vendedor``, mais recentes primeiro, com pedido,
+    cliente e itens (produtos e pacotes) já carregados. ``filtro`` é uma
+    chave de ``filtros()``; desconhecido vale como "todos".
+    """
+    from core.models import ItemPedido, PedidoVendedor
+
+    queryset = PedidoVendedor.objects.filter(vendedor=vendedor)
+    status = filtros().get(filtro)
+    if status:
+        queryset = queryset.filter(status__in=status)
+    return (
+        queryset.select_related("pedido_principal__cliente__usuario")
+        .prefetch_related(
+            Prefetch(
+                "itens",
+                queryset=ItemPedido.objects.select_related(
+                    "produto", "pacote_surpresa"
+                ).order_by("pk"),
+            )
+        )
+        .order_by(*ORDENACAO)
+    )
+
+
+def contagens(vendedor):
+    """``{nome do filtro: quantidade}`` para as abas, numa consulta só."""
+    from core.models import PedidoVendedor
+
+    por_status = dict(
+        PedidoVendedor.objects.filter(vendedor=vendedor)
+        .order_by()
+        .values_list("status")
+        .annotate(total=Count("pk"))
+    )
+    return {
+        nome: sum(
+            total
+            for valor, total in por_status.items()
+            if status is None or valor in status
+        )
+        for nome, status in filtros().items()
+    }
+
+
+def abas(vendedor):
+    """``[(filtro, rótulo, quantidade)]`` na ordem de ``filtros()``."""
+    rotulos = {
+        "todos": "Todos",
+        "abertos": "Em aberto",
+        **{valor.lower(): rotulo for valor, rotulo in _status().choices},
+    }
+    totais = contagens(vendedor)
+    return [(nome, rotulos[nome], totais[nome]) for nome in filtros()]
@@ -0,0 +1,583 @@
+"""
+Carrinho de compras único para as views de sessão e para a API.
+
+Por dentro o carrinho é só ``{(tipo, id): quantidade}``, com ``tipo``
+``"produto"`` ou ``"pacote"``, mais os objetos carregados. Quem guarda
+esse dicionário é o armazenamento:
+
+* ``ArmazenamentoSessao``: ``request.session["carrinho"]``, com as chaves
+  ``"produto_<id>"``/``"pacote_<id>"`` de sempre (páginas do site);
+* ``ArmazenamentoBanco``: ``Carrinho``/``ItemCarrinho`` do perfil (API).
+
+Os objetos são carregados uma vez só, em no máximo duas consultas (uma
+por tabela na sessão, e só quando alguém precisa deles; o carrinho e os
+itens com ``select_related`` no banco), e o serviço fica guardado na
+requisição: a view, os helpers e o template da mesma requisição
+reaproveitam as mesmas linhas.
+
+``CarrinhoService.precos()`` congela os preços do carrinho num
+``ResumoPrecos`` (linhas, subtotal por vendedor, total) guardado junto
+com o carrinho. Ele é refeito só quando o carrinho muda (``salvar``
+descarta o anterior) ou quando a versão ``"precos"`` sobe; a prévia de
+cupom, a página de checkout e o cabeçalho leem o resumo sem carregar
+produtos. Essa versão acompanha só o que o resumo usa (nome, preço,
+vendedor, categoria, ``ativo``; ver ``core.signals``): baixas de estoque
+não descartam os resumos de todos os carrinhos.
+"""
+
+from decimal import Decimal
+from typing import NamedTuple
+
+from core.services import reservas
+from core.services.estoque import EstoqueInsuficiente
+from core.services.versoes import versao
+
+TIPOS = ("produto", "pacote")
+OPERACOES = ("adicionar", "definir", "remover")
+
+NOME_VERSAO_PRECOS = "precos"
+# Campos de Produto/PacoteSurpresa que entram no ResumoPrecos.
+CAMPOS_PRECOS = ("nome", "preco", "vendedor", "categoria", "ativo")
+
+ATRIBUTO_SESSAO = "_carrinho_sessao"
+ATRIBUTO_BANCO = "_carrinho_banco"
+CHAVE_RESUMO = "carrinho_precos"
+
+
+class ItemInexistente(LookupError):
+    def __init__(self, chaves):
+        self.chaves = chaves
+        super().__init__(f"Itens não encontrados: {', '.join(chaves)}.")
+
+
+def chave(tipo, pk):
+    return f"{tipo}_{pk}"
+
+
+def separar_chave(texto):
+    """``"produto_3"`` -> ``("produto", 3)``; ``None`` se a chave for inválida."""
+    tipo, _, pk = str(texto).partition("_")
+    if tipo not in TIPOS or not pk.isdigit():
+        return None
+    return tipo, int(pk)
+
+
+def buscar_objetos(itens):
+    """``{(tipo, id): objeto}`` com uma consulta por tipo presente em ``itens``."""
+    from core.models import PacoteSurpresa, Produto
+
+    por_tipo = {tipo: [] for tipo in TIPOS}
+    for tipo, pk in itens:
+        por_tipo[tipo].append(pk)
+
+    objetos = {}
+    for tipo, model in (("produto", Produto), ("pacote", PacoteSurpresa)):
+        if not por_tipo[tipo]:
+            continue
+        for obj in model.objects.select_related("vendedor").filter(
+            pk__in=por_tipo[tipo]
+        ):
+            objetos[(tipo, obj.pk)] = obj
+    return objetos
+
+
+class LinhaCarrinho:
+    """Um item do carrinho com o objeto já carregado."""
+
+    __slots__ = ("tipo", "objeto", "quantidade")
+
+    def __init__(self, tipo, objeto, quantidade):
+        self.tipo = tipo
+        self.objeto = objeto
+        self.quantidade = quantidade
+
+    @property
+    def chave(self):
+        return chave(self.tipo, self.objeto.pk)
+
+    @property
+    def nome(self):
+        return self.objeto.nome
+
+    @property
+    def preco(self):
+        return self.objeto.preco
+
+    @property
+    def vendedor(self):
+        return self.objeto.vendedor
+
+    @property
+    def vendedor_id(self):
+        return self.objeto.vendedor_id
+
+    @property
+    def categoria_id(self):
+        # Pacotes não têm categoria.
+        return getattr(self.objeto, "categoria_id", None)
+
+    @property
+    def subtotal(self):
+        return self.objeto.preco * self.quantidade
+
+
+class LinhaPreco(NamedTuple):
+    """Linha do ``ResumoPrecos``: os valores da linha, sem o objeto do banco."""
+
+    chave: str
+    nome: str
+    preco: Decimal
+    quantidade: int
+    vendedor_id: int
+    categoria_id: object
+
+    @property
+    def subtotal(self):
+        return self.preco * self.quantidade
+
+
+class ResumoPrecos(NamedTuple):
+    linhas: tuple
+    # {vendedor_id: subtotal}
+    por_vendedor: dict
+    total: Decimal
+    total_itens: int
+
+    @classmethod
+    def calcular(cls, linhas):
+        congeladas = []
+        por_vendedor = {}
+        total = Decimal("0.00")
+        total_itens = 0
+        for linha in linhas:
+            congelada = LinhaPreco(
+                linha.chave,
+                linha.nome,
+                linha.preco,
+                linha.quantidade,
+                linha.vendedor_id,
+                linha.categoria_id,
+            )
+            congeladas.append(congelada)
+            subtotal = congelada.subtotal
+            por_vendedor[linha.vendedor_id] = (
+                por_vendedor.get(linha.vendedor_id, Decimal("0.00")) + subtotal
+            )
+            total += subtotal
+            total_itens += linha.quantidade
+        return cls(tuple(congeladas), por_vendedor, total, total_itens)
+
+    def para_sessao(self):
+        """Versão serializável em JSON (a sessão não guarda ``Decimal``)."""
+        return {
+            "linhas": [
+                [linha.chave, linha.nome, str(linha.preco), linha.quantidade,
+                 linha.vendedor_id, linha.categoria_id]
+                for linha in self.linhas
+            ],
+            "por_vendedor": {
+                str(vendedor_id): str(subtotal)
+                for vendedor_id, subtotal in self.por_vendedor.items()
+            },
+            "total": str(self.total),
+            "total_itens": self.total_itens,
+        }
+
+    @classmethod
+    def da_sessao(cls, dados):
+        linhas = tuple(
+            LinhaPreco(chave, nome, Decimal(preco), quantidade, vendedor_id, categoria_id)
+            for chave, nome, preco, quantidade, vendedor_id, categoria_id in dados["linhas"]
+        )
+        por_vendedor = {
+            int(vendedor_id): Decimal(subtotal)
+            for vendedor_id, subtotal in dados["por_vendedor"].items()
+        }
+        return cls(linhas, por_vendedor, Decimal(dados["total"]), dados["total_itens"])
+
+
+# ---------------------------------------------------------------------------
+# Armazenamentos
+# ---------------------------------------------------------------------------
+
+
+class ArmazenamentoSessao:
+    def __init__(self, session):
+        self.session = session
+
+    def carregar(self):
+        """
+        ``(quantidades, None)`` lidos da sessão, ignorando chaves inválidas;
+        os objetos só são buscados quando alguém precisar deles.
+        """
+        quantidades = {}
+        for texto, dados in self.session.get("carrinho", {}).items():
+            item = separar_chave(texto)
+            try:
+                quantidade = int(dados.get("quantidade", 0))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if item is not None:
+                quantidades[item] = quantidade
+        return quantidades, None
+
+    def salvar(self, servico):
+        anterior = self.session.get("carrinho", {})
+        carrinho = {}
+        for (tipo, pk), quantidade in servico.quantidades.items():
+            texto = chave(tipo, pk)
+            objeto = servico.conhecido((tipo, pk))
+            if objeto is None:
+                carrinho[texto] = {**anterior.get(texto, {}), "quantidade": quantidade}
+            else:
+                # Preço e nome continuam na sessão para o resumo do cabeçalho.
+                carrinho[texto] = {
+                    "quantidade": quantidade,
+                    "preco": str(objeto.preco),
+                    "nome": objeto.nome,
+                }
+        self.session["carrinho"] = carrinho
+        self.session.pop(CHAVE_RESUMO, None)
+
+    def resumo_guardado(self):
+        return self.session.get(CHAVE_RESUMO)
+
+    def guardar_resumo(self, dados):
+        self.session[CHAVE_RESUMO] = dados
+
+    def dono(self):
+        return reservas.dono_da_sessao(self.session)
+
+    def limpar(self):
+        self.session.pop("carrinho", None)
+        self.session.pop(CHAVE_RESUMO, None)
+
+
+class ArmazenamentoBanco:
+    def __init__(self, perfil):
+        self.perfil = perfil
+        self.carrinho = None
+        self.registros = {}
+        # Sem sessão na API: o resumo vale enquanto este objeto existir.
+        self.resumo = None
+
+    def carregar(self):
+        from core.models.carrinho import Carrinho, ItemCarrinho
+
+        self.carrinho, _ = Carrinho.objects.get_or_create(usuario=self.perfil)
+        itens = (
+            ItemCarrinho.objects.filter(carrinho=self.carrinho)
+            .select_related(
+                "produto__vendedor", "produto__categoria", "pacote__vendedor"
+            )
+            .order_by("pk")
+        )
+        self.registros = {}
+        objetos = {}
+        for registro in itens:
+            if registro.produto_id:
+                item = ("produto", registro.produto_id)
+                objetos[item] = registro.produto
+            elif registro.pacote_id:
+                item = ("pacote", registro.pacote_id)
+                objetos[item] = registro.pacote
+            else:
+                continue
+            self.registros[item] = registro
+        self._expor_itens()
+        quantidades = {item: r.quantidade for item, r in self.registros.items()}
+        return quantidades, objetos
+
+    def resumo_guardado(self):
+        return self.resumo
+
+    def guardar_resumo(self, dados):
+        self.resumo = dados
+
+    def dono(self):
+        return reservas.dono_do_perfil(self.perfil)
+
+    def item_do_registro(self, registro_id):
+        """``(tipo, id)`` do ``ItemCarrinho`` ``registro_id``, se for deste carrinho."""
+        for item, registro in self.registros.items():
+            if str(registro.pk) == str(registro_id):
+                return item
+        return None
+
+    def salvar(self, servico):
+        from core.models.carrinho import ItemCarrinho
+
+        removidos = [
+            self.registros.pop(item).pk
+            for item in list(self.registros)
+            if item not in servico.quantidades
+        ]
+        novos, alterados = [], []
+        for (tipo, pk), quantidade in servico.quantidades.items():
+            registro = self.registros.get((tipo, pk))
+            if registro is None:
+                registro = ItemCarrinho(carrinho=self.carrinho, quantidade=quantidade)
+                setattr(registro, tipo, servico.conhecido((tipo, pk)))
+                self.registros[(tipo, pk)] = registro
+                novos.append(registro)
+            elif registro.quantidade != quantidade:
+                registro.quantidade = quantidade
+                alterados.append(registro)
+
+        if removidos:
+            ItemCarrinho.objects.filter(pk__in=removidos).delete()
+        if alterados:
+            ItemCarrinho.objects.bulk_update(alterados, ["quantidade"])
+        if novos:
+            ItemCarrinho.objects.bulk_create(novos)
+        self.resumo = None
+        self._expor_itens()
+
+    def limpar(self):
+        from core.models.carrinho import ItemCarrinho
+
+        ItemCarrinho.objects.filter(carrinho=self.carrinho).delete()
+        self.registros = {}
+        self.resumo = None
+        self._expor_itens()
+
+    def _expor_itens(self):
+        # O CarrinhoSerializer usa esta lista em vez de consultar carrinho.itens.
+        self.carrinho.itens_carregados = list(self.registros.values())
+
+
+# ---------------------------------------------------------------------------
+# Serviço
+# ---------------------------------------------------------------------------
+
+
+class CarrinhoService:
+    def __init__(self, armazenamento):
+        self.armazenamento = armazenamento
+        self.quantidades, self._objetos = armazenamento.carregar()
+        # Objetos recebidos em adicionar() antes de o carrinho ser carregado.
+        self._avulsos = {}
+
+    @classmethod
+    def da_sessao(cls, request):
+        """Carrinho da sessão, carregado uma vez por requisição."""
+        return cls._da_requisicao(
+            request, ATRIBUTO_SESSAO, lambda: ArmazenamentoSessao(request.session)
+        )
+
+    @classmethod
+    def do_usuario(cls, request):
+        """Carrinho gravado no banco para o perfil logado (API)."""
+        return cls._da_requisicao(
+            request, ATRIBUTO_BANCO, lambda: ArmazenamentoBanco(request.user.perfil)
+        )
+
+    @classmethod
+    def _da_requisicao(cls, request, atributo, armazenamento):
+        # Na API, request é o Request do DRF; guarda no HttpRequest por baixo.
+        request = getattr(request, "_request", request)
+        servico = getattr(request, atributo, None)
+        if servico is None:
+            servico = cls(armazenamento())
+            setattr(request, atributo, servico)
+        return servico
+
+    # -- leitura ------------------------------------------------------------
+
+    @property
+    def objetos(self):
+        """``{(tipo, id): objeto}``; a primeira leitura faz até duas consultas."""
+        if self._objetos is None:
+            self._objetos = buscar_objetos(self.quantidades)
+        return self._objetos
+
+    def conhecido(self, item):
+        """Objeto do item se já estiver em memória, sem consultar o banco."""
+        if self._objetos is not None:
+            return self._objetos.get(item)
+        return self._avulsos.get(item)
+
+    def __bool__(self):
+        return bool(self.quantidades)
+
+    def __iter__(self):
+        return iter(self.linhas())
+
+    def linhas(self):
+        """Itens cujo produto/pacote ainda existe, na ordem em que foram adicionados."""
+        return [
+            LinhaCarrinho(tipo, self.objetos[(tipo, pk)], quantidade)
+            for (tipo, pk), quantidade in self.quantidades.items()
+            if (tipo, pk) in self.objetos
+        ]
+
+    def faltando(self):
+        """Chaves de itens que não existem mais no banco."""
+        return [chave(*item) for item in self.quantidades if item not in self.objetos]
+
+    def total(self):
+        return sum((linha.subtotal for linha in self.linhas()), Decimal("0.00"))
+
+    def total_itens(self):
+        return sum(self.quantidades.values())
+
+    def produto_ids(self):
+        return [pk for tipo, pk in self.quantidades if tipo == "produto"]
+
+    def precos(self):
+        """
+        ``ResumoPrecos`` do carrinho. Com o resumo guardado e os preços na
+        mesma versão, não consulta o banco.
+        """
+        atual = versao(NOME_VERSAO_PRECOS)
+        dados = self.armazenamento.resumo_guardado()
+        if dados and dados.get("versao") == atual:
+            return ResumoPrecos.da_sessao(dados)
+        resumo = ResumoPrecos.calcular(self.linhas())
+        self.armazenamento.guardar_resumo({**resumo.para_sessao(), "versao": atual})
+        return resumo
+
+    # -- escrita ------------------------------------------------------------
+
+    def adicionar(self, objeto, quantidade=1):
+        """
+        Soma ``quantidade`` ao item e renova a reserva dele; levanta
+        ``EstoqueInsuficiente``.
+        """
+        item = (objeto.tipo_item, objeto.pk)
+        total = self.quantidades.get(item, 0) + quantidade
+        if total > objeto.quantidade_estoque:
+            raise EstoqueInsuficiente(objeto, objeto.quantidade_estoque)
+        reservas.reservar(self.armazenamento.dono(), objeto, total)
+        if self._objetos is None:
+            self._avulsos[item] = objeto
+        else:
+            self._objetos[item] = objeto
+        self.quantidades[item] = total
+        self.salvar()
+
+    def definir_quantidade(self, tipo, pk, quantidade):
+        """
+        Troca a quantidade do item (``0`` remove). Se não houver estoque
+        livre, fica com o máximo que deu para reservar e levanta
+        ``EstoqueInsuficiente``.
+        """
+        if quantidade <= 0:
+            return self.remover(tipo, pk)
+        objeto = self.objetos[(tipo, pk)]
+        dono = self.armazenamento.dono()
+        try:
+            reservas.reservar(dono, objeto, quantidade)
+        except EstoqueInsuficiente as erro:
+            if erro.disponivel > 0:
+                reservas.reservar(dono, objeto, erro.disponivel)
+                self.quantidades[(tipo, pk)] = erro.disponivel
+            else:
+                reservas.liberar(dono, [(tipo, pk)])
+                del self.quantidades[(tipo, pk)]
+            self.salvar()
+            raise
+        self.quantidades[(tipo, pk)] = quantidade
+        self.salvar()
+
+    def aplicar_lote(self, operacoes):
+        """
+        Aplica ``[(op, tipo, id, quantidade)]`` (``op`` em ``OPERACOES``;
+        ``definir`` com ``0`` remove) de uma vez: os objetos novos vêm numa
+        consulta por tabela, as reservas num lote (``reservas.reservar_lote``)
+        e o carrinho é gravado uma vez só. Levanta ``ItemInexistente`` ou
+        ``EstoqueInsuficiente`` sem mudar nada.
+        """
+        novas = dict(self.quantidades)
+        for op, tipo, pk, quantidade in operacoes:
+            item = (tipo, pk)
+            if op == "adicionar":
+                novas[item] = novas.get(item, 0) + quantidade
+            elif op == "definir":
+                novas[item] = quantidade
+            else:
+                novas.pop(item, None)
+        novas = {item: q for item, q in novas.items() if q > 0}
+
+        alterados = {
+            item: q for item, q in novas.items() if self.quantidades.get(item) != q
+        }
+        removidos = [item for item in self.quantidades if item not in novas]
+
+        objetos = {item: self.conhecido(item) for item in alterados}
+        objetos.update(
+            buscar_objetos([item for item, objeto in objetos.items() if objeto is None])
+        )
+        faltando = [chave(*item) for item in alterados if objetos.get(item) is None]
+        if faltando:
+            raise ItemInexistente(faltando)
+
+        for item, quantidade in alterados.items():
+            if quantidade > objetos[item].quantidade_estoque:
+                raise EstoqueInsuficiente(objetos[item], objetos[item].quantidade_estoque)
+        dono = self.armazenamento.dono()
+        reservas.reservar_lote(
+            dono, [(objetos[item], q) for item, q in alterados.items()]
+        )
+        if removidos:
+            reservas.liberar(dono, removidos)
+
+        destino = self._avulsos if self._objetos is None else self._objetos
+        destino.update(objetos)
+        self.quantidades = novas
+        self.salvar()
+
+    def remover(self, tipo, pk):
+        if self.quantidades.pop((tipo, pk), None) is not None:
+            reservas.liberar(self.armazenamento.dono(), [(tipo, pk)])
+            self.salvar()
+
+    def ajustar_ao_estoque(self):
+        """
+        Tira itens inexistentes ou esgotados e limita as quantidades ao
+        estoque, acertando as reservas junto: soltas para os removidos e
+        refeitas (com o que ainda der para reservar) para os limitados.
+        Retorna ``True`` se algum item foi removido.
+        """
+        dono = self.armazenamento.dono()
+        removidos, limitados = [], []
+        for item, quantidade in list(self.quantidades.items()):
+            objeto = self.objetos.get(item)
+            if objeto is None or objeto.quantidade_estoque <= 0:
+                del self.quantidades[item]
+                removidos.append(item)
+            elif quantidade > objeto.quantidade_estoque:
+                limitados.append((item, objeto))
+
+        for item, objeto in limitados:
+            quantidade = objeto.quantidade_estoque
+            try:
+                reservas.reservar(dono, objeto, quantidade)
+            except EstoqueInsuficiente as erro:
+                quantidade = erro.disponivel
+                if quantidade > 0:
+                    reservas.reservar(dono, objeto, quantidade)
+            if quantidade > 0:
+                self.quantidades[item] = quantidade
+            else:
+                del self.quantidades[item]
+                removidos.append(item)
+
+        if removidos:
+            reservas.liberar(dono, removidos)
+        if removidos or limitados:
+            self.salvar()
+        return bool(removidos)
+
+    def confirmar_reservas(self):
+        """Checkout: garante a reserva de todas as linhas (``reservas.confirmar``)."""
+        reservas.confirmar(self.armazenamento.dono(), self.linhas())
+
+    def salvar(self):
+        self.armazenamento.salvar(self)
+
+    def limpar(self):
+        """Esvazia o carrinho e solta as reservas."""
+        reservas.liberar(self.armazenamento.dono())
+        self.quantidades = {}
+        self.armazenamento.limpar()
@@ -0,0 +1,59 @@
+"""
+Lista de categorias usada no menu de todas as páginas
+(``core.context_processors.categorias_context``).
+
+Duas camadas, as duas presas à versão ``"categorias"`` (incrementada
+pelos signals de ``CategoriaProduto``):
+
+* cópia no processo: com a versão igual, custa só a leitura da versão no
+  cache compartilhado;
+* cópia no cache compartilhado (``categorias:<versao>``): um processo
+  novo, ou que viu a versão mudar, pega de lá sem ir ao banco.
+
+Só quem não acha nenhuma das duas faz a consulta.
+"""
+
+import threading
+
+from django.core.cache import cache
+
+from core.services.versoes import versao
+
+NOME_VERSAO = "categorias"
+# Por segurança a cópia compartilhada expira mesmo sem mudança de versão.
+TIMEOUT = 60 * 60
+
+_estado = {"versao": None, "categorias": None}
+_trava = threading.Lock()
+
+
+def _chave(atual):
+    return f"categorias:{atual}"
+
+
+def carregar_categorias():
+    from core.models import CategoriaProduto
+
+    return list(CategoriaProduto.objects.all())
+
+
+def listar():
+    """Categorias em ordem, de memória sempre que a versão não mudou."""
+    atual = versao(NOME_VERSAO)
+    if _estado["categorias"] is not None and _estado["versao"] == atual:
+        return _estado["categorias"]
+
+    with _trava:
+        if _estado["categorias"] is None or _estado["versao"] != atual:
+            categorias = cache.get(_chave(atual))
+            if categorias is None:
+                categorias = carregar_categorias()
+                cache.set(_chave(atual), categorias, TIMEOUT)
+            _estado["categorias"] = categorias
+            _estado["versao"] = atual
+        return _estado["categorias"]
+
+
+def descartar():
+    """Esquece a cópia deste processo."""
+    _estado["categorias"] = None
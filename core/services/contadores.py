@@ -0,0 +1,19 @@
+"""
+Contadores atômicos no cache compartilhado (``INCRBY`` no Redis).
+"""
+
+from django.core.cache import cache
+
+
+def incrementar(chave, delta=1):
+    """
+    Soma ``delta`` ao contador e retorna o novo valor. Cria a chave (sem
+    expiração) se ela não existe; se outro processo a criou no meio
+    tempo, soma em cima do valor dele.
+    """
+    try:
+        return cache.incr(chave, delta)
+    except ValueError:
+        if cache.add(chave, delta, None):
+            return delta
+        return cache.incr(chave, delta)
@@ -0,0 +1,200 @@
+"""
+Motor de cupons de desconto.
+
+``compilar`` transforma um ``Cupom`` em ``Regras``: uma tupla imutável
+com os campos que decidem o desconto e as ``categorias_permitidas`` /
+``vendedores_permitidos`` já carregadas como ``frozenset`` de ids. As
+regras ficam no cache por código e por id, presas à versão ``"cupons"``
+(incrementada pelos signals de ``Cupom`` e das duas M2M); aplicar um
+cupom ao carrinho não consulta o banco.
+
+``Regras.aplicar`` percorre as linhas do carrinho uma vez: soma a base
+das linhas elegíveis e reparte o desconto entre elas.
+
+``usos_realizados`` muda a cada pedido e não entra nas regras. O limite
+é garantido no resgate, com ``UPDATE ... WHERE usos_realizados <
+limite_uso``: dois checkouts simultâneos não passam do limite. O resgate
+que usa a última vaga, e qualquer resgate recusado, marcam as regras como
+esgotadas (nova versão).
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from core.services.versoes import incrementar_versao, versao
+
+NOME_VERSAO = "cupons"
+TIMEOUT = 60 * 60
+CENTAVO = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+
+class Desconto(NamedTuple):
+    total: Decimal
+    # {chave da linha: desconto}; só linhas elegíveis com desconto.
+    por_linha: dict
+
+
+SEM_DESCONTO = Desconto(ZERO, {})
+
+
+class Regras(NamedTuple):
+    id: int
+    codigo: str
+    percentual: bool
+    valor_desconto: Decimal
+    data_inicio: object
+    data_validade: object
+    ativo: bool
+    esgotado: bool
+    valor_minimo_compra: Decimal
+    valor_maximo_desconto: object
+    # Vazios = sem restrição.
+    categorias: frozenset
+    vendedores: frozenset
+
+    def __str__(self):
+        if self.percentual:
+            return f"{self.codigo} ({int(self.valor_desconto)}%)"
+        return f"{self.codigo} (R$ {self.valor_desconto})"
+
+    def valido(self, agora=None):
+        agora = agora or timezone.now()
+        return (
+            self.ativo
+            and not self.esgotado
+            and self.data_inicio <= agora
+            and (not self.data_validade or self.data_validade >= agora)
+        )
+
+    def elegivel(self, item):
+        """
+        O item (linha do carrinho, produto ou pacote) entra na base do
+        desconto?
+        """
+        if self.vendedores and item.vendedor_id not in self.vendedores:
+            return False
+        if self.categorias:
+            # Pacotes não têm categoria: ficam de fora de cupons por categoria.
+            return getattr(item, "categoria_id", None) in self.categorias
+        return True
+
+    def aplicar(self, linhas, agora=None):
+        """
+        Desconto para ``linhas`` (``LinhaCarrinho`` ou ``LinhaPreco``:
+        ``chave``, ``vendedor_id``, ``categoria_id`` e ``subtotal``). O
+        mínimo de compra vale sobre o carrinho inteiro; o desconto, só
+        sobre as linhas elegíveis.
+        """
+        if not self.valido(agora):
+            return SEM_DESCONTO
+
+        total_carrinho = ZERO
+        elegiveis = []
+        for linha in linhas:
+            total_carrinho += linha.subtotal
+            if self.elegivel(linha):
+                elegiveis.append((linha.chave, linha.subtotal))
+        base = sum((subtotal for _, subtotal in elegiveis), ZERO)
+        if not base or total_carrinho < self.valor_minimo_compra:
+            return SEM_DESCONTO
+
+        if self.percentual:
+            desconto = base * self.valor_desconto / 100
+            if self.valor_maximo_desconto:
+                desconto = min(desconto, self.valor_maximo_desconto)
+        else:
+            desconto = self.valor_desconto
+        desconto = min(desconto, base).quantize(CENTAVO, ROUND_HALF_UP)
+        return Desconto(desconto, _repartir(desconto, base, elegiveis))
+
+
+def _repartir(desconto, base, elegiveis):
+    """Divide ``desconto`` entre as linhas na proporção do subtotal."""
+    por_linha = {}
+    restante = desconto
+    for chave, subtotal in elegiveis[:-1]:
+        parte = (desconto * subtotal / base).quantize(CENTAVO, ROUND_HALF_UP)
+        por_linha[chave] = parte
+        restante -= parte
+    # A última linha fica com o arredondamento, para a soma fechar.
+    por_linha[elegiveis[-1][0]] = restante
+    return por_linha
+
+
+def compilar(cupom):
+    """``Regras`` de ``cupom`` (duas consultas, uma por M2M)."""
+    return Regras(
+        id=cupom.pk,
+        codigo=cupom.codigo,
+        percentual=cupom.tipo_desconto == cupom.TipoDesconto.PERCENTUAL,
+        valor_desconto=Decimal(cupom.valor_desconto),
+        data_inicio=cupom.data_inicio,
+        data_validade=cupom.data_validade,
+        ativo=cupom.ativo,
+        esgotado=cupom.usos_realizados >= cupom.limite_uso,
+        valor_minimo_compra=Decimal(cupom.valor_minimo_compra),
+        valor_maximo_desconto=cupom.valor_maximo_desconto,
+        categorias=frozenset(
+            cupom.categorias_permitidas.values_list("pk", flat=True)
+        ),
+        vendedores=frozenset(
+            cupom.vendedores_permitidos.values_list("pk", flat=True)
+        ),
+    )
+
+
+def _buscar(chave, **filtro):
+    from core.models import Cupom
+
+    chave = f"cupom:{versao(NOME_VERSAO)}:{chave}"
+    regras = cache.get(chave)
+    if regras is None:
+        cupom = Cupom.objects.filter(**filtro).first()
+        # False guarda "não existe": código errado repetido não vai ao banco.
+        regras = compilar(cupom) if cupom else False
+        cache.set(chave, regras, TIMEOUT)
+    return regras or None
+
+
+def por_codigo(codigo):
+    """``Regras`` do cupom com ``codigo`` (sem diferenciar maiúsculas), ou ``None``."""
+    codigo = (codigo or "").strip()
+    if not codigo:
+        return None
+    return _buscar(f"codigo:{codigo.lower()}", codigo__iexact=codigo)
+
+
+def por_id(cupom_id):
+    """``Regras`` do cupom ``cupom_id`` (o guardado na sessão), ou ``None``."""
+    return _buscar(f"id:{cupom_id}", pk=cupom_id)
+
+
+def resgatar(cupom_id):
+    """
+    Conta um uso do cupom se ainda houver. Retorna ``False`` quando o
+    limite já foi atingido. Tanto a recusa quanto o resgate que usa a
+    última vaga marcam as regras como esgotadas (nova versão), para que
+    prévias e carrinhos parem de oferecer o cupom.
+    """
+    from core.models import Cupom
+
+    usado = (
+        Cupom.objects.filter(
+            pk=cupom_id, ativo=True, usos_realizados__lt=F("limite_uso")
+        ).update(usos_realizados=F("usos_realizados") + 1)
+    )
+    if not usado:
+        incrementar_versao(NOME_VERSAO)
+        return False
+    # Sem RETURNING no MySQL: relê a linha (o UPDATE acima já a travou
+    # até o fim da transação do checkout).
+    if Cupom.objects.filter(
+        pk=cupom_id, usos_realizados__gte=F("limite_uso")
+    ).exists():
+        incrementar_versao(NOME_VERSAO)
+    return True
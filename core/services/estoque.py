@@ -0,0 +1,117 @@
+"""
+Regras de estoque de produtos e pacotes compartilhadas pelo carrinho,
+pelas reservas e pelo checkout.
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from core.services.versoes import incrementar_versao
+
+
+class EstoqueInsuficiente(Exception):
+    def __init__(self, objeto, disponivel):
+        self.objeto = objeto
+        self.disponivel = disponivel
+        super().__init__(f"Estoque insuficiente. Disponível: {disponivel}.")
+
+
+def _model(objeto):
+    return type(objeto)._meta.concrete_model
+
+
+@transaction.atomic
+def debitar(linhas):
+    """
+    Baixa o estoque de ``[(objeto, quantidade), ...]`` sem travar as
+    linhas antes: cada item é um ``UPDATE ... SET quantidade_estoque =
+    quantidade_estoque - q WHERE id = ? AND quantidade_estoque >= q``.
+    Se algum não atualizar nenhuma linha, desfaz os anteriores (savepoint)
+    e levanta ``EstoqueInsuficiente`` com o estoque atual do item.
+
+    Os itens são debitados sempre na mesma ordem (tipo, id), então dois
+    checkouts com itens em comum não entram em deadlock, e checkouts de
+    itens diferentes não esperam um pelo outro.
+
+    Pacotes em venda relâmpago saem do saldo no cache
+    (``core.services.venda_relampago``), sem tocar na linha do banco.
+    """
+    from core.services import venda_relampago
+
+    linhas = sorted(linhas, key=lambda linha: (linha[0].tipo_item, linha[0].pk))
+    relampago = [linha for linha in linhas if venda_relampago.ativo(linha[0])]
+    no_banco = [linha for linha in linhas if not venda_relampago.ativo(linha[0])]
+
+    debitados = []
+    try:
+        for objeto, quantidade in relampago:
+            venda_relampago.debitar(objeto, quantidade)
+            debitados.append((objeto, quantidade))
+        _debitar_no_banco(no_banco)
+    except EstoqueInsuficiente:
+        for objeto, quantidade in debitados:
+            venda_relampago.devolver(objeto, quantidade)
+        raise
+
+    for objeto, quantidade in linhas:
+        objeto.quantidade_estoque -= quantidade
+    if no_banco:
+        depois_do_debito([objeto for objeto, _ in no_banco])
+
+
+def _debitar_no_banco(linhas):
+    for objeto, quantidade in linhas:
+        atualizados = (
+            _model(objeto)
+            .objects.filter(pk=objeto.pk, quantidade_estoque__gte=quantidade)
+            .update(quantidade_estoque=F("quantidade_estoque") - quantidade)
+        )
+        if not atualizados:
+            atual = (
+                _model(objeto)
+                .objects.filter(pk=objeto.pk)
+                .values_list("quantidade_estoque", flat=True)
+                .first()
+            )
+            raise EstoqueInsuficiente(objeto, atual or 0)
+
+
+def depois_do_debito(objetos):
+    """
+    ``update()`` não dispara os signals do catálogo: aplica aqui o que
+    eles fariam. ``objetos`` são só os que tinham estoque antes do débito:
+    quem estiver em 0 agora é tratado como recém-esgotado. Só itens que
+    esgotaram mudam facetas e sugestões; a vitrine mostra o estoque, então
+    a versão do catálogo sobe sempre.
+    """
+    from core.services import facetas, sugestoes, vitrine
+
+    por_model = {}
+    for objeto in objetos:
+        por_model.setdefault(_model(objeto), {})[objeto.pk] = objeto
+    esgotados = [
+        por_model[model][pk]
+        for model, itens in por_model.items()
+        for pk in model.objects.filter(
+            pk__in=list(itens), quantidade_estoque__lte=0
+        ).values_list("pk", flat=True)
+    ]
+
+    for objeto in esgotados:
+        model = _model(objeto)
+        tipo = facetas.tipo_do_modelo(model)
+        estado = dict(zip(facetas.CAMPOS[tipo], facetas.estado_no_banco(model, objeto.pk)))
+        # Contribuição de antes do débito, quando ainda havia estoque.
+        estado["quantidade_estoque"] = 1
+        facetas.aplicar_delta(facetas.contribuicao(tipo, tuple(estado.values())), ())
+        # Um save() posterior do mesmo objeto não pode descontar de novo.
+        objeto.quantidade_estoque = 0
+        objeto._facetas_antes = ()
+        if objeto.tipo_item == "produto":
+            estado = sugestoes.estado_produto(objeto)
+            if estado is not None:
+                objeto._sugestao_antes = estado
+
+    incrementar_versao(vitrine.NOME_VERSAO_CATALOGO)
+    if any(objeto.tipo_item == "produto" for objeto in esgotados):
+        incrementar_versao(sugestoes.NOME_VERSAO)
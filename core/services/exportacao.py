@@ -0,0 +1,154 @@
+"""
+Exportação de sub-pedidos e itens em CSV ou NDJSON, em streaming.
+
+Uma linha por item, com os dados do sub-pedido repetidos. As linhas saem
+de ``values_list`` (tuplas, sem instanciar modelos) e são escritas no
+``StreamingHttpResponse`` à medida que chegam: a memória não cresce com
+o histórico do vendedor.
+
+O MySQL não tem cursor no servidor, e ``.iterator()`` sozinho traria o
+resultado inteiro para o cliente. Por isso os sub-pedidos são lidos em
+lotes de ``LOTE`` por keyset em ``-data_criacao, -pk`` (a mesma
+ordenação e o mesmo índice da caixa do vendedor) e só os itens de cada
+lote são buscados. No PostgreSQL o ``.iterator(chunk_size=...)`` de cada
+lote ainda usa cursor no servidor.
+
+Os filtros de período são intervalos em ``data_criacao`` (início do dia
+local de ``desde`` até o início do dia seguinte a ``ate``), não
+``__date``, para que o índice ``(vendedor, status, -data_criacao)``
+sirva.
+
+No CSV, textos que começam como fórmula de planilha (``=``, ``+``, ``-``,
+``@``) saem com um ``'`` na frente (``_celula``).
+"""
+
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Case, Value, When
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from core.pagination import filtro_keyset
+
+LOTE = 500
+ORDENACAO = ("-data_criacao", "-pk")
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# (coluna, lookup a partir de PedidoVendedor)
+COLUNAS = (
+    ("sub_pedido", "pk"),
+    ("pedido", "pedido_principal__numero_pedido"),
+    ("data", "data_criacao"),
+    ("status", "status"),
+    ("vendedor", "vendedor__nome_negocio"),
+    ("cliente", "pedido_principal__cliente__usuario__username"),
+    ("subtotal_vendedor", "valor_subtotal"),
+    ("item", "nome_item"),
+    ("tipo_item", "tipo_item"),
+    ("quantidade", "itens__quantidade"),
+    ("preco_unitario", "itens__preco_unitario"),
+)
+DATA = 2  # posição de data_criacao, convertida para o fuso local
+
+
+def _inicio_do_dia(dia):
+    return timezone.make_aware(datetime.datetime.combine(dia, datetime.time()))
+
+
+def filtrar(queryset, desde=None, ate=None, status=None):
+    """
+    Restringe sub-pedidos ao período (datas locais, inclusivas) e aos
+    ``status`` (iterável de valores de ``StatusPedidoVendedor``).
+    """
+    if desde:
+        queryset = queryset.filter(data_criacao__gte=_inicio_do_dia(desde))
+    if ate:
+        queryset = queryset.filter(
+            data_criacao__lt=_inicio_do_dia(ate + datetime.timedelta(days=1))
+        )
+    if status:
+        queryset = queryset.filter(status__in=status)
+    return queryset
+
+
+def linhas(queryset):
+    """Tuplas na ordem de ``COLUNAS`` para os sub-pedidos de ``queryset``."""
+    from core.models import PedidoVendedor
+
+    chaves = queryset.order_by(*ORDENACAO).values_list("data_criacao", "pk")
+    ultimo = None
+    while True:
+        pagina = chaves
+        if ultimo:
+            pagina = pagina.filter(filtro_keyset(ORDENACAO, ultimo))
+        lote = list(pagina[:LOTE])
+        if not lote:
+            return
+        for tupla in (
+            PedidoVendedor.objects.filter(pk__in=[pk for _, pk in lote])
+            .annotate(
+                nome_item=Coalesce("itens__produto__nome", "itens__pacote_surpresa__nome"),
+                tipo_item=Case(
+                    When(itens__produto__isnull=False, then=Value("produto")),
+                    When(itens__pacote_surpresa__isnull=False, then=Value("pacote")),
+                ),
+            )
+            .order_by(*ORDENACAO, "itens__pk")
+            .values_list(*(lookup for _, lookup in COLUNAS))
+            .iterator(chunk_size=LOTE)
+        ):
+            yield tupla[:DATA] + (timezone.localtime(tupla[DATA]),) + tupla[DATA + 1 :]
+        ultimo = lote[-1]
+
+
+class _Eco:
+    """Buffer de escrita que só devolve o que recebeu (``csv.writer``)."""
+
+    def write(self, valor):
+        return valor
+
+
+# Começos de célula que planilhas interpretam como fórmula.
+INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _celula(valor):
+    """
+    Textos vindos de clientes e vendedores (nomes, usuários) que começam
+    como fórmula ganham um ``'`` na frente: a planilha mostra o texto em
+    vez de executá-lo. Números e datas passam como estão.
+    """
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def em_csv(tuplas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(nome for nome, _ in COLUNAS)
+    for tupla in tuplas:
+        yield escritor.writerow(_celula(valor) for valor in tupla)
+
+
+def em_ndjson(tuplas):
+    nomes = [nome for nome, _ in COLUNAS]
+    for tupla in tuplas:
+        yield json.dumps(dict(zip(nomes, tupla)), cls=DjangoJSONEncoder) + "\n"
+
+
+def resposta(queryset, formato="csv", nome="pedidos"):
+    """``StreamingHttpResponse`` com anexo ``<nome>.<formato>``."""
+    conversor = em_ndjson if formato == "ndjson" else em_csv
+    formato = "ndjson" if formato == "ndjson" else "csv"
+    saida = StreamingHttpResponse(
+        conversor(linhas(queryset)), content_type=FORMATOS[formato]
+    )
+    saida["Content-Disposition"] = f'attachment; filename="{nome}.{formato}"'
+    return saida
@@ -0,0 +1,217 @@
+"""
+Contagens de facetas da vitrine (``ContagemFaceta``).
+
+Cada item disponível contribui com +1 em um conjunto de facetas (sua
+categoria, seu vendedor, seu motivo de desconto e sua faixa de preço).
+Quando o item muda, calculamos a contribuição antes e depois e aplicamos
+só a diferença com ``UPDATE ... SET total = total + delta``, sem refazer
+o ``COUNT`` da tabela inteira a cada requisição.
+"""
+
+from collections import Counter
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, Count, F, Value, When
+
+# Faixas de preço: (rótulo, mínimo inclusivo, máximo exclusivo).
+FAIXAS_PRECO = (
+    ("0-10", Decimal("0"), Decimal("10")),
+    ("10-25", Decimal("10"), Decimal("25")),
+    ("25-50", Decimal("25"), Decimal("50")),
+    ("50-100", Decimal("50"), Decimal("100")),
+    ("100+", Decimal("100"), None),
+)
+
+# Campos de cada modelo que afetam as facetas.
+CAMPOS = {
+    "produto": (
+        "ativo",
+        "quantidade_estoque",
+        "preco",
+        "vendedor_id",
+        "categoria_id",
+        "motivo_desconto",
+    ),
+    "pacote": ("ativo", "quantidade_estoque", "preco", "vendedor_id"),
+}
+
+# Dimensões de cada tipo e o campo (ou expressão) de onde vem o valor.
+DIMENSOES = {
+    "produto": {
+        "categoria": "categoria_id",
+        "vendedor": "vendedor_id",
+        "motivo": "motivo_desconto",
+        "faixa_preco": "preco",
+    },
+    "pacote": {
+        "vendedor": "vendedor_id",
+        "faixa_preco": "preco",
+    },
+}
+
+
+def faixa_preco(preco):
+    if preco is None:
+        return ""
+    preco = Decimal(preco)
+    for rotulo, minimo, maximo in FAIXAS_PRECO:
+        if preco >= minimo and (maximo is None or preco < maximo):
+            return rotulo
+    return ""
+
+
+def _valor(dimensao, valor):
+    if dimensao == "faixa_preco":
+        return faixa_preco(valor)
+    return "" if valor is None else str(valor)
+
+
+def tipo_do_modelo(model):
+    return "pacote" if model._meta.model_name == "pacotesurpresa" else "produto"
+
+
+def estado_da_instancia(instance):
+    """
+    Valores de ``CAMPOS`` lidos de ``instance.__dict__`` (sem disparar
+    queries para campos adiados). ``None`` se algum campo não foi carregado.
+    """
+    tipo = tipo_do_modelo(type(instance))
+    try:
+        return tuple(instance.__dict__[campo] for campo in CAMPOS[tipo])
+    except KeyError:
+        return None
+
+
+def estado_no_banco(model, pk):
+    tipo = tipo_do_modelo(model)
+    return model._default_manager.filter(pk=pk).values_list(*CAMPOS[tipo]).first()
+
+
+def contribuicao(tipo, estado):
+    """Facetas ``(tipo, dimensao, valor)`` às quais o item soma 1."""
+    if not estado:
+        return ()
+    dados = dict(zip(CAMPOS[tipo], estado))
+    if not dados["ativo"] or (dados["quantidade_estoque"] or 0) <= 0:
+        return ()
+    return tuple(
+        (tipo, dimensao, _valor(dimensao, dados[campo]))
+        for dimensao, campo in DIMENSOES[tipo].items()
+    )
+
+
+def aplicar_delta(antes=(), depois=()):
+    """Aplica ``depois - antes`` na tabela de contagens."""
+    delta = Counter(depois)
+    delta.subtract(Counter(antes))
+    for chave, quantidade in delta.items():
+        if quantidade:
+            _incrementar(chave, quantidade)
+
+
+def _incrementar(chave, quantidade):
+    from core.models import ContagemFaceta
+
+    tipo, dimensao, valor = chave
+    filtro = ContagemFaceta.objects.filter(tipo=tipo, dimensao=dimensao, valor=valor)
+    if filtro.update(total=F("total") + quantidade):
+        return
+    try:
+        with transaction.atomic():
+            ContagemFaceta.objects.create(
+                tipo=tipo, dimensao=dimensao, valor=valor, total=quantidade
+            )
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT.
+        filtro.update(total=F("total") + quantidade)
+
+
+# ---------------------------------------------------------------------------
+# Leitura
+# ---------------------------------------------------------------------------
+
+
+def contagens(tipo, dimensao):
+    """``{valor: total}`` só com as facetas que têm itens disponíveis."""
+    from core.models import ContagemFaceta
+
+    return dict(
+        ContagemFaceta.objects.filter(
+            tipo=tipo, dimensao=dimensao, total__gt=0
+        ).values_list("valor", "total")
+    )
+
+
+# ---------------------------------------------------------------------------
+# Reconstrução e verificação
+# ---------------------------------------------------------------------------
+
+
+def _expressao_faixa():
+    casos = []
+    for rotulo, minimo, maximo in FAIXAS_PRECO:
+        filtro = {"preco__gte": minimo}
+        if maximo is not None:
+            filtro["preco__lt"] = maximo
+        casos.append(When(**filtro, then=Value(rotulo)))
+    return Case(*casos, default=Value(""), output_field=CharField())
+
+
+def contagem_ao_vivo(apps=global_apps):
+    """Agrega direto das tabelas de origem: ``{(tipo, dimensao, valor): total}``."""
+    modelos = {
+        "produto": apps.get_model("core", "Produto"),
+        "pacote": apps.get_model("core", "PacoteSurpresa"),
+    }
+    resultado = {}
+    for tipo, dimensoes in DIMENSOES.items():
+        disponiveis = modelos[tipo].objects.filter(
+            ativo=True, quantidade_estoque__gt=0
+        ).order_by()
+        for dimensao, campo in dimensoes.items():
+            if dimensao == "faixa_preco":
+                linhas = disponiveis.annotate(chave=_expressao_faixa())
+            else:
+                linhas = disponiveis.annotate(chave=F(campo))
+            for valor, total in linhas.values_list("chave").annotate(n=Count("pk")):
+                chave = (tipo, dimensao, "" if valor is None else str(valor))
+                resultado[chave] = resultado.get(chave, 0) + total
+    return resultado
+
+
+def contagem_armazenada():
+    from core.models import ContagemFaceta
+
+    return {
+        (tipo, dimensao, valor): total
+        for tipo, dimensao, valor, total in ContagemFaceta.objects.exclude(
+            total=0
+        ).values_list("tipo", "dimensao", "valor", "total")
+    }
+
+
+def divergencias():
+    """``{chave: (armazenado, ao_vivo)}`` para toda faceta que não bate."""
+    armazenado = contagem_armazenada()
+    ao_vivo = contagem_ao_vivo()
+    return {
+        chave: (armazenado.get(chave, 0), ao_vivo.get(chave, 0))
+        for chave in set(armazenado) | set(ao_vivo)
+        if armazenado.get(chave, 0) != ao_vivo.get(chave, 0)
+    }
+
+
+@transaction.atomic
+def reconstruir(apps=global_apps):
+    """Apaga a tabela de contagens e regrava a partir da agregação ao vivo."""
+    ContagemFaceta = apps.get_model("core", "ContagemFaceta")
+
+    ao_vivo = contagem_ao_vivo(apps)
+    ContagemFaceta.objects.all().delete()
+    ContagemFaceta.objects.bulk_create(
+        ContagemFaceta(tipo=tipo, dimensao=dimensao, valor=valor, total=total)
+        for (tipo, dimensao, valor), total in ao_vivo.items()
+    )
+    return len(ao_vivo)
@@ -0,0 +1,93 @@
+"""
+Gravação de um pedido com vários vendedores.
+
+O pedido inteiro é montado em memória e gravado com um comando por
+tabela: o ``Pedido``, todos os ``PedidoVendedor`` num ``bulk_create`` e
+todos os ``ItemPedido`` em outro. O número de idas ao banco não cresce
+com a quantidade de linhas ou de vendedores do carrinho.
+
+As vendas diárias dos vendedores (``core.services.vendas_diarias``) são
+somadas na mesma transação.
+
+Bancos que não devolvem os ids de um ``INSERT`` em lote (MySQL) custam
+uma consulta a mais para ligar os itens aos sub-pedidos.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from core.services import vendas_diarias
+
+
+def _vincular_ids(pedido, sub_pedidos):
+    from core.models import PedidoVendedor
+
+    # Um sub-pedido por vendedor em cada pedido: o par identifica a linha.
+    ids = dict(
+        PedidoVendedor.objects.filter(pedido_principal=pedido).values_list(
+            "vendedor_id", "pk"
+        )
+    )
+    for sub_pedido in sub_pedidos:
+        sub_pedido.pk = ids[sub_pedido.vendedor_id]
+        sub_pedido._state.adding = False
+
+
+@transaction.atomic
+def gravar_pedido(cliente, linhas, **campos):
+    """
+    Cria o pedido de ``cliente`` com ``[(objeto, quantidade), ...]``
+    (produtos ou pacotes), um sub-pedido por vendedor. ``campos`` vão para
+    o ``Pedido`` (endereço, forma de pagamento, cupom...). O estoque não é
+    tocado aqui (ver ``core.services.estoque.debitar``).
+    """
+    from core.models import ItemPedido, Pedido, PedidoVendedor
+
+    por_vendedor = defaultdict(list)
+    for objeto, quantidade in linhas:
+        por_vendedor[objeto.vendedor_id].append((objeto, quantidade))
+
+    subtotais = {
+        vendedor_id: sum(
+            (objeto.preco * quantidade for objeto, quantidade in itens),
+            Decimal("0.00"),
+        )
+        for vendedor_id, itens in por_vendedor.items()
+    }
+    pedido = Pedido.objects.create(
+        cliente=cliente, valor_produtos=sum(subtotais.values(), Decimal("0.00")), **campos
+    )
+
+    sub_pedidos = PedidoVendedor.objects.bulk_create(
+        PedidoVendedor(
+            pedido_principal=pedido,
+            vendedor_id=vendedor_id,
+            valor_subtotal=subtotais[vendedor_id],
+        )
+        for vendedor_id in por_vendedor
+    )
+    if not connection.features.can_return_rows_from_bulk_insert:
+        _vincular_ids(pedido, sub_pedidos)
+
+    ItemPedido.objects.bulk_create(
+        ItemPedido(
+            sub_pedido=sub_pedido,
+            quantidade=quantidade,
+            preco_unitario=objeto.preco,
+            **{
+                "pacote_surpresa" if objeto.tipo_item == "pacote" else "produto": objeto
+            },
+        )
+        for sub_pedido in sub_pedidos
+        for objeto, quantidade in por_vendedor[sub_pedido.vendedor_id]
+    )
+    vendas_diarias.registrar_pedido(
+        sub_pedidos,
+        {
+            vendedor_id: sum(quantidade for _, quantidade in itens)
+            for vendedor_id, itens in por_vendedor.items()
+        },
+    )
+    return pedido
@@ -0,0 +1,232 @@
+"""
+Recomendador "quem comprou também levou", a partir do histórico de
+``ItemPedido``.
+
+``atualizar()`` (comando ``atualizar_recomendacoes``) lê só os pedidos
+novos desde a última execução e:
+
+1. conta, por pedido, os pares de produtos comprados juntos e soma na
+   matriz esparsa ``CoCompra`` (a diagonal guarda quantos pedidos tiveram
+   cada produto);
+2. para cada produto tocado, recalcula a similaridade de cosseno com os
+   vizinhos (``n_ab / sqrt(n_a * n_b)``) e regrava a lista compacta dos
+   ``TOP_K`` melhores em ``RecomendacaoCoCompra``.
+
+Checkouts simultâneos gravam fora da ordem dos ids: um pedido de id menor
+pode aparecer depois que um de id maior já foi lido. Por isso cada
+execução relê os ``JANELA_PEDIDOS`` ids abaixo da última marca e pula os
+que já estão em ``PedidoCoCompra``, o conjunto dos pedidos já somados
+(podado para só guardar os da janela).
+
+A pontuação de um vizinho que não estava nos pedidos novos pode ficar
+levemente defasada (o total de pedidos dele mudou) até a próxima vez que
+o produto for tocado. Sub-pedidos cancelados depois de lidos continuam
+somados: só ``atualizar(do_zero=True)`` (``--do-zero``) recalcula tudo e
+tira os cancelamentos da matriz.
+
+A leitura no carrinho e no detalhe do produto é uma busca pela chave
+primária mais a consulta dos produtos disponíveis, independente do
+tamanho do histórico.
+"""
+
+import math
+from collections import Counter, defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import F
+
+TOP_K = 10
+# Pedidos mínimos em conjunto para um par virar recomendação.
+SUPORTE_MINIMO = 1
+# Ids abaixo da última marca relidos a cada execução (pedidos de
+# checkouts simultâneos gravados fora de ordem).
+JANELA_PEDIDOS = 1000
+
+
+def _pares_novos(desde_pedido_id):
+    """
+    ``(contagens, pedido_ids)`` dos pedidos acima de ``desde_pedido_id``
+    que ainda não foram somados.
+    """
+    from core.models import ItemPedido, PedidoCoCompra, PedidoVendedor
+
+    linhas = (
+        ItemPedido.objects.filter(
+            produto__isnull=False, sub_pedido__pedido_principal_id__gt=desde_pedido_id
+        )
+        .exclude(sub_pedido__status=PedidoVendedor.StatusPedidoVendedor.CANCELADO)
+        .exclude(
+            sub_pedido__pedido_principal_id__in=PedidoCoCompra.objects.filter(
+                pedido_id__gt=desde_pedido_id
+            ).values("pedido_id")
+        )
+        .order_by("sub_pedido__pedido_principal_id")
+        .values_list("sub_pedido__pedido_principal_id", "produto_id")
+    )
+    contagens = Counter()
+    pedido_ids = []
+    for pedido_id, itens in groupby(linhas.iterator(), key=itemgetter(0)):
+        produtos = {produto_id for _, produto_id in itens}
+        for a in produtos:
+            for b in produtos:
+                contagens[(a, b)] += 1
+        pedido_ids.append(pedido_id)
+    return contagens, pedido_ids
+
+
+def _somar_na_matriz(contagens):
+    from core.models import CoCompra
+
+    produtos = {a for a, _ in contagens}
+    existentes = {
+        (linha.produto_id, linha.outro_id): linha
+        for linha in CoCompra.objects.filter(produto_id__in=produtos)
+        if (linha.produto_id, linha.outro_id) in contagens
+    }
+    novas = []
+    for (a, b), n in contagens.items():
+        if (a, b) in existentes:
+            existentes[(a, b)].pedidos = F("pedidos") + n
+        else:
+            novas.append(CoCompra(produto_id=a, outro_id=b, pedidos=n))
+    CoCompra.objects.bulk_update(existentes.values(), ["pedidos"], batch_size=500)
+    CoCompra.objects.bulk_create(novas, batch_size=500)
+    return produtos
+
+
+def _regravar_listas(produtos, top_k):
+    from core.models import CoCompra, RecomendacaoCoCompra
+
+    linhas = list(
+        CoCompra.objects.filter(produto_id__in=produtos).values_list(
+            "produto_id", "outro_id", "pedidos"
+        )
+    )
+    vizinhos = defaultdict(list)
+    for a, b, n in linhas:
+        vizinhos[a].append((b, n))
+    diagonal = dict(
+        CoCompra.objects.filter(
+            produto_id__in={b for _, b, _ in linhas}, outro_id=F("produto_id")
+        ).values_list("produto_id", "pedidos")
+    )
+
+    listas = []
+    for a in produtos:
+        n_a = diagonal.get(a) or 1
+        pontuados = [
+            (round(n / math.sqrt(n_a * (diagonal.get(b) or 1)), 4), b)
+            for b, n in vizinhos[a]
+            if b != a and n >= SUPORTE_MINIMO
+        ]
+        pontuados.sort(key=lambda item: (-item[0], item[1]))
+        listas.append(
+            RecomendacaoCoCompra(
+                produto_id=a,
+                vizinhos=[[b, pontuacao] for pontuacao, b in pontuados[:top_k]],
+            )
+        )
+    RecomendacaoCoCompra.objects.filter(produto_id__in=produtos).delete()
+    RecomendacaoCoCompra.objects.bulk_create(listas, batch_size=500)
+    return len(listas)
+
+
+def _marcar_processados(pedido_ids, ultimo):
+    from core.models import PedidoCoCompra
+
+    PedidoCoCompra.objects.bulk_create(
+        (PedidoCoCompra(pedido_id=pedido_id) for pedido_id in pedido_ids),
+        batch_size=500,
+    )
+    # Abaixo da janela da próxima execução não precisam mais ficar.
+    PedidoCoCompra.objects.filter(pedido_id__lte=ultimo - JANELA_PEDIDOS).delete()
+
+
+@transaction.atomic
+def atualizar(do_zero=False, top_k=TOP_K):
+    """
+    Processa os pedidos novos, inclusive os gravados fora de ordem dentro
+    da janela. Com ``do_zero``, apaga a matriz e relê o histórico inteiro
+    (único jeito de descontar sub-pedidos cancelados depois de lidos).
+    Retorna o ``ProcessamentoCoCompra`` registrado (ou ``None`` se não
+    havia pedidos novos).
+    """
+    from core.models import (
+        CoCompra,
+        PedidoCoCompra,
+        ProcessamentoCoCompra,
+        RecomendacaoCoCompra,
+    )
+
+    if do_zero:
+        CoCompra.objects.all().delete()
+        RecomendacaoCoCompra.objects.all().delete()
+        ProcessamentoCoCompra.objects.all().delete()
+        PedidoCoCompra.objects.all().delete()
+
+    anterior = ProcessamentoCoCompra.objects.first()
+    marca = anterior.ultimo_pedido_id if anterior else 0
+    contagens, pedido_ids = _pares_novos(max(marca - JANELA_PEDIDOS, 0))
+    if not pedido_ids:
+        return None
+
+    ultimo = max(marca, pedido_ids[-1])
+    _marcar_processados(pedido_ids, ultimo)
+    produtos = _somar_na_matriz(contagens)
+    atualizados = _regravar_listas(produtos, top_k)
+    return ProcessamentoCoCompra.objects.create(
+        ultimo_pedido_id=ultimo,
+        pedidos_processados=len(pedido_ids),
+        produtos_atualizados=atualizados,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Leitura
+# ---------------------------------------------------------------------------
+
+
+def _disponiveis_na_ordem(ids, limite):
+    from core.models import Produto
+
+    # Folga para os que estiverem sem estoque.
+    ids = ids[: limite * 3]
+    if not ids:
+        return []
+    produtos = Produto.objects.disponiveis().in_bulk(ids)
+    return [produtos[pk] for pk in ids if pk in produtos][:limite]
+
+
+def quem_comprou_tambem(produto, limite=4):
+    """Vizinhos disponíveis de um produto, do mais para o menos parecido."""
+    from core.models import RecomendacaoCoCompra
+
+    vizinhos = (
+        RecomendacaoCoCompra.objects.filter(pk=produto.pk)
+        .values_list("vizinhos", flat=True)
+        .first()
+    )
+    return _disponiveis_na_ordem([pk for pk, _ in vizinhos or []], limite)
+
+
+def para_carrinho(produto_ids, limite=4):
+    """
+    Recomendações para um carrinho: soma as pontuações dos vizinhos de
+    todos os produtos dele e tira os que já estão no carrinho.
+    """
+    from core.models import RecomendacaoCoCompra
+
+    produto_ids = set(produto_ids)
+    if not produto_ids:
+        return []
+    pontuacoes = Counter()
+    for vizinhos in RecomendacaoCoCompra.objects.filter(
+        pk__in=produto_ids
+    ).values_list("vizinhos", flat=True):
+        for pk, pontuacao in vizinhos:
+            if pk not in produto_ids:
+                pontuacoes[pk] += pontuacao
+    ordenados = sorted(pontuacoes, key=lambda pk: (-pontuacoes[pk], pk))
+    return _disponiveis_na_ordem(ordenados, limite)
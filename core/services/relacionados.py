@@ -0,0 +1,147 @@
+"""
+Produtos relacionados pré-calculados (``ProdutoRelacionado``).
+
+``recalcular()`` roda em lote (comando ``recalcular_relacionados``) e
+pontua, para cada produto ativo, um conjunto limitado de candidatos:
+
+* produtos comprados no mesmo pedido (sinal mais forte);
+* os mais vendidos da mesma categoria e do mesmo vendedor;
+* um pouco de popularidade (unidades vendidas) para desempatar.
+
+Guarda os ``TOP_K`` melhores de cada produto. A página de detalhe faz uma
+só consulta pelo índice ``(produto, -pontuacao)`` e descarta na hora os
+que estão sem estoque ou inativos.
+"""
+
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import combinations, groupby
+from operator import itemgetter
+
+from django.db import transaction
+
+TOP_K = 12
+PESO_COMPRA_CONJUNTA = 3.0
+PESO_CATEGORIA = 1.0
+PESO_VENDEDOR = 0.5
+PESO_POPULARIDADE = 0.5
+# Quantos mais vendidos de cada categoria/vendedor entram como candidatos.
+CANDIDATOS_POR_GRUPO = 3 * TOP_K
+
+
+def compras_conjuntas():
+    """
+    ``(pares, vendas)``: quantos pedidos tiveram cada par de produtos e
+    quantas unidades de cada produto foram vendidas. Sub-pedidos
+    cancelados ficam de fora.
+    """
+    from core.models import ItemPedido, PedidoVendedor
+
+    linhas = (
+        ItemPedido.objects.filter(produto__isnull=False)
+        .exclude(sub_pedido__status=PedidoVendedor.StatusPedidoVendedor.CANCELADO)
+        .order_by("sub_pedido__pedido_principal_id")
+        .values_list("sub_pedido__pedido_principal_id", "produto_id", "quantidade")
+    )
+    pares = defaultdict(Counter)
+    vendas = Counter()
+    for _, itens in groupby(linhas.iterator(), key=itemgetter(0)):
+        produtos = set()
+        for _, produto_id, quantidade in itens:
+            produtos.add(produto_id)
+            vendas[produto_id] += quantidade
+        for a, b in combinations(produtos, 2):
+            pares[a][b] += 1
+            pares[b][a] += 1
+    return pares, vendas
+
+
+def _mais_vendidos_por(grupo, produtos, vendas):
+    por_grupo = defaultdict(list)
+    for pk, categoria_id, vendedor_id in produtos:
+        chave = categoria_id if grupo == "categoria" else vendedor_id
+        if chave is not None:
+            por_grupo[chave].append(pk)
+    return {
+        chave: heapq.nlargest(
+            CANDIDATOS_POR_GRUPO, pks, key=lambda pk: (vendas[pk], pk)
+        )
+        for chave, pks in por_grupo.items()
+    }
+
+
+def pontuar(top_k=TOP_K):
+    """``{produto_id: [(relacionado_id, pontuacao), ...]}`` do maior para o menor."""
+    from core.models import Produto
+
+    produtos = list(
+        Produto.objects.filter(ativo=True).values_list(
+            "pk", "categoria_id", "vendedor_id"
+        )
+    )
+    dados = {pk: (categoria, vendedor) for pk, categoria, vendedor in produtos}
+    pares, vendas = compras_conjuntas()
+    maximo_vendas = max(vendas.values(), default=0) or 1
+    por_categoria = _mais_vendidos_por("categoria", produtos, vendas)
+    por_vendedor = _mais_vendidos_por("vendedor", produtos, vendas)
+
+    resultado = {}
+    for pk, (categoria_id, vendedor_id) in dados.items():
+        conjuntas = pares.get(pk, {})
+        candidatos = set(conjuntas)
+        candidatos.update(por_categoria.get(categoria_id, ()))
+        candidatos.update(por_vendedor.get(vendedor_id, ()))
+        candidatos.discard(pk)
+
+        pontuados = []
+        for candidato in candidatos:
+            if candidato not in dados:
+                continue  # inativo
+            cand_categoria, cand_vendedor = dados[candidato]
+            pontuacao = PESO_COMPRA_CONJUNTA * math.log1p(
+                conjuntas.get(candidato, 0)
+            )
+            if categoria_id is not None and cand_categoria == categoria_id:
+                pontuacao += PESO_CATEGORIA
+            if cand_vendedor == vendedor_id:
+                pontuacao += PESO_VENDEDOR
+            pontuacao += PESO_POPULARIDADE * vendas[candidato] / maximo_vendas
+            pontuados.append((pontuacao, candidato))
+
+        melhores = heapq.nlargest(top_k, pontuados)
+        resultado[pk] = [(candidato, pontuacao) for pontuacao, candidato in melhores]
+    return resultado
+
+
+@transaction.atomic
+def recalcular(top_k=TOP_K):
+    """Regrava a tabela inteira. Retorna quantas linhas foram gravadas."""
+    from core.models import ProdutoRelacionado
+
+    linhas = [
+        ProdutoRelacionado(
+            produto_id=pk, relacionado_id=relacionado, pontuacao=pontuacao
+        )
+        for pk, relacionados in pontuar(top_k).items()
+        for relacionado, pontuacao in relacionados
+    ]
+    ProdutoRelacionado.objects.all().delete()
+    ProdutoRelacionado.objects.bulk_create(linhas, batch_size=1000)
+    return len(linhas)
+
+
+def relacionados_de(produto, limite=4):
+    """Relacionados disponíveis de ``produto``, numa consulta só."""
+    from core.models import ProdutoRelacionado
+
+    linhas = (
+        ProdutoRelacionado.objects.filter(
+            produto=produto,
+            relacionado__ativo=True,
+            relacionado__quantidade_estoque__gt=0,
+        )
+        .select_related("relacionado")
+        .order_by("-pontuacao")[:limite]
+    )
+    return [linha.relacionado for linha in linhas]
@@ -0,0 +1,226 @@
+"""
+Reservas de estoque com prazo (``ReservaEstoque``).
+
+Quando um item entra no carrinho, as unidades ficam seguradas para o
+dono do carrinho por ``DURACAO``: o estoque que os outros enxergam é
+``quantidade_estoque`` menos as reservas ativas dos demais. Uma reserva
+vencida para de contar sozinha (as consultas filtram por ``expira_em``),
+sem tarefa de limpeza; o comando ``limpar_reservas`` só apaga as linhas
+velhas.
+
+Cada reserva trava apenas a linha do item, e só enquanto soma as
+reservas e grava a sua. No checkout, quem já tem a reserva não disputa
+o estoque com ninguém; ``confirmar`` só renova o prazo e refaz as que
+venceram.
+"""
+
+from datetime import timedelta
+from uuid import uuid4
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from core.services.estoque import EstoqueInsuficiente
+
+DURACAO = timedelta(minutes=15)
+CHAVE_SESSAO = "reserva_dono"
+
+
+def dono_da_sessao(session):
+    """Token do carrinho da sessão; continua o mesmo depois do login."""
+    dono = session.get(CHAVE_SESSAO)
+    if not dono:
+        dono = f"sessao:{uuid4().hex}"
+        session[CHAVE_SESSAO] = dono
+    return dono
+
+
+def dono_do_perfil(perfil):
+    return f"perfil:{perfil.pk}"
+
+
+def _ativas():
+    from core.models import ReservaEstoque
+
+    return ReservaEstoque.objects.filter(expira_em__gt=timezone.now())
+
+
+def reservado_por_outros(objeto, dono):
+    total = (
+        _ativas()
+        .filter(**{f"{objeto.tipo_item}_id": objeto.pk})
+        .exclude(dono=dono)
+        .aggregate(total=Sum("quantidade"))["total"]
+    )
+    return total or 0
+
+
+def disponivel(objeto, dono=None):
+    """Estoque que ``dono`` ainda pode pôr no carrinho."""
+    return objeto.quantidade_estoque - reservado_por_outros(objeto, dono)
+
+
+@transaction.atomic
+def reservar(dono, objeto, quantidade):
+    """
+    Segura ``quantidade`` unidades de ``objeto`` (o total do item no
+    carrinho, não um acréscimo) por ``DURACAO``. Levanta
+    ``EstoqueInsuficiente`` com o que ainda dá para reservar.
+
+    Pacotes em venda relâmpago não reservam: só conferem o saldo do
+    cache, e quem pagar primeiro leva.
+    """
+    from core.models import ReservaEstoque
+    from core.services import venda_relampago
+
+    if venda_relampago.ativo(objeto):
+        livre = venda_relampago.saldo(objeto)
+        if quantidade > livre:
+            raise EstoqueInsuficiente(objeto, livre)
+        return
+
+    estoque = (
+        type(objeto)
+        .objects.select_for_update()
+        .values_list("quantidade_estoque", flat=True)
+        .get(pk=objeto.pk)
+    )
+    livre = max(estoque - reservado_por_outros(objeto, dono), 0)
+    if quantidade > livre:
+        raise EstoqueInsuficiente(objeto, livre)
+
+    # A trava acima já serializa reservas do mesmo item: basta tentar o
+    # UPDATE e inserir se não havia reserva.
+    campos = {"quantidade": quantidade, "expira_em": timezone.now() + DURACAO}
+    minha = ReservaEstoque.objects.filter(dono=dono, **{objeto.tipo_item: objeto})
+    if not minha.update(**campos):
+        ReservaEstoque.objects.create(dono=dono, **{objeto.tipo_item: objeto}, **campos)
+
+
+@transaction.atomic
+def reservar_lote(dono, itens):
+    """
+    ``reservar`` para vários itens ``[(objeto, quantidade)]`` de uma vez:
+    uma trava por tabela, uma soma das reservas dos outros, e as reservas
+    de ``dono`` gravadas com ``bulk_update``/``bulk_create``. Se algum item
+    não couber, levanta ``EstoqueInsuficiente`` e nada é reservado.
+    """
+    from core.models import ReservaEstoque
+    from core.services import venda_relampago
+
+    no_banco = []
+    for objeto, quantidade in itens:
+        if venda_relampago.ativo(objeto):
+            livre = venda_relampago.saldo(objeto)
+            if quantidade > livre:
+                raise EstoqueInsuficiente(objeto, livre)
+        else:
+            no_banco.append((objeto, quantidade))
+    if not no_banco:
+        return
+
+    por_tipo = {}
+    for objeto, _ in no_banco:
+        por_tipo.setdefault(objeto.tipo_item, (type(objeto), []))[1].append(objeto.pk)
+    estoques = {}
+    for tipo, (model, pks) in por_tipo.items():
+        for pk, estoque in (
+            model.objects.select_for_update()
+            .filter(pk__in=pks)
+            .values_list("pk", "quantidade_estoque")
+        ):
+            estoques[(tipo, pk)] = estoque
+
+    filtro = _filtro_itens((objeto.tipo_item, objeto.pk) for objeto, _ in no_banco)
+    dos_outros = {}
+    for produto_id, pacote_id, total in (
+        _ativas()
+        .filter(filtro)
+        .exclude(dono=dono)
+        .order_by()
+        .values("produto_id", "pacote_id")
+        .annotate(total=Sum("quantidade"))
+        .values_list("produto_id", "pacote_id", "total")
+    ):
+        item = ("produto", produto_id) if produto_id else ("pacote", pacote_id)
+        dos_outros[item] = dos_outros.get(item, 0) + total
+
+    for objeto, quantidade in no_banco:
+        item = (objeto.tipo_item, objeto.pk)
+        livre = max(estoques.get(item, 0) - dos_outros.get(item, 0), 0)
+        if quantidade > livre:
+            raise EstoqueInsuficiente(objeto, livre)
+
+    expira_em = timezone.now() + DURACAO
+    minhas = {
+        ("produto", r.produto_id) if r.produto_id else ("pacote", r.pacote_id): r
+        for r in ReservaEstoque.objects.filter(dono=dono).filter(filtro)
+    }
+    novas, alteradas = [], []
+    for objeto, quantidade in no_banco:
+        reserva = minhas.get((objeto.tipo_item, objeto.pk))
+        if reserva is None:
+            novas.append(
+                ReservaEstoque(
+                    dono=dono,
+                    quantidade=quantidade,
+                    expira_em=expira_em,
+                    **{objeto.tipo_item: objeto},
+                )
+            )
+        else:
+            reserva.quantidade = quantidade
+            reserva.expira_em = expira_em
+            alteradas.append(reserva)
+    if alteradas:
+        ReservaEstoque.objects.bulk_update(alteradas, ["quantidade", "expira_em"])
+    if novas:
+        ReservaEstoque.objects.bulk_create(novas)
+
+
+def _filtro_itens(itens):
+    por_tipo = {"produto": [], "pacote": []}
+    for tipo, pk in itens:
+        por_tipo[tipo].append(pk)
+    return Q(produto_id__in=por_tipo["produto"]) | Q(pacote_id__in=por_tipo["pacote"])
+
+
+def liberar(dono, itens=None):
+    """Apaga as reservas de ``dono`` (só as de ``itens`` ``[(tipo, id)]``, se vier)."""
+    from core.models import ReservaEstoque
+
+    reservas = ReservaEstoque.objects.filter(dono=dono)
+    if itens is not None:
+        reservas = reservas.filter(_filtro_itens(itens))
+    reservas.delete()
+
+
+@transaction.atomic
+def confirmar(dono, linhas):
+    """
+    Garante, no checkout, que cada linha do carrinho está reservada:
+    renova o prazo das reservas ativas numa consulta e refaz só as que
+    venceram ou não cobrem a quantidade. Levanta ``EstoqueInsuficiente``.
+    """
+    ativas = _ativas().filter(dono=dono)
+    cobertas = {
+        ("produto" if produto_id else "pacote", produto_id or pacote_id): quantidade
+        for produto_id, pacote_id, quantidade in ativas.values_list(
+            "produto_id", "pacote_id", "quantidade"
+        )
+    }
+    ativas.update(expira_em=timezone.now() + DURACAO)
+    for linha in linhas:
+        if cobertas.get((linha.tipo, linha.objeto.pk), 0) < linha.quantidade:
+            reservar(dono, linha.objeto, linha.quantidade)
+
+
+def limpar_vencidas():
+    """Apaga reservas vencidas. Retorna quantas foram apagadas."""
+    from core.models import ReservaEstoque
+
+    apagadas, _ = ReservaEstoque.objects.filter(
+        expira_em__lte=timezone.now()
+    ).delete()
+    return apagadas
@@ -0,0 +1,212 @@
+"""
+Sugestões de busca enquanto o usuário digita (``/api/produto/sugestoes/``).
+
+Cada processo mantém em memória uma lista ordenada de chaves normalizadas
+(nomes de produtos disponíveis, categorias e ``nome_negocio`` dos
+vendedores, a partir de cada palavra) e responde por prefixo com
+``bisect``, sem tocar no banco. O índice é remontado quando a versão
+``"sugestoes"`` muda (signals em ``core.signals``) ou quando passa de
+``IDADE_MAXIMA`` segundos.
+
+A versão só sobe quando muda o que está no índice: o nome de um produto
+ou se ele está disponível (ver ``estado_produto``). Vendas, preço e
+descrição não mexem nele. Quando o índice fica velho, uma thread do
+processo remonta e as outras continuam respondendo com o anterior; só a
+primeira consulta do processo espera a montagem.
+"""
+
+import bisect
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.urls import reverse
+
+from core.services.busca import normalizar
+from core.services.versoes import versao
+
+NOME_VERSAO = "sugestoes"
+
+# Tempo máximo (s) que um índice montado é usado, mesmo sem mudança de versão.
+IDADE_MAXIMA = 300
+LIMITE_PADRAO = 8
+LIMITE_MAXIMO = 20
+# Quantas chaves com o prefixo são examinadas no máximo por consulta.
+LIMITE_VARREDURA = 200
+
+# Em caso de empate, categorias e vendedores aparecem antes dos produtos.
+ORDEM_TIPOS = {"categoria": 0, "vendedor": 1, "produto": 2}
+
+
+def _chave(texto):
+    return " ".join(normalizar(texto).split())
+
+
+class IndicePrefixos:
+    """Lista ordenada de ``(chave, posicao_da_palavra, sugestao)``."""
+
+    def __init__(self, sugestoes):
+        entradas = []
+        for sugestao in sugestoes:
+            palavras = _chave(sugestao["texto"]).split(" ")
+            for posicao in range(len(palavras)):
+                chave = " ".join(palavras[posicao:])
+                if chave:
+                    entradas.append((chave, posicao, sugestao))
+        entradas.sort(key=lambda entrada: entrada[0])
+        self.chaves = [entrada[0] for entrada in entradas]
+        self.entradas = entradas
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def buscar(self, termo, limite=LIMITE_PADRAO):
+        prefixo = _chave(termo)
+        if not prefixo:
+            return []
+
+        melhores = {}
+        inicio = bisect.bisect_left(self.chaves, prefixo)
+        for chave, posicao, sugestao in self.entradas[
+            inicio : inicio + LIMITE_VARREDURA
+        ]:
+            if not chave.startswith(prefixo):
+                break
+            # Casar no começo do texto vale mais que casar no meio.
+            rank = (
+                posicao > 0,
+                ORDEM_TIPOS[sugestao["tipo"]],
+                len(sugestao["texto"]),
+                sugestao["texto"],
+            )
+            identidade = (sugestao["tipo"], sugestao["id"])
+            if identidade not in melhores or rank < melhores[identidade][0]:
+                melhores[identidade] = (rank, sugestao)
+
+        ordenadas = sorted(melhores.values(), key=lambda item: item[0])
+        return [sugestao for _, sugestao in ordenadas[:limite]]
+
+
+def carregar_sugestoes():
+    """Tudo que entra no índice, lido do banco em três consultas."""
+    from core.models import CategoriaProduto, Perfil, Produto
+
+    sugestoes = []
+    url_produtos = reverse("core:produtos")
+    for pk, nome, slug in CategoriaProduto.objects.values_list("pk", "nome", "slug"):
+        sugestoes.append(
+            {
+                "tipo": "categoria",
+                "id": pk,
+                "texto": nome,
+                "url": f"{url_produtos}?{urlencode({'categoria': slug})}",
+            }
+        )
+    vendedores = (
+        Perfil.objects.filter(tipo=Perfil.TipoUsuario.VENDEDOR)
+        .exclude(nome_negocio__isnull=True)
+        .exclude(nome_negocio="")
+        .values_list("pk", "nome_negocio")
+    )
+    for pk, nome in vendedores:
+        sugestoes.append(
+            {
+                "tipo": "vendedor",
+                "id": pk,
+                "texto": nome,
+                "url": reverse("core:vendedor_perfil", args=[pk]),
+            }
+        )
+    for pk, nome in Produto.objects.disponiveis().values_list("pk", "nome"):
+        sugestoes.append(
+            {
+                "tipo": "produto",
+                "id": pk,
+                "texto": nome,
+                "url": reverse("core:produto_detalhe", args=[pk]),
+            }
+        )
+    return sugestoes
+
+
+CAMPOS_PRODUTO = ("nome", "ativo", "quantidade_estoque")
+
+
+def _estado_produto(nome, ativo, quantidade_estoque):
+    return nome, bool(ativo and quantidade_estoque > 0)
+
+
+def estado_produto(produto):
+    """
+    ``(nome, disponível)``: o que o índice usa de um produto, ou ``None``
+    se algum desses campos foi adiado.
+    """
+    if produto.get_deferred_fields() & set(CAMPOS_PRODUTO):
+        return None
+    return _estado_produto(*(getattr(produto, campo) for campo in CAMPOS_PRODUTO))
+
+
+def estado_no_banco(produto_id):
+    from core.models import Produto
+
+    linha = Produto.objects.filter(pk=produto_id).values_list(*CAMPOS_PRODUTO).first()
+    return _estado_produto(*linha) if linha else None
+
+
+def mudou(antes, depois):
+    """
+    Se a troca de ``antes`` por ``depois`` (``estado_produto``; ``None`` =
+    inexistente) muda o índice. Produto indisponível não está no índice.
+    """
+    if not (antes and antes[1]) and not (depois and depois[1]):
+        return False
+    return antes != depois
+
+
+# ---------------------------------------------------------------------------
+# Índice do processo
+# ---------------------------------------------------------------------------
+
+_trava = threading.Lock()
+_estado = {"indice": None, "versao": None, "montado_em": 0.0}
+
+
+def _atualizado(atual):
+    return (
+        _estado["indice"] is not None
+        and _estado["versao"] == atual
+        and time.monotonic() - _estado["montado_em"] < IDADE_MAXIMA
+    )
+
+
+def obter_indice():
+    """
+    Índice do processo, remontado se a versão mudou ou se expirou. Se já
+    há um índice, quem não conseguir a trava na hora usa o velho em vez
+    de esperar a remontagem.
+    """
+    atual = versao(NOME_VERSAO)
+    if _atualizado(atual):
+        return _estado["indice"]
+
+    velho = _estado["indice"]
+    if not _trava.acquire(blocking=velho is None):
+        return velho
+    try:
+        # Outra thread pode ter remontado enquanto esperávamos a trava.
+        if not _atualizado(atual):
+            _estado["indice"] = IndicePrefixos(carregar_sugestoes())
+            _estado["versao"] = atual
+            _estado["montado_em"] = time.monotonic()
+        return _estado["indice"]
+    finally:
+        _trava.release()
+
+
+def descartar_indice():
+    """Força a remontagem na próxima consulta deste processo."""
+    _estado["indice"] = None
+
+
+def sugerir(termo, limite=LIMITE_PADRAO):
+    return obter_indice().buscar(termo, limite)
@@ -0,0 +1,181 @@
+"""
+Busca aproximada por trigramas (``TrigramaBusca``).
+
+Cada nome é normalizado (sem acento, minúsculo) e quebrado em trigramas
+no estilo do ``pg_trgm``: cada palavra ganha dois espaços à esquerda e um
+à direita, então ``"pão"`` vira ``"  p", " pa", "pao", "ao "``.
+
+A nota de cada nome é a fração dos trigramas do termo que aparecem nele
+(parecido com o ``word_similarity`` do ``pg_trgm``: "qeijo" acha "Queijo
+minas"); empates são resolvidos pela similaridade de Jaccard, que
+favorece nomes mais curtos. Tudo é calculado no banco a partir do índice
+``(tipo, trigrama)``, sem varrer as tabelas de origem.
+
+Usada como plano B quando a busca exata não encontra nada.
+"""
+
+import re
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast
+
+from core.services.busca import sem_resultados, normalizar
+
+# Fração mínima dos trigramas do termo que o nome precisa ter (0 a 1).
+LIMIAR = 0.5
+# Só para ``parecidos`` (consulta direta ao índice); ``ranquear_aproximado``
+# não corta resultados.
+LIMITE_RESULTADOS = 50
+# Termos muito longos não melhoram o resultado e deixam o IN enorme.
+MAX_TRIGRAMAS = 60
+
+MODELOS = {
+    "produto": "Produto",
+    "pacote": "PacoteSurpresa",
+    "receita": "Receita",
+}
+
+
+def trigramas(texto):
+    conjunto = set()
+    for palavra in re.findall(r"\w+", normalizar(texto)):
+        preenchida = f"  {palavra} "
+        conjunto.update(
+            preenchida[i : i + 3] for i in range(len(preenchida) - 2)
+        )
+    return conjunto
+
+
+def tipo_do_modelo(model):
+    nome = model._meta.object_name
+    return next(tipo for tipo, modelo in MODELOS.items() if modelo == nome)
+
+
+# ---------------------------------------------------------------------------
+# Escrita
+# ---------------------------------------------------------------------------
+
+
+def _linhas(TrigramaBusca, tipo, objeto_id, nome):
+    conjunto = trigramas(nome)
+    return [
+        TrigramaBusca(
+            tipo=tipo,
+            objeto_id=objeto_id,
+            trigrama=trigrama,
+            total_trigramas=len(conjunto),
+        )
+        for trigrama in sorted(conjunto)
+    ]
+
+
+def indexar(tipo, objeto_id, nome):
+    """Regrava os trigramas do objeto, só se o nome mudou."""
+    from core.models import TrigramaBusca
+
+    existentes = TrigramaBusca.objects.filter(tipo=tipo, objeto_id=objeto_id)
+    if set(existentes.values_list("trigrama", flat=True)) == trigramas(nome):
+        return
+    with transaction.atomic():
+        existentes.delete()
+        TrigramaBusca.objects.bulk_create(
+            _linhas(TrigramaBusca, tipo, objeto_id, nome)
+        )
+
+
+def remover(tipo, objeto_id):
+    from core.models import TrigramaBusca
+
+    TrigramaBusca.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+@transaction.atomic
+def reconstruir(apps=global_apps):
+    """Apaga e recria os trigramas de todos os nomes. Retorna ``{tipo: total}``."""
+    TrigramaBusca = apps.get_model("core", "TrigramaBusca")
+
+    TrigramaBusca.objects.all().delete()
+    totais = {}
+    for tipo, modelo in MODELOS.items():
+        nomes = apps.get_model("core", modelo).objects.values_list("pk", "nome")
+        lote, total = [], 0
+        for pk, nome in nomes.iterator():
+            lote.extend(_linhas(TrigramaBusca, tipo, pk, nome))
+            total += 1
+            if len(lote) >= 5000:
+                TrigramaBusca.objects.bulk_create(lote)
+                lote = []
+        TrigramaBusca.objects.bulk_create(lote)
+        totais[tipo] = total
+    return totais
+
+
+# ---------------------------------------------------------------------------
+# Consulta
+# ---------------------------------------------------------------------------
+
+
+def _pontuados(tipo, do_termo):
+    """
+    Objetos com algum trigrama do termo, agrupados por ``objeto_id`` e
+    anotados com ``similaridade`` e ``jaccard``. Lê só o índice
+    ``(tipo, trigrama)``.
+    """
+    from core.models import TrigramaBusca
+
+    comuns = Cast(F("comuns"), FloatField())
+    total_termo = Value(float(len(do_termo)))
+    return (
+        TrigramaBusca.objects.filter(tipo=tipo, trigrama__in=do_termo)
+        .values("objeto_id", "total_trigramas")
+        .annotate(comuns=Count("pk"))
+        .annotate(
+            similaridade=comuns / total_termo,
+            jaccard=comuns / (total_termo + F("total_trigramas") - comuns),
+        )
+    )
+
+
+def _do_termo(termo):
+    return sorted(trigramas(termo))[:MAX_TRIGRAMAS]
+
+
+def parecidos(tipo, termo, limite=LIMITE_RESULTADOS, limiar=LIMIAR):
+    """``[(objeto_id, similaridade), ...]`` do mais para o menos parecido."""
+    do_termo = _do_termo(termo)
+    if not do_termo:
+        return []
+
+    linhas = (
+        _pontuados(tipo, do_termo)
+        .filter(similaridade__gte=limiar)
+        .order_by("-similaridade", "-jaccard", "objeto_id")
+        .values_list("objeto_id", "similaridade")
+    )
+    return list(linhas[:limite])
+
+
+def ranquear_aproximado(queryset, termo, limiar=LIMIAR):
+    """
+    Como ``busca.ranquear``: filtra ``queryset`` pelos nomes parecidos com
+    ``termo`` e anota ``relevancia`` com a similaridade.
+
+    Filtro e nota são subconsultas no próprio SQL do queryset (a nota,
+    correlacionada pelo id da linha): disponibilidade e filtros da vitrine
+    valem junto com a similaridade, sem um corte de resultados antes deles.
+    """
+    do_termo = _do_termo(termo)
+    if not do_termo:
+        return sem_resultados(queryset)
+
+    casam = _pontuados(tipo_do_modelo(queryset.model), do_termo).filter(
+        similaridade__gte=limiar
+    )
+    similaridade = casam.filter(objeto_id=OuterRef("pk")).values("similaridade")[:1]
+    return (
+        queryset.filter(pk__in=casam.values("objeto_id"))
+        .annotate(relevancia=Subquery(similaridade, output_field=FloatField()))
+        .order_by("-relevancia", "-pk")
+    )
@@ -0,0 +1,341 @@
+"""
+Modo "venda relâmpago" dos pacotes surpresa (``PacoteSurpresa.venda_relampago``).
+
+Pacotes esgotam em minutos, e com estoque no banco todo comprador
+disputa a trava da mesma linha. Com o modo ligado, quem libera ou barra
+a compra é um contador atômico no cache (``decr`` vira ``DECRBY`` no
+Redis), sem trava de linha nem ``ReservaEstoque``. Dois contadores por
+pacote:
+
+* ``saldo``: unidades que ainda podem ser vendidas;
+* ``vendidos``: vendas com pedido gravado que ainda não saíram de
+  ``quantidade_estoque``.
+
+``descarregar()`` (comando ``descarregar_relampago``, periódico) leva os
+``vendidos`` ao banco com um ``UPDATE ... CASE`` por lote, como em
+``core.services.visualizacoes``.
+
+O esperado é ``saldo + vendidos == quantidade_estoque``. Um pedido
+desfeito depois do débito devolve o saldo (``devolver_se_desfeito``, em
+volta dos checkouts); um processo que cai no meio, um despejo do cache
+ou uma edição concorrente ainda quebram a conta, e ``reconciliar()``
+(comando ``reconciliar_relampago``) acha a diferença e corrige o saldo. Saldo acima do esperado (risco de
+vender o que não existe) é corrigido na hora; abaixo, só quando a falta
+aparece em duas rodadas seguidas, porque um checkout ainda aberto (saldo
+já debitado, ``vendidos`` só depois do commit) tem a mesma cara.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from core.services.contadores import incrementar
+from core.services.estoque import EstoqueInsuficiente
+
+TAMANHO_LOTE = 500
+# Tempo máximo (s) que uma descarga ou reconciliação segura a trava.
+TIMEOUT_TRAVA = 300
+
+CHAVE_SALDO = "relampago:saldo:{}"
+CHAVE_VENDIDOS = "relampago:vendidos:{}"
+CHAVE_FALTA = "relampago:falta:{}"
+CHAVE_TRAVA = "relampago:trava"
+
+# Débitos ainda não confirmados do ``devolver_se_desfeito`` aberto nesta
+# thread: ``[[pacote, quantidade], ...]``.
+_local = threading.local()
+
+
+def ativo(objeto):
+    """O item usa o saldo do cache em vez do estoque do banco?"""
+    return getattr(objeto, "venda_relampago", False)
+
+
+def _estoque_no_banco(pacote_id):
+    from core.models import PacoteSurpresa
+
+    return (
+        PacoteSurpresa.objects.filter(pk=pacote_id)
+        .values_list("quantidade_estoque", flat=True)
+        .first()
+    ) or 0
+
+
+def _iniciar_saldo(pacote_id):
+    """Cria o saldo a partir do banco, se ainda não existe (ativação, despejo)."""
+    vendidos = cache.get(CHAVE_VENDIDOS.format(pacote_id)) or 0
+    cache.add(
+        CHAVE_SALDO.format(pacote_id), _estoque_no_banco(pacote_id) - vendidos, None
+    )
+
+
+# ---------------------------------------------------------------------------
+# Venda
+# ---------------------------------------------------------------------------
+
+
+def saldo(pacote):
+    """Unidades de ``pacote`` ainda à venda."""
+    valor = cache.get(CHAVE_SALDO.format(pacote.pk))
+    if valor is None:
+        _iniciar_saldo(pacote.pk)
+        valor = cache.get(CHAVE_SALDO.format(pacote.pk)) or 0
+    return max(valor, 0)
+
+
+def debitar(pacote, quantidade):
+    """
+    Tira ``quantidade`` do saldo, ou levanta ``EstoqueInsuficiente`` sem
+    tirar nada. A venda só passa a contar em ``vendidos`` quando a
+    transação em volta confirmar; se ela for desfeita, quem devolve o
+    saldo é ``devolver_se_desfeito``.
+    """
+    chave = CHAVE_SALDO.format(pacote.pk)
+    try:
+        restante = cache.decr(chave, quantidade)
+    except ValueError:
+        _iniciar_saldo(pacote.pk)
+        restante = cache.decr(chave, quantidade)
+    if restante < 0:
+        cache.incr(chave, quantidade)
+        raise EstoqueInsuficiente(pacote, max(restante + quantidade, 0))
+
+    pendentes = getattr(_local, "pendentes", None)
+    if pendentes is not None:
+        pendentes.append([pacote, quantidade])
+
+    def confirmar():
+        _esquecer_pendente(pacote, quantidade)
+        incrementar(CHAVE_VENDIDOS.format(pacote.pk), quantidade)
+
+    transaction.on_commit(confirmar)
+
+
+def _esquecer_pendente(pacote, quantidade):
+    pendentes = getattr(_local, "pendentes", None)
+    if pendentes and [pacote, quantidade] in pendentes:
+        pendentes.remove([pacote, quantidade])
+
+
+def devolver(pacote, quantidade):
+    """Desfaz um ``debitar`` cuja venda não vai acontecer."""
+    _esquecer_pendente(pacote, quantidade)
+    try:
+        cache.incr(CHAVE_SALDO.format(pacote.pk), quantidade)
+    except ValueError:
+        # Sem saldo no cache: o próximo acesso recalcula a partir do banco.
+        pass
+
+
+@contextmanager
+def devolver_se_desfeito():
+    """
+    Em volta da transação de um checkout, por fora do ``atomic``. O saldo
+    do cache não volta sozinho num rollback: o que ``debitar`` tirou dentro
+    do bloco é devolvido se o bloco levantar uma exceção ou se a transação
+    terminar sem confirmar (``set_rollback``, savepoint desfeito, erro no
+    commit). Aberto dentro de uma transação de fora (testes, chamadas
+    aninhadas), só a exceção conta: a confirmação é de quem abriu a de fora.
+    """
+    anteriores = getattr(_local, "pendentes", None)
+    pendentes = _local.pendentes = []
+    por_fora = not transaction.get_connection().in_atomic_block
+    try:
+        yield
+    except BaseException:
+        _devolver_pendentes(pendentes)
+        raise
+    else:
+        # Confirmados saíram da lista no on_commit.
+        if por_fora:
+            _devolver_pendentes(pendentes)
+        elif anteriores is not None:
+            anteriores.extend(pendentes)
+    finally:
+        _local.pendentes = anteriores
+
+
+def _devolver_pendentes(pendentes):
+    for pacote, quantidade in list(pendentes):
+        devolver(pacote, quantidade)
+
+
+# ---------------------------------------------------------------------------
+# Descarga
+# ---------------------------------------------------------------------------
+
+
+def _ids_ativos():
+    from core.models import PacoteSurpresa
+
+    return list(
+        PacoteSurpresa.objects.filter(venda_relampago=True).values_list("pk", flat=True)
+    )
+
+
+def _vendidos(pacote_ids):
+    chaves = {pk: CHAVE_VENDIDOS.format(pk) for pk in pacote_ids}
+    valores = cache.get_many(list(chaves.values()))
+    return {pk: valores.get(chave) or 0 for pk, chave in chaves.items()}
+
+
+@transaction.atomic
+def _gravar(contagens):
+    from core.models import PacoteSurpresa
+    from core.services import estoque
+
+    # Só quem tinha estoque antes da descarga pode ter esgotado agora: um
+    # pacote que já estava em 0 (edição do vendedor) não sai das facetas
+    # de novo.
+    com_estoque = list(
+        PacoteSurpresa.objects.select_for_update()
+        .filter(pk__in=list(contagens), quantidade_estoque__gt=0)
+        .values_list("pk", flat=True)
+    )
+    # update() em vez de save(): não dispara os signals do catálogo.
+    PacoteSurpresa.objects.filter(pk__in=list(contagens)).update(
+        quantidade_estoque=Greatest(
+            F("quantidade_estoque")
+            - Case(
+                *[When(pk=pk, then=Value(n)) for pk, n in contagens.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+    )
+    estoque.depois_do_debito(PacoteSurpresa.objects.filter(pk__in=com_estoque))
+
+
+def _descarregar_lote(pacote_ids):
+    contagens = {pk: n for pk, n in _vendidos(pacote_ids).items() if n > 0}
+    if not contagens:
+        return 0
+    _gravar(contagens)
+    for pk, n in contagens.items():
+        # Desconta só o que foi gravado; vendas do meio tempo ficam para
+        # a próxima descarga.
+        try:
+            cache.decr(CHAVE_VENDIDOS.format(pk), n)
+        except ValueError:
+            pass
+    return len(contagens)
+
+
+def descarregar():
+    """
+    Grava no banco as vendas pendentes. Retorna quantos pacotes foram
+    atualizados, ou ``None`` se outra descarga ou reconciliação está rodando.
+    """
+    if not cache.add(CHAVE_TRAVA, 1, TIMEOUT_TRAVA):
+        return None
+    try:
+        ids = _ids_ativos()
+        return sum(
+            _descarregar_lote(ids[inicio : inicio + TAMANHO_LOTE])
+            for inicio in range(0, len(ids), TAMANHO_LOTE)
+        )
+    finally:
+        cache.delete(CHAVE_TRAVA)
+
+
+# ---------------------------------------------------------------------------
+# Reconciliação
+# ---------------------------------------------------------------------------
+
+
+def _reconciliar_lote(estoques):
+    chaves = [
+        chave.format(pk)
+        for pk in estoques
+        for chave in (CHAVE_SALDO, CHAVE_VENDIDOS, CHAVE_FALTA)
+    ]
+    valores = cache.get_many(chaves)
+    ajustes = {}
+    for pk, estoque in estoques.items():
+        esperado = estoque - (valores.get(CHAVE_VENDIDOS.format(pk)) or 0)
+        atual = valores.get(CHAVE_SALDO.format(pk))
+        if atual is None:
+            if cache.add(CHAVE_SALDO.format(pk), esperado, None):
+                ajustes[pk] = esperado
+            continue
+
+        diferenca = esperado - atual
+        ajuste = diferenca
+        if diferenca > 0:
+            ajuste = min(diferenca, valores.get(CHAVE_FALTA.format(pk)) or 0)
+        if ajuste:
+            # incr em vez de set: vendas concorrentes não se perdem.
+            cache.incr(CHAVE_SALDO.format(pk), ajuste)
+            ajustes[pk] = ajuste
+        if diferenca > ajuste:
+            cache.set(CHAVE_FALTA.format(pk), diferenca - ajuste, None)
+        else:
+            cache.delete(CHAVE_FALTA.format(pk))
+    return ajustes
+
+
+def reconciliar():
+    """
+    Confere ``saldo + vendidos == quantidade_estoque`` de cada pacote em
+    venda relâmpago e corrige o saldo. Retorna ``{pacote_id: ajuste}``
+    dos que mudaram, ou ``None`` se outra descarga ou reconciliação está
+    rodando.
+    """
+    from core.models import PacoteSurpresa
+
+    if not cache.add(CHAVE_TRAVA, 1, TIMEOUT_TRAVA):
+        return None
+    try:
+        estoques = dict(
+            PacoteSurpresa.objects.filter(venda_relampago=True).values_list(
+                "pk", "quantidade_estoque"
+            )
+        )
+        ids = list(estoques)
+        ajustes = {}
+        for inicio in range(0, len(ids), TAMANHO_LOTE):
+            lote = ids[inicio : inicio + TAMANHO_LOTE]
+            ajustes.update(_reconciliar_lote({pk: estoques[pk] for pk in lote}))
+        return ajustes
+    finally:
+        cache.delete(CHAVE_TRAVA)
+
+
+# ---------------------------------------------------------------------------
+# Ligar e desligar (signals de PacoteSurpresa)
+# ---------------------------------------------------------------------------
+
+
+def sincronizar(pacote):
+    """
+    Depois de salvar o pacote: ligado, o saldo passa a refletir o estoque
+    gravado (ativação ou edição pelo vendedor); desligado, as vendas
+    pendentes vão ao banco e os contadores somem.
+    """
+    chave = CHAVE_SALDO.format(pacote.pk)
+    if pacote.venda_relampago:
+        vendidos = cache.get(CHAVE_VENDIDOS.format(pacote.pk)) or 0
+        esperado = pacote.quantidade_estoque - vendidos
+        atual = cache.get(chave)
+        if atual is None:
+            cache.add(chave, esperado, None)
+        elif atual != esperado:
+            cache.incr(chave, esperado - atual)
+        cache.delete(CHAVE_FALTA.format(pacote.pk))
+        return
+    if cache.get(chave) is None:
+        return
+    _descarregar_lote([pacote.pk])
+    cache.delete_many([chave, CHAVE_FALTA.format(pacote.pk)])
+
+
+def esquecer(pacote_id):
+    """Pacote apagado: descarta os contadores."""
+    cache.delete_many(
+        [chave.format(pacote_id) for chave in (CHAVE_SALDO, CHAVE_VENDIDOS, CHAVE_FALTA)]
+    )
@@ -0,0 +1,303 @@
+"""
+Vendas diárias por vendedor (``VendaDiariaVendedor``).
+
+Cada sub-pedido contribui para a linha (vendedor, dia da criação) com +1
+em ``pedidos`` e, conforme o status:
+
+* cancelado: +1 em ``cancelados``;
+* senão: os itens em ``itens`` e o subtotal em ``receita``.
+
+``gravar_pedido`` registra os sub-pedidos novos na própria transação do
+pedido (a gravação é em lote e não dispara signals); mudanças de status
+e gravações avulsas (admin, seed) chegam pelos signals de
+``PedidoVendedor`` e ``ItemPedido``. Todas aplicam só a diferença, com
+``UPDATE ... SET campo = campo + delta``, em consultas que não crescem
+com o número de vendedores do pedido. O painel lê as linhas prontas
+em vez de varrer o histórico de pedidos.
+
+``reconstruir_vendas_diarias`` refaz as linhas a partir dos pedidos
+(carga inicial, ``update()`` em massa, troca de sub-pedido de um item).
+"""
+
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+CAMPOS = ("pedidos", "cancelados", "itens", "receita")
+CAMPOS_SUB_PEDIDO = ("vendedor_id", "data_criacao", "status", "valor_subtotal")
+ZERO = Decimal("0.00")
+
+
+def _cancelado():
+    from core.models import PedidoVendedor
+
+    return PedidoVendedor.StatusPedidoVendedor.CANCELADO
+
+
+def _estado(vendedor_id, data_criacao, status, valor_subtotal):
+    return (
+        vendedor_id,
+        timezone.localdate(data_criacao),
+        status == _cancelado(),
+        valor_subtotal,
+    )
+
+
+def estado_da_instancia(sub_pedido):
+    """
+    ``(vendedor_id, dia, cancelado, subtotal)`` do sub-pedido, ou ``None``
+    se algum campo foi adiado.
+    """
+    if sub_pedido.get_deferred_fields() & set(CAMPOS_SUB_PEDIDO):
+        return None
+    return _estado(*(getattr(sub_pedido, campo) for campo in CAMPOS_SUB_PEDIDO))
+
+
+def estado_no_banco(sub_pedido_id):
+    from core.models import PedidoVendedor
+
+    linha = (
+        PedidoVendedor.objects.filter(pk=sub_pedido_id)
+        .values_list(*CAMPOS_SUB_PEDIDO)
+        .first()
+    )
+    return _estado(*linha) if linha else None
+
+
+def contribuicao(estado, itens, sinal=1):
+    """``((vendedor_id, dia), {campo: delta})`` de um sub-pedido."""
+    vendedor_id, dia, cancelado, subtotal = estado
+    if cancelado:
+        campos = {"pedidos": 1, "cancelados": 1, "itens": 0, "receita": ZERO}
+    else:
+        campos = {"pedidos": 1, "cancelados": 0, "itens": itens, "receita": subtotal}
+    return (vendedor_id, dia), {campo: sinal * valor for campo, valor in campos.items()}
+
+
+# ---------------------------------------------------------------------------
+# Escrita
+# ---------------------------------------------------------------------------
+
+
+def aplicar(contribuicoes):
+    """
+    Soma ``[(chave, {campo: delta})]`` nas linhas com duas consultas, seja
+    qual for o número de vendedores: um ``INSERT`` que ignora as linhas já
+    existentes e um ``UPDATE ... SET campo = campo + CASE ...``. Seguro com
+    transações concorrentes no mesmo vendedor e dia.
+    """
+    from core.models import VendaDiariaVendedor
+
+    por_chave = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+    for chave, campos in contribuicoes:
+        for campo, delta in campos.items():
+            por_chave[chave][campo] += delta
+    por_chave = {
+        chave: campos for chave, campos in por_chave.items() if any(campos.values())
+    }
+    if not por_chave:
+        return
+
+    VendaDiariaVendedor.objects.bulk_create(
+        (
+            VendaDiariaVendedor(vendedor_id=vendedor_id, dia=dia)
+            for vendedor_id, dia in por_chave
+        ),
+        ignore_conflicts=True,
+    )
+    expressoes = {}
+    for campo in CAMPOS:
+        casos = [
+            When(vendedor_id=vendedor_id, dia=dia, then=Value(campos[campo]))
+            for (vendedor_id, dia), campos in por_chave.items()
+            if campos[campo]
+        ]
+        if casos:
+            saida = VendaDiariaVendedor._meta.get_field(campo)
+            expressoes[campo] = F(campo) + Case(
+                *casos, default=Value(0), output_field=saida
+            )
+    VendaDiariaVendedor.objects.filter(
+        reduce(or_, (Q(vendedor_id=v, dia=d) for v, d in por_chave))
+    ).update(**expressoes)
+
+
+def registrar_pedido(sub_pedidos, itens):
+    """
+    Sub-pedidos recém-gravados em lote por ``gravar_pedido`` (sem
+    signals); ``itens`` é ``{vendedor_id: quantidade de itens}``.
+    """
+    aplicar(
+        contribuicao(estado_da_instancia(sub_pedido), itens[sub_pedido.vendedor_id])
+        for sub_pedido in sub_pedidos
+    )
+
+
+def _itens_do_sub_pedido(sub_pedido_id):
+    from core.models import ItemPedido
+
+    return (
+        ItemPedido.objects.filter(sub_pedido_id=sub_pedido_id).aggregate(
+            total=Sum("quantidade")
+        )["total"]
+        or 0
+    )
+
+
+def aplicar_delta(antes, depois, sub_pedido_id):
+    """
+    Troca a contribuição ``antes`` pela ``depois`` (estados de
+    ``estado_da_instancia``; ``None`` = sub-pedido inexistente). Os itens
+    só são lidos quando o sub-pedido já existia e continua existindo: um
+    sub-pedido novo ainda não tem itens, e os de um apagado saíram antes
+    dele (delete em cascata, ver ``somar_itens``).
+    """
+    if antes == depois:
+        return
+    itens = _itens_do_sub_pedido(sub_pedido_id) if antes and depois else 0
+    contribuicoes = []
+    if antes:
+        contribuicoes.append(contribuicao(antes, itens, -1))
+    if depois:
+        contribuicoes.append(contribuicao(depois, itens))
+    aplicar(contribuicoes)
+
+
+def somar_itens(sub_pedido_id, delta):
+    """Itens criados, alterados ou apagados fora de ``gravar_pedido``."""
+    if not delta:
+        return
+    estado = estado_no_banco(sub_pedido_id)
+    if estado is None or estado[2]:
+        return
+    vendedor_id, dia, _, _ = estado
+    aplicar([((vendedor_id, dia), {"itens": delta})])
+
+
+# ---------------------------------------------------------------------------
+# Leitura
+# ---------------------------------------------------------------------------
+
+
+def resumo(vendedor, dias=7, hoje=None):
+    """
+    Linhas dos últimos ``dias`` dias (de ``hoje`` para trás), inclusive os
+    sem venda (linha vazia, não salva). Uma consulta.
+    """
+    from core.models import VendaDiariaVendedor
+
+    hoje = hoje or timezone.localdate()
+    inicio = hoje - datetime.timedelta(days=dias - 1)
+    salvas = {
+        venda.dia: venda
+        for venda in VendaDiariaVendedor.objects.filter(
+            vendedor=vendedor, dia__range=(inicio, hoje)
+        )
+    }
+    return [
+        salvas.get(dia) or VendaDiariaVendedor(vendedor=vendedor, dia=dia)
+        for dia in (hoje - datetime.timedelta(days=n) for n in range(dias))
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Reconstrução
+# ---------------------------------------------------------------------------
+
+
+def vendas_ao_vivo(apps=global_apps, desde=None):
+    """``{(vendedor_id, dia): {campo: valor}}`` agregado dos sub-pedidos."""
+    PedidoVendedor = apps.get_model("core", "PedidoVendedor")
+    ItemPedido = apps.get_model("core", "ItemPedido")
+    cancelado = _cancelado()
+    fuso = timezone.get_current_timezone()
+
+    sub_pedidos = PedidoVendedor.objects.order_by()
+    itens = ItemPedido.objects.order_by().exclude(sub_pedido__status=cancelado)
+    if desde:
+        inicio = timezone.make_aware(datetime.datetime.combine(desde, datetime.time()))
+        sub_pedidos = sub_pedidos.filter(data_criacao__gte=inicio)
+        itens = itens.filter(sub_pedido__data_criacao__gte=inicio)
+
+    vendas = {}
+    for vendedor_id, dia, pedidos, cancelados, receita in (
+        sub_pedidos.annotate(dia=TruncDate("data_criacao", tzinfo=fuso))
+        .values("vendedor_id", "dia")
+        .annotate(
+            pedidos=Count("pk"),
+            cancelados=Count("pk", filter=Q(status=cancelado)),
+            receita=Sum("valor_subtotal", filter=~Q(status=cancelado)),
+        )
+        .values_list("vendedor_id", "dia", "pedidos", "cancelados", "receita")
+    ):
+        vendas[(vendedor_id, dia)] = {
+            "pedidos": pedidos,
+            "cancelados": cancelados,
+            "itens": 0,
+            "receita": receita or ZERO,
+        }
+    for vendedor_id, dia, quantidade in (
+        itens.annotate(dia=TruncDate("sub_pedido__data_criacao", tzinfo=fuso))
+        .values("sub_pedido__vendedor_id", "dia")
+        .annotate(quantidade=Sum("quantidade"))
+        .values_list("sub_pedido__vendedor_id", "dia", "quantidade")
+    ):
+        vendas[(vendedor_id, dia)]["itens"] = quantidade
+    return vendas
+
+
+def vendas_armazenadas(desde=None):
+    from core.models import VendaDiariaVendedor
+
+    linhas = VendaDiariaVendedor.objects.order_by()
+    if desde:
+        linhas = linhas.filter(dia__gte=desde)
+    return {
+        (vendedor_id, dia): dict(zip(CAMPOS, valores))
+        for vendedor_id, dia, *valores in linhas.values_list(
+            "vendedor_id", "dia", *CAMPOS
+        )
+    }
+
+
+def divergencias(desde=None):
+    """``{(vendedor_id, dia): (armazenado, ao_vivo)}`` das linhas que diferem."""
+    vazio = {"pedidos": 0, "cancelados": 0, "itens": 0, "receita": ZERO}
+    armazenadas = vendas_armazenadas(desde)
+    ao_vivo = vendas_ao_vivo(desde=desde)
+    return {
+        chave: (armazenadas.get(chave, vazio), ao_vivo.get(chave, vazio))
+        for chave in armazenadas.keys() | ao_vivo.keys()
+        if armazenadas.get(chave, vazio) != ao_vivo.get(chave, vazio)
+    }
+
+
+@transaction.atomic
+def reconstruir(apps=global_apps, desde=None):
+    """
+    Regrava as linhas a partir dos sub-pedidos (todas, ou de ``desde`` em
+    diante). Retorna quantas linhas foram gravadas.
+    """
+    VendaDiariaVendedor = apps.get_model("core", "VendaDiariaVendedor")
+
+    vendas = vendas_ao_vivo(apps, desde)
+    antigas = VendaDiariaVendedor.objects.all()
+    if desde:
+        antigas = antigas.filter(dia__gte=desde)
+    antigas.delete()
+    VendaDiariaVendedor.objects.bulk_create(
+        (
+            VendaDiariaVendedor(vendedor_id=vendedor_id, dia=dia, **campos)
+            for (vendedor_id, dia), campos in vendas.items()
+        ),
+        batch_size=1000,
+    )
+    return len(vendas)
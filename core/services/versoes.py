@@ -0,0 +1,40 @@
+"""
+Contadores de versão (geração) guardados no cache compartilhado.
+
+Um cache derivado (índice em memória, fragmento de HTML, lista de
+categorias) guarda a versão com que foi montado. Quando os dados de
+origem mudam, um signal incrementa a versão e todas as cópias, em todos
+os processos, passam a ser obsoletas sem apagar chave por chave.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+def _chave(nome):
+    return f"versao:{nome}"
+
+
+def _inicial():
+    # Se a chave sumir do cache (reinício, LRU), recomeçar em 1 poderia
+    # repetir uma versão antiga; o relógio garante um valor novo.
+    return int(time.time() * 1000)
+
+
+def versao(nome):
+    """Versão atual de ``nome``."""
+    valor = cache.get(_chave(nome))
+    if valor is None:
+        cache.add(_chave(nome), _inicial(), None)
+        valor = cache.get(_chave(nome), _inicial())
+    return valor
+
+
+def incrementar_versao(nome):
+    """Marca como obsoleto tudo que foi montado com a versão anterior."""
+    try:
+        return cache.incr(_chave(nome))
+    except ValueError:
+        cache.add(_chave(nome), _inicial(), None)
+        return versao(nome)
@@ -0,0 +1,130 @@
+"""
+Contador de visualizações de produtos (``Produto.visualizacoes``).
+
+Cada visita só faz um ``incr`` atômico no cache (Redis em produção), sem
+tocar na linha do produto. De tempos em tempos ``descarregar()`` (comando
+``descarregar_visualizacoes``) leva os contadores pendentes ao banco com
+um único ``UPDATE ... SET visualizacoes = visualizacoes + CASE id ...``
+por lote.
+
+Para saber quais produtos têm visitas pendentes sem varrer o cache, o
+primeiro ``incr`` de cada produto (o que devolve 1) grava o id numa
+"vaga" numerada por outro ``incr``. A descarga lê as vagas novas desde a
+última vez e desconta do contador só o que foi gravado, então visitas que
+chegam durante a descarga não se perdem.
+
+Se o processo cair entre o ``UPDATE`` e o desconto no cache, as visitas
+daquele lote são contadas de novo na descarga seguinte.
+"""
+
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, Value, When
+
+from core.services.contadores import incrementar
+
+TAMANHO_LOTE = 500
+# Tempo máximo (s) que uma descarga segura a trava.
+TIMEOUT_TRAVA = 300
+
+CHAVE_PENDENTE = "visualizacoes:pendente:{}"
+CHAVE_VAGA = "visualizacoes:vaga:{}"
+CHAVE_ULTIMA_VAGA = "visualizacoes:vagas"
+CHAVE_VAGAS_LIDAS = "visualizacoes:vagas_lidas"
+CHAVE_TRAVA = "visualizacoes:trava"
+
+
+def registrar(produto_id):
+    """Conta uma visualização; não acessa o banco."""
+    if incrementar(CHAVE_PENDENTE.format(produto_id)) == 1:
+        _marcar_pendente(produto_id)
+
+
+def _marcar_pendente(produto_id):
+    vaga = incrementar(CHAVE_ULTIMA_VAGA)
+    cache.set(CHAVE_VAGA.format(vaga), produto_id, None)
+
+
+# ---------------------------------------------------------------------------
+# Leitura
+# ---------------------------------------------------------------------------
+
+
+def pendentes(produto_ids):
+    """``{produto_id: visitas ainda não gravadas no banco}``."""
+    produto_ids = list(produto_ids)
+    valores = cache.get_many([CHAVE_PENDENTE.format(pk) for pk in produto_ids])
+    return {
+        pk: valores.get(CHAVE_PENDENTE.format(pk)) or 0 for pk in produto_ids
+    }
+
+
+def total(produto):
+    """Visualizações gravadas mais as pendentes no cache."""
+    return produto.visualizacoes + pendentes([produto.pk])[produto.pk]
+
+
+def totais(produtos):
+    """``{produto_id: total}`` para vários produtos com uma leitura do cache."""
+    produtos = list(produtos)
+    extras = pendentes(p.pk for p in produtos)
+    return {p.pk: p.visualizacoes + extras[p.pk] for p in produtos}
+
+
+# ---------------------------------------------------------------------------
+# Descarga
+# ---------------------------------------------------------------------------
+
+
+def _gravar(contagens):
+    from core.models import Produto
+
+    # update() em vez de save(): não dispara os signals do catálogo.
+    Produto.objects.filter(pk__in=list(contagens)).update(
+        visualizacoes=F("visualizacoes")
+        + Case(
+            *[When(pk=pk, then=Value(n)) for pk, n in contagens.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def descarregar():
+    """
+    Grava no banco as visitas pendentes. Retorna quantos produtos foram
+    atualizados, ou ``None`` se outra descarga já está rodando.
+    """
+    if not cache.add(CHAVE_TRAVA, 1, TIMEOUT_TRAVA):
+        return None
+    try:
+        lidas = cache.get(CHAVE_VAGAS_LIDAS) or 0
+        ultima = cache.get(CHAVE_ULTIMA_VAGA) or 0
+        atualizados = 0
+        for inicio in range(lidas + 1, ultima + 1, TAMANHO_LOTE):
+            fim = min(inicio + TAMANHO_LOTE, ultima + 1)
+            atualizados += _descarregar_vagas(range(inicio, fim))
+            cache.set(CHAVE_VAGAS_LIDAS, fim - 1, None)
+        return atualizados
+    finally:
+        cache.delete(CHAVE_TRAVA)
+
+
+def _descarregar_vagas(vagas):
+    chaves = [CHAVE_VAGA.format(vaga) for vaga in vagas]
+    produto_ids = set(cache.get_many(chaves).values())
+    contagens = {pk: n for pk, n in pendentes(produto_ids).items() if n > 0}
+
+    if contagens:
+        _gravar(contagens)
+        for pk, n in contagens.items():
+            # Desconta só o que foi gravado; se chegaram visitas no meio
+            # tempo, o produto volta para a fila.
+            try:
+                restante = cache.decr(CHAVE_PENDENTE.format(pk), n)
+            except ValueError:
+                # Chave despejada do cache: as visitas já estão no banco.
+                continue
+            if restante > 0:
+                _marcar_pendente(pk)
+    cache.delete_many(chaves)
+    return len(contagens)
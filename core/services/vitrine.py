@@ -0,0 +1,212 @@
+"""
+Feed único da vitrine: Produto e PacoteSurpresa intercalados numa só
+ordenação, paginados por keyset.
+
+A ordem total é ``(chave, tipo, id)``. A chave é o campo escolhido pelo
+usuário (data, preço, nome ou relevância) e o tipo põe produtos antes de
+pacotes em caso de empate. Cada página busca no máximo ``por_pagina + 1``
+linhas de cada tabela a partir do cursor e intercala em memória. O custo
+por página é fixo, não importa quantos pacotes ou produtos existam.
+
+O HTML da lista pedida por AJAX é guardado em cache por combinação de
+filtros (``chave_fragmento``) e montado só a partir desses filtros já
+normalizados (``parametros_fragmento``). A chave inclui a versão
+``"catalogo"``, incrementada pelos signals sempre que um produto ou
+pacote muda, então o cache vale até a próxima mudança no catálogo.
+"""
+
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models.functions import Collate, Lower
+from django.http import QueryDict
+
+from core.pagination import (
+    CursorInvalido,
+    PaginaKeyset,
+    campo_do_modelo,
+    codificar_cursor,
+    decodificar_cursor,
+    filtro_igual,
+    filtro_keyset,
+)
+from core.services.versoes import versao
+
+# Posição de cada tipo no desempate (produtos primeiro).
+ORDEM_TIPOS = {"produto": 0, "pacote": 1}
+
+# Chaves de texto não são ordenadas pela coluna: a colação do banco (no
+# MySQL, ``*_ci``, sem caixa nem acento) não bate com a comparação de
+# strings do Python, e o cursor de uma página intercalada em memória
+# pularia ou repetiria linhas na seguinte. Elas viram a anotação
+# ``CHAVE_TEXTO`` (minúsculas, comparadas byte a byte), e o Python
+# intercala pelo valor que o próprio banco devolveu.
+CHAVES_TEXTO = {"nome"}
+CHAVE_TEXTO = "chave_ordem"
+COLACOES_BINARIAS = {"mysql": "utf8mb4_bin", "postgresql": "C", "sqlite": "BINARY"}
+
+NOME_VERSAO_CATALOGO = "catalogo"
+# Tempo máximo (s) de um fragmento no cache, mesmo sem mudança no catálogo.
+TIMEOUT_FRAGMENTO = 600
+
+
+class FeedVitrine:
+    """
+    ``fontes`` é ``{"produto": queryset, "pacote": queryset}`` já filtrados;
+    ``ordenacao`` é o campo de ordenação com ``-`` para decrescente.
+    """
+
+    def __init__(self, fontes, ordenacao, por_pagina):
+        self.chave = ordenacao.lstrip("-")
+        self.desc = ordenacao.startswith("-")
+        if self.chave in CHAVES_TEXTO:
+            expressao = Collate(Lower(self.chave), COLACOES_BINARIAS[connection.vendor])
+            fontes = {
+                tipo: queryset.annotate(**{CHAVE_TEXTO: expressao})
+                for tipo, queryset in fontes.items()
+            }
+            self.chave = CHAVE_TEXTO
+            ordenacao = f"-{CHAVE_TEXTO}" if self.desc else CHAVE_TEXTO
+        self.fontes = fontes
+        self.por_pagina = por_pagina
+        id_ordem = "-id" if self.desc else "id"
+        self.campos = {tipo: (ordenacao, id_ordem) for tipo in fontes}
+
+    # -- cursor -------------------------------------------------------------
+
+    def cursor_para(self, obj, para_tras=False):
+        valores = [getattr(obj, self.chave), ORDEM_TIPOS[obj.tipo_item], obj.pk]
+        return codificar_cursor(valores, para_tras)
+
+    def _converter(self, valores):
+        if len(valores) != 3 or valores[1] not in ORDEM_TIPOS.values():
+            raise CursorInvalido("Cursor não corresponde ao feed.")
+        chave, ordem_tipo, pk = valores
+        queryset = next(iter(self.fontes.values()))
+        field = campo_do_modelo(queryset.model, self.chave)
+        try:
+            if field is not None and chave is not None:
+                chave = field.to_python(chave)
+            pk = int(pk)
+        except (TypeError, ValueError, ValidationError) as erro:
+            raise CursorInvalido(str(erro)) from erro
+        return chave, ordem_tipo, pk
+
+    # -- consulta -----------------------------------------------------------
+
+    def _filtro_fonte(self, tipo, chave, ordem_tipo, pk, para_tras):
+        """Linhas de ``tipo`` que vêm depois de ``(chave, ordem_tipo, pk)``."""
+        ordem_fonte = ORDEM_TIPOS[tipo]
+        if ordem_fonte == ordem_tipo:
+            return filtro_keyset(self.campos[tipo], (chave, pk), para_tras)
+        depois = filtro_keyset(self.campos[tipo][:1], (chave,), para_tras)
+        # Com a mesma chave, um tipo que vem depois do tipo do cursor ainda
+        # não foi mostrado; um que vem antes já foi.
+        tipo_vem_depois = (ordem_fonte > ordem_tipo) != para_tras
+        if tipo_vem_depois:
+            return depois | filtro_igual(self.chave, chave)
+        return depois
+
+    def _ordenar(self, itens, para_tras):
+        # Ordenações estáveis encadeadas, do critério menos para o mais
+        # importante: id, tipo e por fim a chave.
+        desc = self.desc != para_tras
+        itens.sort(key=lambda obj: obj.pk, reverse=desc)
+        itens.sort(key=lambda obj: ORDEM_TIPOS[obj.tipo_item], reverse=para_tras)
+        itens.sort(key=lambda obj: getattr(obj, self.chave), reverse=desc)
+        return itens
+
+    def pagina(self, cursor=None):
+        """Levanta ``CursorInvalido`` se o cursor não puder ser lido."""
+        para_tras = False
+        posicao = None
+        if cursor:
+            valores, para_tras = decodificar_cursor(cursor)
+            posicao = self._converter(valores)
+
+        itens = []
+        for tipo, queryset in self.fontes.items():
+            queryset = queryset.order_by(*self.campos[tipo])
+            if posicao:
+                queryset = queryset.filter(
+                    self._filtro_fonte(tipo, *posicao, para_tras)
+                )
+                if para_tras:
+                    queryset = queryset.reverse()
+            itens.extend(queryset[: self.por_pagina + 1])
+
+        itens = self._ordenar(itens, para_tras)
+        tem_mais = len(itens) > self.por_pagina
+        itens = itens[: self.por_pagina]
+
+        if para_tras:
+            itens.reverse()
+            return PaginaKeyset(self, itens, has_next=True, has_previous=tem_mais)
+        return PaginaKeyset(self, itens, has_next=tem_mais, has_previous=bool(cursor))
+
+    @property
+    def count(self):
+        return sum(queryset.order_by().count() for queryset in self.fontes.values())
+
+
+def paginar_vitrine(request, fontes, ordenacao, por_pagina, parametro="cursor"):
+    """Como ``paginar_keyset``: cursor inválido volta para a primeira página."""
+    feed = FeedVitrine(fontes, ordenacao, por_pagina)
+    try:
+        return feed.pagina(request.GET.get(parametro))
+    except CursorInvalido:
+        return feed.pagina()
+
+
+# ---------------------------------------------------------------------------
+# Cache do fragmento HTML
+# ---------------------------------------------------------------------------
+
+
+def _preco(valor):
+    try:
+        return format(Decimal(valor).normalize(), "f")
+    except (InvalidOperation, TypeError, ValueError):
+        # A view ignora preços inválidos; a chave também.
+        return None
+
+
+def _filtros(parametros, ordenacao):
+    return {
+        "termo": " ".join(parametros.get("termo", "").split()),
+        "categoria": parametros.get("categoria") or "",
+        "preco_min": _preco(parametros.get("preco_min")),
+        "preco_max": _preco(parametros.get("preco_max")),
+        "ordenacao": ordenacao,
+        "cursor": parametros.get("cursor") or "",
+    }
+
+
+def parametros_fragmento(parametros, ordenacao):
+    """
+    ``QueryDict`` só com os filtros normalizados de ``parametros``. O
+    fragmento é montado a partir dele (inclusive os links de paginação),
+    e não do ``request.GET`` cru: pedidos com a mesma chave geram o
+    mesmo HTML, sem parâmetros estranhos gravados no cache.
+    """
+    normalizados = QueryDict(mutable=True)
+    for nome, valor in _filtros(parametros, ordenacao).items():
+        if valor:
+            normalizados[nome] = valor
+    normalizados._mutable = False
+    return normalizados
+
+
+def chave_fragmento(parametros, ordenacao):
+    """
+    Chave do HTML da lista para os filtros de ``parametros`` (``request.GET``)
+    já normalizados: espaços no termo, ``10`` e ``10.00`` no preço e
+    parâmetros vazios dão a mesma chave.
+    """
+    resumo = hashlib.md5(
+        json.dumps(_filtros(parametros, ordenacao), sort_keys=True).encode()
+    ).hexdigest()
+    return f"vitrine:fragmento:{versao(NOME_VERSAO_CATALOGO)}:{resumo}"
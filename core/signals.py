@@ -0,0 +1,403 @@
+"""
+Receivers de signals do app core.
+
+Conectados em ``CoreConfig.ready()``. Cada bloco mantém em sincronia uma
+estrutura derivada (índices, contadores, caches) com os modelos de origem.
+"""
+
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.models import (
+    Avaliacao,
+    CategoriaProduto,
+    Cupom,
+    ItemPedido,
+    PacoteSurpresa,
+    PedidoVendedor,
+    Perfil,
+    Produto,
+    Receita,
+)
+from core.services import (
+    avaliacoes,
+    busca,
+    carrinho,
+    categorias,
+    cupons,
+    facetas,
+    sugestoes,
+    trigramas,
+    venda_relampago,
+    vendas_diarias,
+    vitrine,
+)
+from core.services.versoes import incrementar_versao
+
+# ---------------------------------------------------------------------------
+# Estado antes/depois de cada gravação
+# ---------------------------------------------------------------------------
+
+# Estado ainda não lido: algum campo veio adiado (.only/.defer).
+_ADIADO = object()
+
+
+def _acompanhar(modelo, nome, estado_da_instancia, estado_no_banco, aplicar_delta):
+    """
+    Mantém uma estrutura derivada de ``modelo`` em dia, aplicando a cada
+    save()/delete() a troca do estado anterior da instância pelo novo.
+
+    ``estado_da_instancia(instance)`` lê o estado dos campos carregados
+    (``None`` se algum foi adiado) e ``estado_no_banco(pk)`` o da linha
+    gravada (``None`` se ela não existe). ``aplicar_delta(instance, antes,
+    depois)`` recebe ``None`` para "não existia" e "deixou de existir".
+    """
+    atributo = f"_{nome}_antes"
+
+    def guardar(sender, instance, **kwargs):
+        # Estado carregado do banco, para o delta no próximo save(). Se algum
+        # campo foi adiado, fica _ADIADO e o pre_save lê a linha do banco:
+        # uma consulta só quando a instância é de fato gravada.
+        if instance.pk is None:
+            estado = None
+        else:
+            estado = estado_da_instancia(instance)
+            if estado is None:
+                estado = _ADIADO
+        setattr(instance, atributo, estado)
+
+    def carregar(sender, instance, raw=False, **kwargs):
+        if raw or getattr(instance, atributo, _ADIADO) is not _ADIADO:
+            return
+        setattr(
+            instance, atributo, estado_no_banco(instance.pk) if instance.pk else None
+        )
+
+    def atualizar(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        depois = estado_da_instancia(instance)
+        if depois is None:
+            depois = estado_no_banco(instance.pk)
+        aplicar_delta(instance, getattr(instance, atributo), depois)
+        setattr(instance, atributo, depois)
+
+    def remover(sender, instance, **kwargs):
+        aplicar_delta(instance, getattr(instance, atributo), None)
+        setattr(instance, atributo, None)
+
+    # Closures: sem weak=False o dispatcher as perderia na coleta de lixo.
+    for sinal, funcao in (
+        (post_init, guardar),
+        (pre_save, carregar),
+        (pre_delete, carregar),
+        (post_save, atualizar),
+        (post_delete, remover),
+    ):
+        sinal.connect(
+            funcao,
+            sender=modelo,
+            weak=False,
+            dispatch_uid=f"{atributo}_{funcao.__name__}_{modelo._meta.label_lower}",
+        )
+
+
+# ---------------------------------------------------------------------------
+# Índice de busca
+# ---------------------------------------------------------------------------
+
+
+@receiver(post_save, sender=Produto)
+def indexar_produto(sender, instance, raw=False, **kwargs):
+    if not raw:
+        busca.indexar("produto", [instance.pk])
+
+
+@receiver(post_delete, sender=Produto)
+def remover_produto_do_indice(sender, instance, **kwargs):
+    busca.remover("produto", [instance.pk])
+
+
+@receiver(post_save, sender=PacoteSurpresa)
+def indexar_pacote(sender, instance, raw=False, **kwargs):
+    if not raw:
+        busca.indexar("pacote", [instance.pk])
+
+
+@receiver(post_delete, sender=PacoteSurpresa)
+def remover_pacote_do_indice(sender, instance, **kwargs):
+    busca.remover("pacote", [instance.pk])
+
+
+@receiver(post_save, sender=CategoriaProduto)
+def reindexar_categoria(sender, instance, raw=False, **kwargs):
+    if not raw:
+        busca.indexar(
+            "produto", instance.produtos.values_list("pk", flat=True)
+        )
+
+
+@receiver(pre_delete, sender=CategoriaProduto)
+def guardar_produtos_da_categoria(sender, instance, **kwargs):
+    # Depois do delete os produtos ficam com categoria=NULL (SET_NULL) e não
+    # há mais como achá-los pela categoria, então guardamos os ids antes.
+    instance._produtos_indexados = list(
+        instance.produtos.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=CategoriaProduto)
+def reindexar_categoria_removida(sender, instance, **kwargs):
+    busca.indexar("produto", getattr(instance, "_produtos_indexados", []))
+
+
+@receiver(post_save, sender=Perfil)
+def reindexar_vendedor(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.tipo != Perfil.TipoUsuario.VENDEDOR:
+        return
+    if update_fields is not None and "nome_negocio" not in update_fields:
+        return
+    busca.indexar("produto", instance.produtos.values_list("pk", flat=True))
+    busca.indexar("pacote", instance.pacote.values_list("pk", flat=True))
+
+
+# ---------------------------------------------------------------------------
+# Contagens de facetas
+# ---------------------------------------------------------------------------
+
+
+def _acompanhar_facetas(modelo):
+    tipo = facetas.tipo_do_modelo(modelo)
+
+    def da_instancia(instance):
+        estado = facetas.estado_da_instancia(instance)
+        return None if estado is None else facetas.contribuicao(tipo, estado)
+
+    _acompanhar(
+        modelo,
+        "facetas",
+        da_instancia,
+        lambda pk: facetas.contribuicao(tipo, facetas.estado_no_banco(modelo, pk)),
+        lambda instance, antes, depois: facetas.aplicar_delta(antes or (), depois or ()),
+    )
+
+
+_acompanhar_facetas(Produto)
+_acompanhar_facetas(PacoteSurpresa)
+
+
+# ---------------------------------------------------------------------------
+# Índice de sugestões (prefixos)
+# ---------------------------------------------------------------------------
+
+
+def _invalidar_sugestoes_produto(produto, antes, depois):
+    # Estoque, preço e descrição não estão no índice: só nome e
+    # disponibilidade (ativo, e a passagem de com estoque para esgotado).
+    if sugestoes.mudou(antes, depois):
+        incrementar_versao(sugestoes.NOME_VERSAO)
+
+
+_acompanhar(
+    Produto,
+    "sugestao",
+    sugestoes.estado_produto,
+    sugestoes.estado_no_banco,
+    _invalidar_sugestoes_produto,
+)
+
+
+@receiver(post_save, sender=CategoriaProduto)
+@receiver(post_delete, sender=CategoriaProduto)
+def invalidar_sugestoes(sender, raw=False, **kwargs):
+    if not raw:
+        incrementar_versao(sugestoes.NOME_VERSAO)
+
+
+@receiver(post_save, sender=Perfil)
+def invalidar_sugestoes_vendedor(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.tipo != Perfil.TipoUsuario.VENDEDOR:
+        return
+    if update_fields is None or "nome_negocio" in update_fields:
+        incrementar_versao(sugestoes.NOME_VERSAO)
+
+
+# ---------------------------------------------------------------------------
+# Lista de categorias do menu
+# ---------------------------------------------------------------------------
+
+
+@receiver(post_save, sender=CategoriaProduto)
+@receiver(post_delete, sender=CategoriaProduto)
+def invalidar_categorias(sender, raw=False, **kwargs):
+    if not raw:
+        incrementar_versao(categorias.NOME_VERSAO)
+
+
+# ---------------------------------------------------------------------------
+# Trigramas (busca aproximada)
+# ---------------------------------------------------------------------------
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_save, sender=PacoteSurpresa)
+@receiver(post_save, sender=Receita)
+def indexar_trigramas(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "nome" not in update_fields):
+        return
+    trigramas.indexar(trigramas.tipo_do_modelo(sender), instance.pk, instance.nome)
+
+
+@receiver(post_delete, sender=Produto)
+@receiver(post_delete, sender=PacoteSurpresa)
+@receiver(post_delete, sender=Receita)
+def remover_trigramas(sender, instance, **kwargs):
+    trigramas.remover(trigramas.tipo_do_modelo(sender), instance.pk)
+
+
+# ---------------------------------------------------------------------------
+# Versão do catálogo (cache do HTML da vitrine)
+# ---------------------------------------------------------------------------
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+@receiver(post_save, sender=PacoteSurpresa)
+@receiver(post_delete, sender=PacoteSurpresa)
+@receiver(post_save, sender=CategoriaProduto)
+@receiver(post_delete, sender=CategoriaProduto)
+def invalidar_catalogo(sender, raw=False, **kwargs):
+    if not raw:
+        incrementar_versao(vitrine.NOME_VERSAO_CATALOGO)
+
+
+@receiver(post_save, sender=Perfil)
+def invalidar_catalogo_vendedor(sender, instance, raw=False, update_fields=None, **kwargs):
+    # O nome do negócio aparece nos cards da vitrine.
+    if raw or instance.tipo != Perfil.TipoUsuario.VENDEDOR:
+        return
+    if update_fields is None or "nome_negocio" in update_fields:
+        incrementar_versao(vitrine.NOME_VERSAO_CATALOGO)
+
+
+# ---------------------------------------------------------------------------
+# Resumo de preços dos carrinhos
+# ---------------------------------------------------------------------------
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_save, sender=PacoteSurpresa)
+def invalidar_precos_carrinho(sender, raw=False, update_fields=None, **kwargs):
+    # Estoque fica de fora: as baixas usam update() e um save() só de
+    # estoque não muda o resumo.
+    if raw or (
+        update_fields is not None
+        and not set(update_fields) & set(carrinho.CAMPOS_PRECOS)
+    ):
+        return
+    incrementar_versao(carrinho.NOME_VERSAO_PRECOS)
+
+
+@receiver(post_delete, sender=Produto)
+@receiver(post_delete, sender=PacoteSurpresa)
+@receiver(post_delete, sender=CategoriaProduto)
+def invalidar_precos_carrinho_removido(sender, **kwargs):
+    incrementar_versao(carrinho.NOME_VERSAO_PRECOS)
+
+
+# ---------------------------------------------------------------------------
+# Venda relâmpago (saldo dos pacotes no cache)
+# ---------------------------------------------------------------------------
+
+
+@receiver(post_save, sender=PacoteSurpresa)
+def sincronizar_venda_relampago(sender, instance, raw=False, **kwargs):
+    if not raw:
+        venda_relampago.sincronizar(instance)
+
+
+@receiver(post_delete, sender=PacoteSurpresa)
+def esquecer_venda_relampago(sender, instance, **kwargs):
+    if instance.venda_relampago:
+        venda_relampago.esquecer(instance.pk)
+
+
+# ---------------------------------------------------------------------------
+# Regras de cupons compiladas (cache)
+# ---------------------------------------------------------------------------
+
+
+@receiver(post_save, sender=Cupom)
+@receiver(post_delete, sender=Cupom)
+@receiver(m2m_changed, sender=Cupom.categorias_permitidas.through)
+@receiver(m2m_changed, sender=Cupom.vendedores_permitidos.through)
+def invalidar_cupons(sender, raw=False, action=None, **kwargs):
+    if raw or (action and not action.startswith("post_")):
+        return
+    incrementar_versao(cupons.NOME_VERSAO)
+
+
+# ---------------------------------------------------------------------------
+# Agregados de avaliações
+# ---------------------------------------------------------------------------
+
+
+_acompanhar(
+    Avaliacao,
+    "avaliacao",
+    avaliacoes.estado_da_instancia,
+    avaliacoes.estado_no_banco,
+    lambda avaliacao, antes, depois: avaliacoes.aplicar_delta(antes, depois),
+)
+
+
+# ---------------------------------------------------------------------------
+# Vendas diárias dos vendedores
+# ---------------------------------------------------------------------------
+# gravar_pedido grava em lote e registra as vendas ele mesmo; estes
+# receivers cobrem mudanças de status e gravações avulsas (admin, seed).
+
+
+_acompanhar(
+    PedidoVendedor,
+    "venda",
+    vendas_diarias.estado_da_instancia,
+    vendas_diarias.estado_no_banco,
+    lambda sub_pedido, antes, depois: vendas_diarias.aplicar_delta(
+        antes, depois, sub_pedido.pk
+    ),
+)
+
+
+def _quantidade_vendida(item):
+    if "quantidade" not in item.get_deferred_fields():
+        return item.quantidade
+    return None
+
+
+def _quantidade_no_banco(item_id):
+    return (
+        ItemPedido.objects.filter(pk=item_id)
+        .values_list("quantidade", flat=True)
+        .first()
+    )
+
+
+def _somar_itens_vendidos(item, antes, depois):
+    vendas_diarias.somar_itens(item.sub_pedido_id, (depois or 0) - (antes or 0))
+
+
+_acompanhar(
+    ItemPedido,
+    "quantidade",
+    _quantidade_vendida,
+    _quantidade_no_banco,
+    _somar_itens_vendidos,
+)
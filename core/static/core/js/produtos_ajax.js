@@ -35,8 +35,41 @@ document.addEventListener('DOMContentLoaded', function () {
             applyFilters();
         });
 
+        // Sugestões da busca: a cada tecla só consulta o índice de prefixos;
+        // a listagem completa é recarregada quando o termo é confirmado.
+        const searchInput = document.getElementById('search-input');
+        const sugestoesList = document.getElementById('sugestoes-busca');
+        let sugestoesTimeout;
+
+        function fetchSugestoes() {
+            const termo = searchInput.value.trim();
+            if (!termo) {
+                sugestoesList.innerHTML = '';
+                return;
+            }
+            const url = `${searchInput.dataset.sugestoesUrl}?q=${encodeURIComponent(termo)}`;
+            fetch(url)
+                .then(response => response.json())
+                .then(data => {
+                    sugestoesList.innerHTML = '';
+                    data.resultados.forEach(sugestao => {
+                        const option = document.createElement('option');
+                        option.value = sugestao.texto;
+                        sugestoesList.appendChild(option);
+                    });
+                })
+                .catch(error => console.error('Erro ao buscar sugestões:', error));
+        }
+
+        if (searchInput && sugestoesList) {
+            searchInput.addEventListener('change', applyFilters);
+        }
+
         filtersForm.addEventListener('input', function (e) {
-            if (e.target.type === 'text' || e.target.type === 'number') {
+            if (e.target === searchInput && sugestoesList) {
+                clearTimeout(sugestoesTimeout);
+                sugestoesTimeout = setTimeout(fetchSugestoes, 150);
+            } else if (e.target.type === 'text' || e.target.type === 'number') {
                 clearTimeout(fetchTimeout);
                 fetchTimeout = setTimeout(applyFilters, 500);
             } else {
@@ -0,0 +1,69 @@
+"""
+Testes de integração para AvaliacaoViewSet (core/viewsets/avaliacao_viewset.py)
+
+Endpoints cobertos:
+  GET    /api/avaliacoes/  — list (avaliações de produtos e perfis misturadas)
+"""
+
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Avaliacao, PacoteSurpresa, Produto
+
+URL = "/api/avaliacoes/"
+
+
+@pytest.fixture
+def avaliar(cliente_fake, vendedor_fake):
+    def _avaliar(quantidade):
+        for n in range(quantidade):
+            produto = Produto.objects.create(
+                vendedor=vendedor_fake,
+                nome=f"Produto {n}",
+                preco=Decimal("1.00"),
+                quantidade_estoque=5,
+            )
+            pacote = PacoteSurpresa.objects.create(
+                vendedor=vendedor_fake,
+                nome=f"Pacote {n}",
+                preco=Decimal("1.00"),
+                quantidade_estoque=5,
+            )
+            for alvo in (produto, pacote, vendedor_fake):
+                Avaliacao.objects.create(
+                    autor=cliente_fake.usuario, content_object=alvo, nota=4
+                )
+
+    return _avaliar
+
+
+def _consultas_da_listagem():
+    with CaptureQueriesContext(connection) as consultas:
+        resposta = APIClient().get(URL)
+    assert resposta.status_code == status.HTTP_200_OK
+    return resposta, len(consultas)
+
+
+@pytest.mark.django_db
+class TestListagem:
+    def test_consultas_nao_crescem_com_o_numero_de_avaliacoes(self, avaliar):
+        avaliar(1)
+        _consultas_da_listagem()  # aquece o cache de ContentType
+        _, poucas = _consultas_da_listagem()
+
+        avaliar(4)
+        resposta, muitas = _consultas_da_listagem()
+
+        assert muitas == poucas
+        dados = resposta.data.get("results", resposta.data)
+        assert {item["alvo"]["tipo"] for item in dados} == {
+            "produto",
+            "pacotesurpresa",
+            "perfil",
+        }
+        assert dados[0]["alvo"]["nome"]
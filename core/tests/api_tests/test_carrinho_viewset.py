@@ -5,6 +5,7 @@ Endpoints cobertos:
   GET    /api/carrinho/           — list (get_or_create carrinho do usuário)
   POST   /api/carrinho/adicionar_item/  — action: adicionar_item
   POST   /api/carrinho/{pk}/remover-item/ — action: remover_item (pk=ItemCarrinho.id)
+  POST   /api/carrinho/lote/          — action: lote (várias operações)
 
 Permission: IsAuthenticated em todas as ações
 Fixtures: conftest.py + fixtures locais para Produto/PacoteSurpresa
@@ -97,6 +98,32 @@ class TestCarrinhoViewSet:
 
         assert resposta.status_code == status.HTTP_200_OK
         assert len(resposta.data["itens"]) == 1
+
+    def test_list_consultas_nao_crescem_com_o_numero_de_itens(
+        self, cliente_auth, cliente_fake, item_carrinho_cliente, pacote_surpresa_cliente
+    ):
+        """
+        GET /api/carrinho/ → vendedores aninhados (usuário e avaliações)
+        carregados em lote, não item a item.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        carrinho = item_carrinho_cliente.carrinho
+        ItemCarrinho.objects.create(carrinho=carrinho, pacote=pacote_surpresa_cliente)
+        with CaptureQueriesContext(connection) as poucos:
+            cliente_auth.get("/api/carrinho/")
+
+        for n in range(4):
+            produto = Produto.objects.create(
+                nome=f"Produto {n}", preco=1, quantidade_estoque=5, vendedor=cliente_fake
+            )
+            ItemCarrinho.objects.create(carrinho=carrinho, produto=produto)
+        with CaptureQueriesContext(connection) as muitos:
+            resposta = cliente_auth.get("/api/carrinho/")
+
+        assert len(resposta.data["itens"]) == 6
+        assert len(muitos) == len(poucos)
         assert resposta.data["itens"][0]["quantidade"] == 2
 
    
@@ -212,3 +239,86 @@ class TestCarrinhoViewSet:
 
         assert resposta.status_code == status.HTTP_200_OK
         assert ItemCarrinho.objects.get(produto=produto_cliente).quantidade == 1
+
+
+@pytest.mark.django_db
+class TestCarrinhoLote:
+    URL = "/api/carrinho/lote/"
+
+    def test_varias_operacoes_numa_chamada(
+        self, cliente_auth, produto_cliente, pacote_surpresa_cliente, item_carrinho_cliente
+    ):
+        """
+        POST /api/carrinho/lote/ → 200 com o carrinho final:
+        definir troca a quantidade, adicionar soma e inclui itens novos.
+        """
+        operacoes = [
+            {"op": "definir", "produto_id": produto_cliente.id, "quantidade": 4},
+            {"pacote_id": pacote_surpresa_cliente.id, "quantidade": 1},
+            {"op": "adicionar", "pacote_id": pacote_surpresa_cliente.id, "quantidade": 1},
+        ]
+
+        resposta = cliente_auth.post(self.URL, operacoes, format="json")
+
+        assert resposta.status_code == status.HTTP_200_OK
+        quantidades = {
+            (item["produto"], item["pacote"]): item["quantidade"]
+            for item in resposta.data["itens"]
+        }
+        assert quantidades == {
+            (produto_cliente.id, None): 4,
+            (None, pacote_surpresa_cliente.id): 2,
+        }
+
+    def test_consultas_nao_crescem_com_o_numero_de_itens(
+        self, cliente_auth, cliente_fake, vendedor_fake
+    ):
+        """
+        Objetos e estoque com uma consulta por tabela cada; itens e
+        reservas gravados com um INSERT só.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        produtos = [
+            Produto.objects.create(
+                nome=f"Produto {n}", preco=1, quantidade_estoque=5, vendedor=vendedor_fake
+            )
+            for n in range(10)
+        ]
+        operacoes = [{"produto_id": p.id, "quantidade": 2} for p in produtos]
+
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = cliente_auth.post(self.URL, operacoes, format="json")
+
+        assert resposta.status_code == status.HTTP_200_OK
+        assert ItemCarrinho.objects.filter(carrinho__usuario=cliente_fake).count() == 10
+        sql = [c["sql"] for c in consultas]
+        assert len([q for q in sql if q.startswith('INSERT INTO "core_itemcarrinho"')]) == 1
+        assert len([q for q in sql if q.startswith('INSERT INTO "core_reservaestoque"')]) == 1
+        assert len([q for q in sql if 'FROM "core_produto"' in q]) == 2
+
+    def test_sem_estoque_nada_muda(self, cliente_auth, produto_cliente, pacote_surpresa_cliente):
+        operacoes = [
+            {"produto_id": produto_cliente.id, "quantidade": 1},
+            {"pacote_id": pacote_surpresa_cliente.id, "quantidade": 9},
+        ]
+
+        resposta = cliente_auth.post(self.URL, operacoes, format="json")
+
+        assert resposta.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Estoque insuficiente" in resposta.data["error"]
+        assert not ItemCarrinho.objects.exists()
+
+    def test_item_inexistente_retorna_404(self, cliente_auth):
+        resposta = cliente_auth.post(
+            self.URL, [{"produto_id": 999999, "quantidade": 1}], format="json"
+        )
+
+        assert resposta.status_code == status.HTTP_404_NOT_FOUND
+        assert resposta.data["itens"] == ["produto_999999"]
+
+    def test_operacao_sem_produto_nem_pacote_retorna_400(self, cliente_auth):
+        resposta = cliente_auth.post(self.URL, [{"quantidade": 1}], format="json")
+
+        assert resposta.status_code == status.HTTP_400_BAD_REQUEST
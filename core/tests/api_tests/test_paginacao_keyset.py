@@ -0,0 +1,107 @@
+from decimal import Decimal
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Produto
+from core.pagination import PaginadorKeyset, codificar_cursor
+
+
+@pytest.fixture
+def produtos(vendedor_fake):
+    # Preços repetidos de propósito: o desempate pelo id precisa funcionar.
+    return [
+        Produto.objects.create(
+            vendedor=vendedor_fake,
+            nome=f"Produto {i:02d}",
+            preco=Decimal(10 + i % 3),
+            quantidade_estoque=5,
+            tipo_quantidade="QUANTIA",
+        )
+        for i in range(25)
+    ]
+
+
+def _percorrer(paginador):
+    vistos, pagina = [], paginador.pagina()
+    while True:
+        vistos.extend(p.pk for p in pagina)
+        if not pagina.has_next():
+            return vistos
+        pagina = paginador.pagina(pagina.cursor_proximo)
+
+
+@pytest.mark.django_db
+class TestPaginadorKeyset:
+    @pytest.mark.parametrize(
+        "ordenacao",
+        [("-data_criacao", "-id"), ("preco", "id"), ("-preco", "-id"), ("nome", "id")],
+    )
+    def test_percorre_tudo_sem_repetir(self, produtos, ordenacao):
+        queryset = Produto.objects.all()
+
+        vistos = _percorrer(PaginadorKeyset(queryset, 7, ordenacao))
+
+        assert vistos == list(queryset.order_by(*ordenacao).values_list("pk", flat=True))
+
+    def test_volta_para_pagina_anterior(self, produtos):
+        paginador = PaginadorKeyset(Produto.objects.all(), 10, ("preco", "id"))
+        primeira = paginador.pagina()
+        segunda = paginador.pagina(primeira.cursor_proximo)
+
+        anterior = paginador.pagina(segunda.cursor_anterior)
+
+        assert [p.pk for p in anterior] == [p.pk for p in primeira]
+        assert not anterior.has_previous()
+
+    @pytest.mark.parametrize("ordem", [F("preco").desc(), "?"])
+    def test_ordenacao_sem_cursor_possivel_e_recusada(self, ordem):
+        with pytest.raises(ImproperlyConfigured):
+            PaginadorKeyset(Produto.objects.order_by(ordem), 10)
+
+    def test_pagina_profunda_nao_usa_offset(self, produtos, django_assert_max_num_queries):
+        paginador = PaginadorKeyset(Produto.objects.all(), 5, ("-data_criacao", "-id"))
+        cursor = codificar_cursor([produtos[10].data_criacao, produtos[10].pk])
+
+        with django_assert_max_num_queries(1) as contexto:
+            pagina = paginador.pagina(cursor)
+
+        assert "OFFSET" not in contexto.captured_queries[0]["sql"].upper()
+        assert len(pagina) == 5
+
+
+@pytest.mark.django_db
+class TestKeysetPaginationApi:
+    def test_lista_da_api_navega_por_cursor(self, produtos):
+        client = APIClient()
+        url = "/api/produto/"
+        ids = []
+        while url:
+            resposta = client.get(url)
+            assert resposta.status_code == 200
+            assert resposta.data["count"] == 25
+            ids.extend(p["id"] for p in resposta.data["results"])
+            url = resposta.data["next"]
+
+        assert sorted(ids) == sorted(p.pk for p in produtos)
+        assert len(ids) == len(set(ids))
+
+    def test_cursor_invalido_retorna_404(self, produtos):
+        resposta = APIClient().get("/api/produto/", {"cursor": "lixo"})
+
+        assert resposta.status_code == 404
+
+
+@pytest.mark.django_db
+def test_vitrine_pagina_por_cursor(client, produtos):
+    url = reverse("core:produtos")
+    primeira = client.get(url, {"ordenacao": "preco"}).context["page_obj"]
+    segunda = client.get(
+        url, {"ordenacao": "preco", "cursor": primeira.cursor_proximo}
+    ).context["page_obj"]
+
+    assert len(primeira) == 12
+    assert not {p.pk for p in primeira} & {p.pk for p in segunda}
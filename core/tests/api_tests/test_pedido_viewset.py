@@ -31,6 +31,7 @@ from core.models import Pedido, PedidoVendedor, ItemPedido
 from core.models.carrinho import Carrinho, ItemCarrinho
 from core.models.produto import Produto, PacoteSurpresa
 from core.models.perfil import Perfil
+from core.services import reservas
 
 
 # ---------------------------------------------------------------------------
@@ -449,6 +450,24 @@ class TestPedidoCreateErros:
         # Nenhum pedido deve ter sido criado — atomic garantiu rollback total
         assert Pedido.objects.filter(cliente=cliente).count() == 0
 
+    def test_create_respeita_reserva_de_outro_carrinho(
+        self, cliente_autenticado, cliente, produto
+    ):
+        """
+        Unidades reservadas por outro carrinho não entram no pedido da API:
+        400 com 'detalhes', sem pedido e sem baixa de estoque.
+        """
+        reservas.reservar("sessao:outro", produto, 9)
+        _criar_carrinho_com_item(cliente, produto, quantidade=2)
+
+        response = cliente_autenticado.post(PEDIDO_URL, {}, format="json")
+
+        assert response.status_code == 400
+        assert any("disponível=1" in d for d in response.data["detalhes"])
+        assert Pedido.objects.filter(cliente=cliente).count() == 0
+        produto.refresh_from_db()
+        assert produto.quantidade_estoque == 10
+
 
 # ---------------------------------------------------------------------------
 # GET /api/pedido/ — isolamento de lista
@@ -590,3 +609,66 @@ class TestPedidoRetrieve:
         """Retrieve sem token deve retornar 401 antes mesmo de buscar o objeto."""
         response = api_client.get(f"{PEDIDO_URL}9999/")
         assert response.status_code == 401
+
+
+# ---------------------------------------------------------------------------
+# POST /api/pedido/ — Idempotency-Key
+# ---------------------------------------------------------------------------
+
+@pytest.mark.django_db
+class TestPedidoIdempotencia:
+
+    def test_repeticao_devolve_a_mesma_resposta_sem_tocar_no_banco(
+        self, cliente_autenticado, cliente, produto, django_assert_num_queries
+    ):
+        """Reenvio com a mesma chave não cria outro pedido nem consulta o banco."""
+        _criar_carrinho_com_item(cliente, produto, quantidade=2)
+        primeira = cliente_autenticado.post(
+            PEDIDO_URL, {}, format="json", HTTP_IDEMPOTENCY_KEY="abc-123"
+        )
+        assert primeira.status_code == 201, primeira.data
+
+        with django_assert_num_queries(0):
+            repetida = cliente_autenticado.post(
+                PEDIDO_URL, {}, format="json", HTTP_IDEMPOTENCY_KEY="abc-123"
+            )
+
+        assert repetida.status_code == 201
+        assert repetida.data == primeira.data
+        assert repetida["Idempotent-Replayed"] == "true"
+        assert Pedido.objects.filter(cliente=cliente).count() == 1
+        produto.refresh_from_db()
+        assert produto.quantidade_estoque == 8
+
+    def test_mesma_chave_com_outro_corpo_retorna_422(
+        self, cliente_autenticado, cliente, produto
+    ):
+        _criar_carrinho_com_item(cliente, produto, quantidade=1)
+        cliente_autenticado.post(
+            PEDIDO_URL, {}, format="json", HTTP_IDEMPOTENCY_KEY="abc-123"
+        )
+
+        response = cliente_autenticado.post(
+            PEDIDO_URL,
+            {"forma_pagamento": "CARTAO"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="abc-123",
+        )
+
+        assert response.status_code == 422
+
+    def test_chave_de_outro_usuario_nao_e_reaproveitada(
+        self, api_client, cliente, produto, vendedor
+    ):
+        """A chave vale por usuário: outro cliente com a mesma chave não recebe a resposta."""
+        _criar_carrinho_com_item(cliente, produto, quantidade=1)
+        api_client.force_authenticate(user=cliente.usuario)
+        api_client.post(PEDIDO_URL, {}, format="json", HTTP_IDEMPOTENCY_KEY="abc-123")
+
+        api_client.force_authenticate(user=vendedor.usuario)
+        response = api_client.post(
+            PEDIDO_URL, {}, format="json", HTTP_IDEMPOTENCY_KEY="abc-123"
+        )
+
+        assert response.status_code == 400
+        assert "Idempotent-Replayed" not in response
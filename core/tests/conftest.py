@@ -1,5 +1,8 @@
+from decimal import Decimal
+
 from django.contrib.auth.models import User
 from core.models.perfil import Perfil
+from core.models.produto import PacoteSurpresa, Produto
 import pytest
 
 @pytest.fixture
@@ -28,3 +31,64 @@ def cliente_fake():
         tipo = Perfil.TipoUsuario.CLIENTE,
     )
     return perfil
+
+
+@pytest.fixture
+def criar_produto(request):
+    """
+    Fábrica de produtos: ``criar_produto(nome="Alface", estoque=0)``; outros
+    campos do modelo vão direto para o ``create``. Sem ``vendedor``, usa o
+    ``vendedor_fake``.
+    """
+    def criar(vendedor=None, nome="Tomate", preco="5.00", estoque=5, **campos):
+        return Produto.objects.create(
+            vendedor=vendedor or request.getfixturevalue("vendedor_fake"),
+            nome=nome,
+            preco=Decimal(preco),
+            quantidade_estoque=estoque,
+            **{"tipo_quantidade": "QUANTIA", **campos},
+        )
+
+    return criar
+
+
+@pytest.fixture
+def criar_pacote(request):
+    """Fábrica de pacotes surpresa, nos moldes de ``criar_produto``."""
+    def criar(vendedor=None, nome="Pacote do dia", preco="10.00", estoque=2, **campos):
+        return PacoteSurpresa.objects.create(
+            vendedor=vendedor or request.getfixturevalue("vendedor_fake"),
+            nome=nome,
+            preco=Decimal(preco),
+            quantidade_estoque=estoque,
+            **campos,
+        )
+
+    return criar
+
+
+@pytest.fixture
+def produto(criar_produto):
+    return criar_produto()
+
+
+@pytest.fixture
+def pacote(criar_pacote):
+    return criar_pacote()
+
+
+@pytest.fixture(autouse=True)
+def limpar_cache():
+    """Cache (locmem/redis) limpo a cada teste: contadores e índices não vazam."""
+    from django.core.cache import cache
+
+    from core.services import categorias
+    from core.services.sugestoes import descartar_indice
+
+    cache.clear()
+    descartar_indice()
+    categorias.descartar()
+    yield
+    cache.clear()
+    descartar_indice()
+    categorias.descartar()
@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from core.models import AgregadoAvaliacao, Avaliacao, Perfil
+from core.services import avaliacoes
+
+
+def _avaliar(autor, objeto, nota):
+    return Avaliacao.objects.create(autor=autor, content_object=objeto, nota=nota)
+
+
+@pytest.mark.django_db
+class TestAgregados:
+    def test_criar_editar_e_apagar_mantem_o_agregado(self, produto, cliente_fake):
+        avaliacao = _avaliar(cliente_fake.usuario, produto, 5)
+        _avaliar(cliente_fake.usuario, produto, 2)
+
+        agregado = avaliacoes.agregado_de(produto)
+        assert (agregado.total, agregado.soma, agregado.media) == (2, 7, Decimal("3.50"))
+
+        avaliacao = Avaliacao.objects.get(pk=avaliacao.pk)
+        avaliacao.nota = 4
+        avaliacao.save()
+        agregado = avaliacoes.agregado_de(produto)
+        assert agregado.histograma == {5: 0, 4: 1, 3: 0, 2: 1, 1: 0}
+
+        avaliacao.delete()
+        agregado = avaliacoes.agregado_de(produto)
+        assert (agregado.total, agregado.soma) == (1, 2)
+
+    def test_sobe_para_o_vendedor(self, produto, vendedor_fake, cliente_fake):
+        _avaliar(cliente_fake.usuario, produto, 5)
+        _avaliar(cliente_fake.usuario, produto, 4)
+        _avaliar(cliente_fake.usuario, vendedor_fake, 2)
+
+        vendedor_fake.refresh_from_db()
+        assert vendedor_fake.total_avaliacoes == 3
+        assert vendedor_fake.avaliacao_media == Decimal("3.67")
+
+    def test_edicao_so_do_texto_nao_mexe_nos_agregados(
+        self, produto, cliente_fake, django_assert_num_queries
+    ):
+        avaliacao = _avaliar(cliente_fake.usuario, produto, 3)
+
+        avaliacao.texto = "Bom"
+        with django_assert_num_queries(1):
+            avaliacao.save()
+
+    def test_reconstruir_corrige_divergencias(
+        self, produto, vendedor_fake, cliente_fake
+    ):
+        _avaliar(cliente_fake.usuario, produto, 5)
+        AgregadoAvaliacao.objects.update(total=9, soma=45)
+        Perfil.objects.update(total_avaliacoes=0)
+
+        assert avaliacoes.divergencias()
+        call_command("reconstruir_avaliacoes")
+
+        assert not avaliacoes.divergencias()
+        vendedor_fake.refresh_from_db()
+        assert vendedor_fake.total_avaliacoes == 1
+        assert vendedor_fake.avaliacao_media == Decimal("5.00")
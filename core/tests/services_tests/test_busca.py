@@ -0,0 +1,105 @@
+import pytest
+from django.contrib.auth.models import User
+
+from core.models import CategoriaProduto, PacoteSurpresa, Perfil, Produto
+from core.services import busca
+
+
+@pytest.fixture
+def vendedor(db):
+    user = User.objects.create_user(username="vendedor_busca", password="123")
+    return Perfil.objects.create(
+        usuario=user, tipo=Perfil.TipoUsuario.VENDEDOR, nome_negocio="Padaria Central"
+    )
+
+
+@pytest.fixture
+def categoria(db):
+    return CategoriaProduto.objects.create(nome="Padaria", slug="padaria")
+
+
+@pytest.mark.django_db
+class TestBuscaProdutos:
+    def test_busca_ignora_acentos_e_aceita_prefixo(self, vendedor, criar_produto):
+        pao = criar_produto(vendedor, nome="Pão francês")
+        criar_produto(vendedor, nome="Banana")
+
+        assert list(Produto.objects.buscar("pao")) == [pao]
+        assert list(Produto.objects.buscar("franc")) == [pao]
+
+    def test_nome_pesa_mais_que_descricao(self, vendedor, criar_produto):
+        na_descricao = criar_produto(vendedor, nome="Bolo", descricao="feito com banana")
+        no_nome = criar_produto(vendedor, nome="Banana prata")
+
+        resultado = list(Produto.objects.buscar("banana"))
+
+        assert resultado == [no_nome, na_descricao]
+        assert resultado[0].relevancia > resultado[1].relevancia
+
+    def test_busca_respeita_disponibilidade(self, vendedor, criar_produto):
+        criar_produto(vendedor, nome="Pão sem estoque", estoque=0)
+
+        assert not Produto.objects.buscar("pao").exists()
+
+    def test_indice_e_filtros_na_mesma_consulta(
+        self, vendedor, django_assert_num_queries, criar_produto
+    ):
+        # Esgotados mais relevantes não ocupam lugar: o MATCH e a
+        # disponibilidade vão juntos para o banco, sem corte de ids antes.
+        for n in range(3):
+            criar_produto(vendedor, nome=f"Pão pão esgotado {n}", estoque=0)
+        disponivel = criar_produto(vendedor, nome="Bolo", descricao="com pão")
+
+        resultado = Produto.objects.buscar("pao")
+
+        with django_assert_num_queries(1):
+            assert list(resultado) == [disponivel]
+        assert "CASE" not in str(resultado.query)
+
+    def test_indice_acompanha_categoria_e_vendedor(
+        self, vendedor, categoria, criar_produto
+    ):
+        produto = criar_produto(vendedor, nome="Baguete", categoria=categoria)
+        assert list(Produto.objects.buscar("padaria")) == [produto]
+
+        categoria.nome = "Confeitaria"
+        categoria.save()
+        assert list(Produto.objects.buscar("confeitaria")) == [produto]
+
+        vendedor.nome_negocio = "Empório Sabor"
+        vendedor.save()
+        assert list(Produto.objects.buscar("emporio")) == [produto]
+
+    def test_produto_removido_sai_do_indice(self, vendedor, criar_produto):
+        produto = criar_produto(vendedor, nome="Queijo minas")
+        pk = produto.pk
+        produto.delete()
+
+        backend = busca.obter_backend()
+        assert pk not in [i for i, _ in backend.buscar("produto", ["queijo"])]
+
+    def test_busca_pacotes(self, vendedor, criar_pacote):
+        pacote = criar_pacote(
+            vendedor, nome="Pacote Hortifruti", descricao="Legumes e verduras"
+        )
+
+        assert list(PacoteSurpresa.objects.buscar("verdura")) == [pacote]
+
+    def test_reconstruir_indice(self, vendedor, criar_produto):
+        criar_produto(vendedor, nome="Leite integral")
+
+        totais = busca.reconstruir_indice()
+
+        assert totais["produto"] == 1
+        assert Produto.objects.buscar("leite").count() == 1
+
+    def test_banco_sem_indice_usa_icontains(self, vendedor, monkeypatch, criar_produto):
+        pao = criar_produto(vendedor, nome="Pão de queijo", descricao="Assado na hora")
+        criar_produto(vendedor, nome="Queijo minas")
+        sem_indice = busca.BackendSemIndice(busca.default_connection)
+        monkeypatch.setattr(busca, "obter_backend", lambda connection=None: sem_indice)
+
+        assert list(Produto.objects.buscar("queijo assado")) == [pao]
+        assert sem_indice.buscar("produto", ["queijo", "assado"]) == [(pao.pk, 0.0)]
+        with pytest.raises(TypeError):
+            busca.BackendBusca(busca.default_connection)
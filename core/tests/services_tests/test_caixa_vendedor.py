@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from core.models import ItemPedido, PacoteSurpresa, Pedido, PedidoVendedor, Produto
+from core.services import caixa_vendedor
+
+Status = PedidoVendedor.StatusPedidoVendedor
+
+
+@pytest.fixture
+def itens(vendedor_fake):
+    produto = Produto.objects.create(
+        vendedor=vendedor_fake,
+        nome="Alface",
+        preco=Decimal("3.00"),
+        quantidade_estoque=10,
+    )
+    pacote = PacoteSurpresa.objects.create(
+        vendedor=vendedor_fake,
+        nome="Pacote",
+        preco=Decimal("9.90"),
+        quantidade_estoque=10,
+    )
+    return produto, pacote
+
+
+def _pedido(cliente, vendedor, item, status=Status.AGUARDANDO):
+    pedido = Pedido.objects.create(
+        cliente=cliente, valor_total=item.preco, endereco_entrega="Rua A"
+    )
+    sub = PedidoVendedor.objects.create(
+        pedido_principal=pedido,
+        vendedor=vendedor,
+        valor_subtotal=item.preco,
+        status=status,
+    )
+    campo = "produto" if isinstance(item, Produto) else "pacote_surpresa"
+    ItemPedido.objects.create(
+        sub_pedido=sub, quantidade=1, preco_unitario=item.preco, **{campo: item}
+    )
+    return sub
+
+
+@pytest.mark.django_db
+class TestCaixaVendedor:
+    def test_inclui_produtos_e_pacotes_e_filtra_por_status(
+        self, itens, vendedor_fake, cliente_fake
+    ):
+        produto, pacote = itens
+        so_pacote = _pedido(cliente_fake, vendedor_fake, pacote)
+        entregue = _pedido(cliente_fake, vendedor_fake, produto, Status.ENTREGUE)
+
+        assert list(caixa_vendedor.caixa_de_entrada(vendedor_fake)) == [
+            entregue,
+            so_pacote,
+        ]
+        assert list(caixa_vendedor.caixa_de_entrada(vendedor_fake, "abertos")) == [
+            so_pacote
+        ]
+        contagens = caixa_vendedor.contagens(vendedor_fake)
+        assert (contagens["todos"], contagens["abertos"], contagens["entregue"]) == (
+            2,
+            1,
+            1,
+        )
+
+    def test_pagina_com_consultas_constantes(
+        self, itens, vendedor_fake, cliente_fake, django_assert_num_queries
+    ):
+        produto, pacote = itens
+        for n in range(6):
+            _pedido(cliente_fake, vendedor_fake, produto if n % 2 else pacote)
+
+        # Sub-pedidos com pedido e cliente, e os itens com produto e pacote.
+        with django_assert_num_queries(2):
+            for sub in caixa_vendedor.caixa_de_entrada(vendedor_fake):
+                str(sub.pedido_principal.cliente)
+                [str(item) for item in sub.itens.all()]
+
+    def test_painel_pagina_por_cursor(self, client, itens, vendedor_fake, cliente_fake):
+        produto, _ = itens
+        for _ in range(caixa_vendedor.POR_PAGINA + 1):
+            _pedido(cliente_fake, vendedor_fake, produto)
+        client.force_login(vendedor_fake.usuario)
+        url = reverse("core:painel_pedidos_vendedor")
+
+        primeira = client.get(url, {"status": "aguardando"})
+        cursor = primeira.context["page_obj"].cursor_proximo
+        segunda = client.get(url, {"status": "aguardando", "cursor": cursor})
+
+        assert len(primeira.context["page_obj"]) == caixa_vendedor.POR_PAGINA
+        assert len(segunda.context["page_obj"]) == 1
+        assert not segunda.context["page_obj"].has_next()
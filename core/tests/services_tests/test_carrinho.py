@@ -0,0 +1,228 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.context_processors import carrinho_context
+from core.models import Cupom, PacoteSurpresa, Produto, ReservaEstoque
+from core.models.carrinho import ItemCarrinho
+from core.services import estoque, reservas
+from core.services.carrinho import CarrinhoService
+from core.services.estoque import EstoqueInsuficiente
+
+
+@pytest.fixture
+def produto(criar_produto):
+    return criar_produto(preco="4.00")
+
+
+def _requisicao(carrinho=None, usuario=None):
+    request = RequestFactory().get("/")
+    request.session = {"carrinho": carrinho} if carrinho is not None else {}
+    request.user = usuario
+    return request
+
+
+@pytest.mark.django_db
+class TestCarrinhoSessao:
+    def test_carrega_em_duas_consultas_e_reaproveita_na_requisicao(
+        self, produto, pacote, django_assert_num_queries
+    ):
+        request = _requisicao(
+            {
+                f"produto_{produto.pk}": {"quantidade": 2},
+                f"pacote_{pacote.pk}": {"quantidade": 1},
+                "lixo": {"quantidade": 1},
+            }
+        )
+
+        with django_assert_num_queries(2):
+            carrinho = CarrinhoService.da_sessao(request)
+            linhas = carrinho.linhas()
+            assert carrinho.total() == Decimal("18.00")
+            assert CarrinhoService.da_sessao(request) is carrinho
+            assert [linha.vendedor for linha in linhas]
+
+        assert [linha.chave for linha in linhas] == [
+            f"produto_{produto.pk}",
+            f"pacote_{pacote.pk}",
+        ]
+
+    def test_adicionar_nao_carrega_o_resto_do_carrinho(self, produto, pacote):
+        request = _requisicao({f"pacote_{pacote.pk}": {"quantidade": 1}})
+
+        with CaptureQueriesContext(connection) as consultas:
+            CarrinhoService.da_sessao(request).adicionar(produto, 3)
+
+        assert not any(
+            "core_pacotesurpresa" in consulta["sql"] for consulta in consultas
+        )
+
+        assert request.session["carrinho"][f"produto_{produto.pk}"]["quantidade"] == 3
+        with pytest.raises(EstoqueInsuficiente):
+            CarrinhoService.da_sessao(request).adicionar(produto, 3)
+
+    def test_ajustar_ao_estoque_remove_e_limita(self, produto, pacote):
+        request = _requisicao(
+            {
+                f"produto_{produto.pk}": {"quantidade": 9},
+                f"pacote_{pacote.pk}": {"quantidade": 1},
+                "produto_999999": {"quantidade": 1},
+            }
+        )
+        PacoteSurpresa.objects.filter(pk=pacote.pk).update(quantidade_estoque=0)
+
+        carrinho = CarrinhoService.da_sessao(request)
+
+        assert carrinho.ajustar_ao_estoque() is True
+        assert request.session["carrinho"] == {
+            f"produto_{produto.pk}": {
+                "quantidade": 5,
+                "preco": "4.00",
+                "nome": "Tomate",
+            }
+        }
+
+    def test_ajustar_ao_estoque_acerta_as_reservas(self, produto, pacote):
+        request = _requisicao()
+        carrinho = CarrinhoService.da_sessao(request)
+        carrinho.adicionar(produto, 5)
+        carrinho.adicionar(pacote, 1)
+        dono = reservas.dono_da_sessao(request.session)
+        Produto.objects.filter(pk=produto.pk).update(quantidade_estoque=3)
+        PacoteSurpresa.objects.filter(pk=pacote.pk).update(quantidade_estoque=0)
+
+        # Carrinho relido do zero, como na próxima requisição.
+        assert CarrinhoService(carrinho.armazenamento).ajustar_ao_estoque() is True
+
+        assert dict(
+            ReservaEstoque.objects.filter(dono=dono).values_list("produto_id", "quantidade")
+        ) == {produto.pk: 3}
+
+    def test_ver_carrinho_usa_o_servico(self, client, produto):
+        client.post(
+            reverse("core:adicionar_carrinho", args=[produto.pk]), {"quantidade": 2}
+        )
+
+        resposta = client.get(reverse("core:ver_carrinho"))
+
+        assert resposta.context["total_carrinho"] == Decimal("8.00")
+        assert [linha.quantidade for linha in resposta.context["carrinho"]] == [2]
+
+
+@pytest.mark.django_db
+class TestCarrinhoBanco:
+    def test_mesmas_operacoes_no_carrinho_do_perfil(
+        self, cliente_fake, produto, pacote, django_assert_num_queries
+    ):
+        request = _requisicao(usuario=cliente_fake.usuario)
+        carrinho = CarrinhoService.do_usuario(request)
+        carrinho.adicionar(produto, 2)
+        carrinho.adicionar(pacote, 1)
+        carrinho.definir_quantidade("produto", produto.pk, 1)
+
+        outra = _requisicao(usuario=cliente_fake.usuario)
+        with django_assert_num_queries(2):
+            recarregado = CarrinhoService.do_usuario(outra)
+            assert recarregado.total() == Decimal("14.00")
+
+        recarregado.remover("pacote", pacote.pk)
+        assert list(
+            ItemCarrinho.objects.values_list("produto_id", "pacote_id", "quantidade")
+        ) == [(produto.pk, None, 1)]
+
+
+@pytest.mark.django_db
+class TestResumoPrecos:
+    def test_calculado_uma_vez_e_refeito_quando_o_carrinho_muda(
+        self, produto, pacote, vendedor_fake, django_assert_num_queries
+    ):
+        request = _requisicao({f"produto_{produto.pk}": {"quantidade": 2}})
+        CarrinhoService.da_sessao(request).precos()
+
+        outra = _requisicao()
+        outra.session = request.session
+        with django_assert_num_queries(0):
+            resumo = CarrinhoService.da_sessao(outra).precos()
+        assert resumo.total == Decimal("8.00")
+        assert resumo.por_vendedor == {vendedor_fake.pk: Decimal("8.00")}
+        assert [linha.subtotal for linha in resumo.linhas] == [Decimal("8.00")]
+
+        CarrinhoService.da_sessao(outra).adicionar(pacote, 1)
+        assert CarrinhoService.da_sessao(outra).precos().total == Decimal("18.00")
+
+    def test_preco_novo_no_catalogo_refaz_o_resumo(self, produto):
+        request = _requisicao({f"produto_{produto.pk}": {"quantidade": 1}})
+        CarrinhoService.da_sessao(request).precos()
+
+        produto.preco = Decimal("5.00")
+        produto.save()
+
+        outra = _requisicao()
+        outra.session = request.session
+        assert CarrinhoService.da_sessao(outra).precos().total == Decimal("5.00")
+
+    def test_cabecalho_usa_o_resumo_so_na_mesma_versao_de_precos(
+        self, produto, django_assert_num_queries
+    ):
+        request = _requisicao({f"produto_{produto.pk}": {"quantidade": 2}})
+        CarrinhoService.da_sessao(request).precos()
+
+        outra = _requisicao()
+        outra.session = request.session
+        with django_assert_num_queries(0):
+            assert carrinho_context(outra)["valor_total"] == Decimal("8.00")
+
+        produto.preco = Decimal("5.00")
+        produto.save()
+
+        outra = _requisicao()
+        outra.session = request.session
+        contexto = carrinho_context(outra)
+        assert contexto["valor_total"] == Decimal("10.00")
+        assert contexto["total_itens"] == 2
+
+    def test_baixa_de_estoque_nao_refaz_o_resumo(
+        self, produto, pacote, django_assert_num_queries
+    ):
+        request = _requisicao({f"produto_{produto.pk}": {"quantidade": 1}})
+        CarrinhoService.da_sessao(request).precos()
+
+        estoque.debitar([(pacote, 2)])
+
+        outra = _requisicao()
+        outra.session = request.session
+        with django_assert_num_queries(0):
+            assert CarrinhoService.da_sessao(outra).precos().total == Decimal("4.00")
+
+    def test_previa_de_cupom_com_produtos_e_pacotes(self, client, produto, pacote):
+        Cupom.objects.create(
+            codigo="DEZ", nome="Dez", valor_desconto=Decimal("10"), limite_uso=5
+        )
+        client.post(
+            reverse("core:adicionar_carrinho", args=[produto.pk]), {"quantidade": 1}
+        )
+        client.post(
+            reverse("core:adicionar_pacote_carrinho", args=[pacote.pk]),
+            {"quantidade": 1},
+        )
+        url = reverse("core:api_aplicar_cupom")
+        client.post(url, {"codigo": "NADA"}, content_type="application/json")
+
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = client.post(
+                url, {"codigo": "dez"}, content_type="application/json"
+            )
+
+        assert resposta.status_code == 200
+        assert resposta.json()["valores"]["total_final_str"] == "R$ 12,60"
+        # O resumo veio da primeira tentativa: o catálogo não é recarregado.
+        assert not any(
+            tabela in consulta["sql"]
+            for consulta in consultas
+            for tabela in ("core_produto", "core_pacotesurpresa")
+        )
+
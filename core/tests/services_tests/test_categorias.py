@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+import pytest
+from django.template import Context, Template
+from django.test import RequestFactory
+
+from core.context_processors import carrinho_context, categorias_context
+from core.models import CategoriaProduto
+from core.services import categorias
+
+
+@pytest.mark.django_db
+class TestListaCategorias:
+    def test_consulta_uma_vez_e_atualiza_quando_a_categoria_muda(
+        self, django_assert_num_queries
+    ):
+        CategoriaProduto.objects.create(nome="Frutas", slug="frutas")
+        assert [c.nome for c in categorias.listar()] == ["Frutas"]
+
+        with django_assert_num_queries(0):
+            categorias.listar()
+
+        # Outro processo (sem cópia local) usa a do cache compartilhado.
+        categorias.descartar()
+        with django_assert_num_queries(0):
+            assert [c.nome for c in categorias.listar()] == ["Frutas"]
+
+        CategoriaProduto.objects.create(nome="Verduras", slug="verduras")
+        assert {c.nome for c in categorias.listar()} == {"Frutas", "Verduras"}
+
+
+@pytest.mark.django_db
+class TestContextProcessors:
+    def _request(self, carrinho):
+        request = RequestFactory().get("/")
+        request.session = {"carrinho": carrinho}
+        return request
+
+    def test_nada_e_calculado_se_o_template_nao_usar(
+        self, django_assert_num_queries
+    ):
+        request = self._request({})
+        request.session = None  # qualquer leitura da sessão quebraria
+
+        with django_assert_num_queries(0):
+            contexto = {**carrinho_context(request), **categorias_context(request)}
+            Template("<p>sem menu</p>").render(Context(contexto))
+
+    def test_resumo_do_carrinho_vem_da_sessao(self):
+        request = self._request(
+            {
+                "produto_1": {"quantidade": 2, "preco": "3.50"},
+                "pacote_2": {"quantidade": 1, "preco": "10.00"},
+            }
+        )
+        contexto = carrinho_context(request)
+
+        html = Template("{{ total_itens|default:0 }} {{ valor_total }}").render(
+            Context(contexto)
+        )
+
+        assert html == "3 17,00"
+        assert contexto["valor_total"] == Decimal("17.00")
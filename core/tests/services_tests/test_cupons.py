@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+import pytest
+
+from core.models import CategoriaProduto, Cupom, PacoteSurpresa, Produto
+from core.services import cupons
+from core.services.carrinho import LinhaCarrinho
+
+
+@pytest.fixture
+def frutas():
+    return CategoriaProduto.objects.create(nome="Frutas", slug="frutas")
+
+
+@pytest.fixture
+def linhas(vendedor_fake, frutas):
+    banana = Produto.objects.create(
+        vendedor=vendedor_fake,
+        categoria=frutas,
+        nome="Banana",
+        preco=Decimal("10.00"),
+        quantidade_estoque=10,
+        tipo_quantidade="QUANTIA",
+    )
+    arroz = Produto.objects.create(
+        vendedor=vendedor_fake,
+        nome="Arroz",
+        preco=Decimal("20.00"),
+        quantidade_estoque=10,
+        tipo_quantidade="QUANTIA",
+    )
+    pacote = PacoteSurpresa.objects.create(
+        vendedor=vendedor_fake,
+        nome="Pacote",
+        preco=Decimal("5.00"),
+        quantidade_estoque=10,
+    )
+    return [
+        LinhaCarrinho("produto", banana, 2),
+        LinhaCarrinho("produto", arroz, 1),
+        LinhaCarrinho("pacote", pacote, 1),
+    ]
+
+
+def _cupom(**campos):
+    return Cupom.objects.create(
+        **{
+            "codigo": "PROMO10",
+            "nome": "Promo",
+            "valor_desconto": Decimal("10"),
+            "limite_uso": 5,
+            **campos,
+        }
+    )
+
+
+@pytest.mark.django_db
+class TestRegras:
+    def test_compiladas_uma_vez_e_recompiladas_quando_o_cupom_muda(
+        self, frutas, django_assert_num_queries
+    ):
+        cupom = _cupom()
+        assert cupons.por_codigo("promo10").categorias == frozenset()
+        assert cupons.por_codigo("NAOEXISTE") is None
+
+        with django_assert_num_queries(0):
+            assert cupons.por_codigo("PROMO10").id == cupom.pk
+            assert cupons.por_codigo("NAOEXISTE") is None
+
+        cupom.categorias_permitidas.add(frutas)
+        assert cupons.por_codigo("PROMO10").categorias == frozenset({frutas.pk})
+
+    def test_desconto_so_nas_linhas_elegiveis(self, linhas, frutas):
+        cupom = _cupom(valor_desconto=Decimal("10"))
+        cupom.categorias_permitidas.add(frutas)
+
+        desconto = cupons.por_codigo("PROMO10").aplicar(linhas)
+
+        # 10% só da banana (2 x 10,00); arroz e pacote ficam de fora.
+        assert desconto.total == Decimal("2.00")
+        assert desconto.por_linha == {linhas[0].chave: Decimal("2.00")}
+
+    def test_valor_fixo_repartido_fecha_o_total(self, linhas):
+        _cupom(
+            tipo_desconto=Cupom.TipoDesconto.VALOR_FIXO,
+            valor_desconto=Decimal("10.00"),
+            valor_minimo_compra=Decimal("30.00"),
+        )
+
+        desconto = cupons.por_codigo("PROMO10").aplicar(linhas)
+
+        assert desconto.total == Decimal("10.00")
+        assert sum(desconto.por_linha.values()) == Decimal("10.00")
+        # 10,00 x 20/45 por produto; o pacote fica com o arredondamento.
+        assert desconto.por_linha[linhas[0].chave] == Decimal("4.44")
+        assert desconto.por_linha[linhas[2].chave] == Decimal("1.12")
+
+    def test_minimo_de_compra_vale_sobre_o_carrinho(self, linhas):
+        _cupom(valor_minimo_compra=Decimal("100.00"))
+
+        assert cupons.por_codigo("PROMO10").aplicar(linhas) == cupons.SEM_DESCONTO
+
+
+@pytest.mark.django_db
+class TestResgate:
+    def test_nao_passa_do_limite_de_uso(self):
+        cupom = _cupom(limite_uso=1)
+        assert cupons.por_id(cupom.pk).valido()
+
+        assert cupom.usar_cupom() is True
+        assert cupons.resgatar(cupom.pk) is False
+
+        cupom.refresh_from_db()
+        assert cupom.usos_realizados == 1
+        assert cupons.por_id(cupom.pk).esgotado
+
+    def test_ultimo_uso_marca_as_regras_como_esgotadas(self):
+        cupom = _cupom(limite_uso=2)
+        assert not cupons.por_codigo("PROMO10").esgotado
+
+        assert cupons.resgatar(cupom.pk) is True
+        assert not cupons.por_codigo("PROMO10").esgotado
+
+        assert cupons.resgatar(cupom.pk) is True
+        assert cupons.por_codigo("PROMO10").esgotado
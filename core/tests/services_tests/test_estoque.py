@@ -0,0 +1,55 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import PacoteSurpresa, Produto
+from core.services import estoque, facetas, vitrine
+from core.services.estoque import EstoqueInsuficiente
+from core.services.versoes import versao
+
+
+@pytest.fixture
+def produto(criar_produto):
+    return criar_produto(preco="3.00", estoque=4)
+
+
+@pytest.fixture
+def pacote(criar_pacote):
+    return criar_pacote(preco="15.00", estoque=1)
+
+
+@pytest.mark.django_db
+class TestDebitar:
+    def test_update_condicional_sem_travar_as_linhas(self, produto, pacote):
+        with CaptureQueriesContext(connection) as consultas:
+            estoque.debitar([(pacote, 1), (produto, 3)])
+
+        sql = [consulta["sql"] for consulta in consultas]
+        assert not any("FOR UPDATE" in comando for comando in sql)
+        debitos = [comando for comando in sql if 'SET "quantidade_estoque"' in comando]
+        assert len(debitos) == 2
+        assert all('"quantidade_estoque" >=' in comando for comando in debitos)
+        assert Produto.objects.get(pk=produto.pk).quantidade_estoque == 1
+        assert PacoteSurpresa.objects.get(pk=pacote.pk).quantidade_estoque == 0
+
+    def test_falha_desfaz_os_itens_ja_debitados(self, produto, pacote):
+        with pytest.raises(EstoqueInsuficiente) as erro:
+            estoque.debitar([(produto, 2), (pacote, 2)])
+
+        assert erro.value.objeto == pacote
+        assert erro.value.disponivel == 1
+        assert Produto.objects.get(pk=produto.pk).quantidade_estoque == 4
+
+    def test_item_esgotado_sai_das_facetas_e_invalida_a_vitrine(self, produto):
+        antes = versao(vitrine.NOME_VERSAO_CATALOGO)
+
+        estoque.debitar([(produto, 4)])
+
+        assert facetas.divergencias() == {}
+        assert facetas.contagens("produto", "vendedor") == {}
+        assert versao(vitrine.NOME_VERSAO_CATALOGO) != antes
+
+        # Um save() posterior do mesmo objeto não desconta de novo.
+        produto.nome = "Alface crespa"
+        produto.save()
+        assert facetas.divergencias() == {}
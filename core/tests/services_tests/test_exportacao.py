@@ -0,0 +1,98 @@
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import PacoteSurpresa, PedidoVendedor, Produto
+from core.services import exportacao
+from core.services.pedidos import gravar_pedido
+
+Status = PedidoVendedor.StatusPedidoVendedor
+
+
+@pytest.fixture
+def pedidos(vendedor_fake, cliente_fake):
+    produto = Produto.objects.create(
+        vendedor=vendedor_fake, nome="Alface", preco=Decimal("3.00"), quantidade_estoque=99
+    )
+    pacote = PacoteSurpresa.objects.create(
+        vendedor=vendedor_fake, nome="Pacote", preco=Decimal("9.90"), quantidade_estoque=99
+    )
+    return [
+        gravar_pedido(
+            cliente_fake, [(produto, 2), (pacote, 1)], endereco_entrega=f"Rua {n}"
+        )
+        for n in range(3)
+    ]
+
+
+def _conteudo(resposta):
+    return b"".join(resposta.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestExportacao:
+    def test_lotes_cobrem_todos_os_itens_uma_vez(self, pedidos, monkeypatch):
+        monkeypatch.setattr(exportacao, "LOTE", 2)
+
+        tuplas = list(exportacao.linhas(PedidoVendedor.objects.all()))
+
+        assert len(tuplas) == 6
+        assert sorted({t[0] for t in tuplas}) == sorted(
+            PedidoVendedor.objects.values_list("pk", flat=True)
+        )
+        assert {(t[7], t[8]) for t in tuplas} == {("Alface", "produto"), ("Pacote", "pacote")}
+
+    def test_csv_neutraliza_textos_que_viram_formula(self, pedidos):
+        Produto.objects.filter(nome="Alface").update(nome="=HYPERLINK(\"x\")")
+
+        tuplas = list(exportacao.linhas(PedidoVendedor.objects.all()))
+        linhas = list(csv.reader(io.StringIO("".join(exportacao.em_csv(tuplas)))))
+
+        assert {linha[7] for linha in linhas[1:]} == {"'=HYPERLINK(\"x\")", "Pacote"}
+        # NDJSON não é aberto em planilha: o texto sai como está.
+        assert any('"=HYPERLINK' in linha for linha in exportacao.em_ndjson(tuplas))
+
+    def test_view_do_vendedor_em_csv_e_ndjson_com_filtros(
+        self, client, pedidos, vendedor_fake
+    ):
+        cancelado = pedidos[0].sub_pedidos.get()
+        cancelado.status = Status.CANCELADO
+        cancelado.save()
+        client.force_login(vendedor_fake.usuario)
+        url = reverse("core:exportar_pedidos_vendedor")
+        hoje = timezone.localdate()
+
+        resposta = client.get(url, {"status": "cancelado"})
+        assert resposta.streaming
+        linhas = list(csv.reader(io.StringIO(_conteudo(resposta))))
+        assert linhas[0][0] == "sub_pedido"
+        assert {int(linha[0]) for linha in linhas[1:]} == {cancelado.pk}
+
+        resposta = client.get(url, {"formato": "ndjson", "desde": hoje.isoformat()})
+        registros = [json.loads(linha) for linha in _conteudo(resposta).splitlines()]
+        assert len(registros) == 6
+        assert registros[0]["preco_unitario"] in ("3.00", "9.90")
+
+        ontem = (hoje - datetime.timedelta(days=1)).isoformat()
+        assert _conteudo(client.get(url, {"formato": "ndjson", "ate": ontem})) == ""
+        assert client.get(url, {"desde": "ontem"}).status_code == 400
+
+    def test_acao_do_admin(self, client, pedidos, django_user_model):
+        admin = django_user_model.objects.create_superuser("admin", "a@a.com", "x")
+        client.force_login(admin)
+        selecionados = [p.sub_pedidos.get().pk for p in pedidos[:2]]
+
+        resposta = client.post(
+            reverse("admin:core_pedidovendedor_changelist"),
+            {"action": "exportar_csv", "_selected_action": selecionados},
+        )
+
+        linhas = list(csv.reader(io.StringIO(_conteudo(resposta))))
+        assert {int(linha[0]) for linha in linhas[1:]} == set(selecionados)
+        assert len(linhas) == 5
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from core.models import CategoriaProduto, ContagemFaceta, Produto
+from core.services import facetas
+
+
+@pytest.fixture
+def categoria(db):
+    return CategoriaProduto.objects.create(nome="Frutas", slug="frutas")
+
+
+@pytest.mark.django_db
+class TestFacetas:
+    def test_contagem_acompanha_criacao_estoque_e_exclusao(
+        self, criar_produto, categoria
+    ):
+        produto = criar_produto(categoria=categoria)
+        criar_produto(categoria=categoria, estoque=0)
+        assert facetas.contagens("produto", "categoria") == {str(categoria.pk): 1}
+
+        produto.quantidade_estoque = 0
+        produto.save()
+        assert facetas.contagens("produto", "categoria") == {}
+
+        produto.quantidade_estoque = 4
+        produto.save()
+        assert facetas.contagens("produto", "categoria") == {str(categoria.pk): 1}
+
+        produto.delete()
+        assert facetas.contagens("produto", "categoria") == {}
+
+    def test_mudanca_de_preco_troca_de_faixa(self, criar_produto, categoria):
+        produto = criar_produto(categoria=categoria, preco="5.00")
+        assert facetas.contagens("produto", "faixa_preco") == {"0-10": 1}
+
+        produto = Produto.objects.get(pk=produto.pk)
+        produto.preco = Decimal("30.00")
+        produto.save()
+
+        assert facetas.contagens("produto", "faixa_preco") == {"25-50": 1}
+
+    def test_instancia_com_campos_adiados(self, criar_produto, categoria):
+        produto = criar_produto(categoria=categoria)
+
+        parcial = Produto.objects.only("pk", "ativo").get(pk=produto.pk)
+        parcial.ativo = False
+        parcial.save(update_fields=["ativo"])
+
+        assert facetas.contagens("produto", "vendedor") == {}
+
+    def test_pacotes_contam_por_vendedor(self, vendedor_fake, criar_pacote):
+        criar_pacote(preco="12.00", estoque=1, descricao="x")
+
+        assert facetas.contagens("pacote", "vendedor") == {str(vendedor_fake.pk): 1}
+        assert facetas.contagens("pacote", "faixa_preco") == {"10-25": 1}
+
+    def test_comando_detecta_e_corrige_divergencia(self, criar_produto, categoria):
+        criar_produto(categoria=categoria, motivo_desconto="VALIDADE")
+        # Um update em massa não dispara signals e deixa a tabela defasada.
+        Produto.objects.update(quantidade_estoque=0)
+
+        with pytest.raises(CommandError):
+            call_command("reconstruir_facetas", verificar=True)
+
+        call_command("reconstruir_facetas")
+
+        assert facetas.divergencias() == {}
+        assert not ContagemFaceta.objects.filter(total__gt=0).exists()
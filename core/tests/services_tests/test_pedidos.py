@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import ItemPedido, PacoteSurpresa, Perfil, Produto
+from core.services.pedidos import gravar_pedido
+
+
+def _vendedor(indice):
+    usuario = User.objects.create_user(username=f"vendedor{indice}", password="x")
+    return Perfil.objects.create(
+        usuario=usuario, tipo=Perfil.TipoUsuario.VENDEDOR, nome_negocio=f"Loja {indice}"
+    )
+
+
+def _linhas(vendedores, por_vendedor):
+    linhas = []
+    for vendedor in vendedores:
+        for i in range(por_vendedor):
+            produto = Produto.objects.create(
+                vendedor=vendedor,
+                nome=f"Produto {vendedor.pk}-{i}",
+                preco=Decimal("2.50"),
+                quantidade_estoque=10,
+                tipo_quantidade="QUANTIA",
+            )
+            linhas.append((produto, 2))
+        pacote = PacoteSurpresa.objects.create(
+            vendedor=vendedor, nome="Pacote", preco=Decimal("10.00"), quantidade_estoque=1
+        )
+        linhas.append((pacote, 1))
+    return linhas
+
+
+def _inserts(consultas):
+    return [c["sql"] for c in consultas if c["sql"].startswith("INSERT")]
+
+
+@pytest.mark.django_db
+class TestGravarPedido:
+    def test_um_insert_por_tabela_independente_do_tamanho(self, cliente_fake):
+        pequeno = _linhas([_vendedor(1)], 1)
+        grande = _linhas([_vendedor(i) for i in range(2, 10)], 3)
+
+        with CaptureQueriesContext(connection) as poucas:
+            gravar_pedido(cliente_fake, pequeno, endereco_entrega="Rua A")
+        with CaptureQueriesContext(connection) as muitas:
+            pedido = gravar_pedido(cliente_fake, grande, endereco_entrega="Rua B")
+
+        assert len(muitas) == len(poucas)
+        # Pedido, sub-pedidos, itens e vendas diárias dos vendedores.
+        assert len(_inserts(muitas)) == 4
+        assert pedido.sub_pedidos.count() == 8
+        assert pedido.valor_produtos == Decimal("200.00")
+        assert ItemPedido.objects.filter(sub_pedido__pedido_principal=pedido).count() == 32
+
+    def test_subtotais_e_itens_ficam_no_vendedor_certo(self, cliente_fake, monkeypatch):
+        # Caminho do MySQL: ids dos sub-pedidos buscados depois do INSERT.
+        monkeypatch.setattr(
+            type(connection.features), "can_return_rows_from_bulk_insert", False
+        )
+        vendedores = [_vendedor(1), _vendedor(2)]
+        linhas = _linhas(vendedores, 2)
+
+        pedido = gravar_pedido(cliente_fake, linhas, endereco_entrega="Rua A")
+
+        for sub_pedido in pedido.sub_pedidos.prefetch_related("itens"):
+            itens = list(sub_pedido.itens.all())
+            assert {
+                (item.produto or item.pacote_surpresa).vendedor_id for item in itens
+            } == {sub_pedido.vendedor_id}
+            assert sub_pedido.valor_subtotal == Decimal("20.00")
+        assert pedido.valor_total == Decimal("40.00")
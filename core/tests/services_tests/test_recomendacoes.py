@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core.models import (
+    CoCompra,
+    ItemPedido,
+    Pedido,
+    PedidoVendedor,
+    ProcessamentoCoCompra,
+    Produto,
+)
+from core.services import recomendacoes
+
+
+@pytest.fixture
+def produtos(vendedor_fake):
+    return {
+        nome: Produto.objects.create(
+            vendedor=vendedor_fake,
+            nome=nome,
+            preco=Decimal("5.00"),
+            quantidade_estoque=5,
+            tipo_quantidade="QUANTIA",
+        )
+        for nome in ("Pão", "Manteiga", "Café", "Leite")
+    }
+
+
+def _pedido(cliente, vendedor, *produtos, pk=None):
+    pedido = Pedido.objects.create(
+        pk=pk, cliente=cliente, valor_total=Decimal("0"), endereco_entrega="Rua A"
+    )
+    sub = PedidoVendedor.objects.create(
+        pedido_principal=pedido, vendedor=vendedor, valor_subtotal=Decimal("0")
+    )
+    for produto in produtos:
+        ItemPedido.objects.create(
+            sub_pedido=sub, produto=produto, quantidade=1, preco_unitario=produto.preco
+        )
+    return pedido
+
+
+@pytest.mark.django_db
+class TestRecomendacoes:
+    def test_incremental_soma_so_os_pedidos_novos(
+        self, produtos, vendedor_fake, cliente_fake
+    ):
+        pao, manteiga, cafe = produtos["Pão"], produtos["Manteiga"], produtos["Café"]
+        _pedido(cliente_fake, vendedor_fake, pao, manteiga)
+        _pedido(cliente_fake, vendedor_fake, pao, cafe)
+        recomendacoes.atualizar()
+
+        _pedido(cliente_fake, vendedor_fake, pao, manteiga)
+        processamento = recomendacoes.atualizar()
+
+        assert processamento.pedidos_processados == 1
+        assert CoCompra.objects.get(produto=pao, outro=manteiga).pedidos == 2
+        assert CoCompra.objects.get(produto=pao, outro=pao).pedidos == 3
+        assert recomendacoes.quem_comprou_tambem(pao) == [manteiga, cafe]
+        assert recomendacoes.atualizar() is None
+
+    def test_pedido_gravado_fora_de_ordem_entra_uma_vez(
+        self, produtos, vendedor_fake, cliente_fake
+    ):
+        pao, manteiga = produtos["Pão"], produtos["Manteiga"]
+        _pedido(cliente_fake, vendedor_fake, pao, manteiga, pk=50)
+        recomendacoes.atualizar()
+
+        # Checkout concorrente que pegou um id menor e gravou depois.
+        _pedido(cliente_fake, vendedor_fake, pao, manteiga, pk=40)
+        processamento = recomendacoes.atualizar()
+
+        assert processamento.pedidos_processados == 1
+        assert processamento.ultimo_pedido_id == 50
+        assert CoCompra.objects.get(produto=pao, outro=manteiga).pedidos == 2
+        assert recomendacoes.atualizar() is None
+
+    def test_do_zero_da_o_mesmo_resultado(self, produtos, vendedor_fake, cliente_fake):
+        pao, manteiga = produtos["Pão"], produtos["Manteiga"]
+        _pedido(cliente_fake, vendedor_fake, pao, manteiga)
+        recomendacoes.atualizar()
+        _pedido(cliente_fake, vendedor_fake, pao, manteiga)
+        recomendacoes.atualizar()
+        incremental = dict(CoCompra.objects.values_list("pk", "pedidos"))
+
+        call_command("atualizar_recomendacoes", "--do-zero")
+
+        assert sorted(CoCompra.objects.values_list("pedidos", flat=True)) == sorted(
+            incremental.values()
+        )
+        assert ProcessamentoCoCompra.objects.count() == 1
+
+    def test_carrinho_soma_vizinhos_e_ignora_o_que_ja_esta_nele(
+        self, client, produtos, vendedor_fake, cliente_fake, django_assert_num_queries
+    ):
+        pao, manteiga, cafe, leite = produtos.values()
+        _pedido(cliente_fake, vendedor_fake, pao, manteiga, cafe)
+        _pedido(cliente_fake, vendedor_fake, cafe, leite)
+        recomendacoes.atualizar()
+
+        with django_assert_num_queries(2):
+            sugeridos = recomendacoes.para_carrinho([pao.pk, manteiga.pk])
+        assert sugeridos == [cafe]
+
+        sessao = client.session
+        sessao["carrinho"] = {f"produto_{pao.pk}": {"quantidade": 1}}
+        sessao.save()
+        resposta = client.get(reverse("core:ver_carrinho"))
+        assert resposta.context["quem_comprou_tambem"] == [manteiga, cafe]
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core.models import (
+    CategoriaProduto,
+    ItemPedido,
+    Pedido,
+    PedidoVendedor,
+    Produto,
+    ProdutoRelacionado,
+)
+from core.services import relacionados
+
+
+def _pedido(cliente, vendedor, *produtos):
+    pedido = Pedido.objects.create(
+        cliente=cliente, valor_total=Decimal("0"), endereco_entrega="Rua A"
+    )
+    sub = PedidoVendedor.objects.create(
+        pedido_principal=pedido, vendedor=vendedor, valor_subtotal=Decimal("0")
+    )
+    for produto in produtos:
+        ItemPedido.objects.create(
+            sub_pedido=sub, produto=produto, quantidade=1, preco_unitario=produto.preco
+        )
+
+
+@pytest.mark.django_db
+class TestRelacionados:
+    def test_compra_conjunta_pesa_mais_que_categoria(
+        self, vendedor_fake, cliente_fake, criar_produto
+    ):
+        frutas = CategoriaProduto.objects.create(nome="Frutas", slug="frutas")
+        banana = criar_produto(nome="Banana", categoria=frutas)
+        maca = criar_produto(nome="Maçã", categoria=frutas)
+        aveia = criar_produto(nome="Aveia")
+        _pedido(cliente_fake, vendedor_fake, banana, aveia)
+        _pedido(cliente_fake, vendedor_fake, banana, aveia)
+
+        call_command("recalcular_relacionados")
+
+        ordem = list(
+            ProdutoRelacionado.objects.filter(produto=banana).values_list(
+                "relacionado_id", flat=True
+            )
+        )
+        assert ordem == [aveia.pk, maca.pk]
+
+    def test_leitura_descarta_sem_estoque_numa_consulta(
+        self, criar_produto, django_assert_num_queries
+    ):
+        frutas = CategoriaProduto.objects.create(nome="Frutas", slug="frutas")
+        banana = criar_produto(nome="Banana", categoria=frutas)
+        maca = criar_produto(nome="Maçã", categoria=frutas)
+        pera = criar_produto(nome="Pera", categoria=frutas)
+        relacionados.recalcular()
+        Produto.objects.filter(pk=pera.pk).update(quantidade_estoque=0)
+
+        with django_assert_num_queries(1):
+            assert relacionados.relacionados_de(banana) == [maca]
+
+    def test_pagina_de_detalhe_usa_a_tabela(self, client, criar_produto):
+        banana = criar_produto(nome="Banana")
+        aveia = criar_produto(nome="Aveia")
+        relacionados.recalcular()
+
+        resposta = client.get(reverse("core:produto_detalhe", args=[banana.pk]))
+
+        assert list(resposta.context["produtos_relacionados"]) == [aveia]
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.models import ReservaEstoque
+from core.services import reservas
+from core.services.carrinho import ArmazenamentoSessao, CarrinhoService
+from core.services.estoque import EstoqueInsuficiente
+
+
+@pytest.fixture
+def pacote(criar_pacote):
+    return criar_pacote(preco="12.00", estoque=3)
+
+
+def _carrinho():
+    return CarrinhoService(ArmazenamentoSessao({}))
+
+
+def _vencer(dono):
+    ReservaEstoque.objects.filter(dono=dono).update(
+        expira_em=timezone.now() - timedelta(seconds=1)
+    )
+
+
+@pytest.mark.django_db
+class TestReservas:
+    def test_reserva_segura_o_estoque_ate_vencer(self, pacote):
+        primeiro, segundo = _carrinho(), _carrinho()
+        primeiro.adicionar(pacote, 2)
+
+        with pytest.raises(EstoqueInsuficiente) as erro:
+            segundo.adicionar(pacote, 2)
+        assert erro.value.disponivel == 1
+        assert reservas.disponivel(pacote) == 1
+
+        _vencer(primeiro.armazenamento.dono())
+        segundo.adicionar(pacote, 2)
+        assert reservas.disponivel(pacote) == 1
+
+    def test_quantidade_acima_do_livre_fica_no_maximo_reservavel(self, pacote):
+        primeiro, segundo = _carrinho(), _carrinho()
+        primeiro.adicionar(pacote, 2)
+        segundo.adicionar(pacote, 1)
+
+        with pytest.raises(EstoqueInsuficiente):
+            segundo.definir_quantidade("pacote", pacote.pk, 3)
+
+        assert segundo.quantidades == {("pacote", pacote.pk): 1}
+
+    def test_confirmar_refaz_reserva_vencida_se_ainda_houver_estoque(self, pacote):
+        carrinho = _carrinho()
+        carrinho.adicionar(pacote, 2)
+        dono = carrinho.armazenamento.dono()
+        _vencer(dono)
+
+        carrinho.confirmar_reservas()
+        assert ReservaEstoque.objects.get(dono=dono).expira_em > timezone.now()
+
+        _vencer(dono)
+        _carrinho().adicionar(pacote, 2)
+        with pytest.raises(EstoqueInsuficiente):
+            carrinho.confirmar_reservas()
+
+    def test_remover_e_limpar_soltam_as_reservas(self, pacote):
+        carrinho = _carrinho()
+        carrinho.adicionar(pacote, 1)
+        carrinho.remover("pacote", pacote.pk)
+        assert not ReservaEstoque.objects.exists()
+
+        carrinho.adicionar(pacote, 1)
+        carrinho.limpar()
+        assert not ReservaEstoque.objects.exists()
+
+    def test_comando_apaga_so_as_vencidas(self, pacote):
+        vencida, ativa = _carrinho(), _carrinho()
+        vencida.adicionar(pacote, 1)
+        ativa.adicionar(pacote, 1)
+        _vencer(vencida.armazenamento.dono())
+
+        call_command("limpar_reservas")
+
+        assert list(ReservaEstoque.objects.values_list("dono", flat=True)) == [
+            ativa.armazenamento.dono()
+        ]
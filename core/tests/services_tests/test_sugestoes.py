@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import CategoriaProduto, Produto
+from core.services import sugestoes
+from core.services.versoes import versao
+
+
+class TestIndicePrefixos:
+    def test_prefixo_sem_acento_e_no_meio_do_nome(self):
+        indice = sugestoes.IndicePrefixos(
+            [
+                {"tipo": "produto", "id": 1, "texto": "Pão de Mel"},
+                {"tipo": "produto", "id": 2, "texto": "Bolo de Maçã"},
+                {"tipo": "categoria", "id": 3, "texto": "Padaria"},
+            ]
+        )
+
+        assert [s["id"] for s in indice.buscar("pa")] == [3, 1]
+        assert [s["id"] for s in indice.buscar("MACA")] == [2]
+        assert indice.buscar("   ") == []
+
+    def test_respeita_o_limite(self):
+        indice = sugestoes.IndicePrefixos(
+            [{"tipo": "produto", "id": i, "texto": f"Queijo {i}"} for i in range(30)]
+        )
+
+        assert len(indice.buscar("que", limite=5)) == 5
+
+
+@pytest.mark.django_db
+class TestSugestoes:
+    def test_indice_reflete_mudancas_via_signals(self, criar_produto):
+        criar_produto(nome="Banana prata")
+        assert [s["texto"] for s in sugestoes.sugerir("ban")] == ["Banana prata"]
+
+        criar_produto(nome="Bananada")
+        CategoriaProduto.objects.create(nome="Bebidas", slug="bebidas")
+
+        assert {s["texto"] for s in sugestoes.sugerir("ban")} == {
+            "Banana prata",
+            "Bananada",
+        }
+        assert sugestoes.sugerir("beb")[0]["tipo"] == "categoria"
+        assert sugestoes.sugerir("loja global")[0]["tipo"] == "vendedor"
+
+    def test_versao_so_sobe_quando_o_indice_muda(self, criar_produto):
+        produto = criar_produto(nome="Banana prata")
+        inicial = versao(sugestoes.NOME_VERSAO)
+
+        produto.preco = Decimal("6.00")
+        produto.quantidade_estoque = 2
+        produto.save()
+        Produto.objects.get(pk=produto.pk).save(update_fields=["descricao"])
+        assert versao(sugestoes.NOME_VERSAO) == inicial
+
+        produto.quantidade_estoque = 0
+        produto.save()
+        assert versao(sugestoes.NOME_VERSAO) != inicial
+
+    def test_indice_velho_atende_enquanto_outra_thread_remonta(
+        self, criar_produto, django_assert_num_queries
+    ):
+        criar_produto(nome="Banana prata")
+        sugestoes.sugerir("ban")
+        criar_produto(nome="Bananada")
+
+        sugestoes._trava.acquire()
+        try:
+            with django_assert_num_queries(0):
+                assert [s["texto"] for s in sugestoes.sugerir("ban")] == [
+                    "Banana prata"
+                ]
+        finally:
+            sugestoes._trava.release()
+        assert len(sugestoes.sugerir("ban")) == 2
+
+    def test_consulta_nao_toca_no_banco(self, criar_produto, django_assert_num_queries):
+        criar_produto(nome="Banana prata")
+        sugestoes.sugerir("ban")
+
+        with django_assert_num_queries(0):
+            assert sugestoes.sugerir("ban")
+
+    def test_endpoint(self, criar_produto):
+        criar_produto(nome="Banana prata")
+        criar_produto(nome="Chocolate", ativo=False)
+
+        resposta = APIClient().get(
+            reverse("produto-sugestoes"), {"q": "ban", "limite": "50"}
+        )
+
+        assert resposta.status_code == 200
+        assert [s["texto"] for s in resposta.json()["resultados"]] == ["Banana prata"]
+        assert APIClient().get(reverse("produto-sugestoes"), {"q": "choc"}).json()[
+            "resultados"
+        ] == []
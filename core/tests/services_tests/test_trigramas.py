@@ -0,0 +1,74 @@
+import pytest
+from django.urls import reverse
+
+from core.models import Produto, Receita, TrigramaBusca
+from core.services import trigramas
+
+
+def test_trigramas_ignoram_acento_e_caixa():
+    assert trigramas.trigramas("Pão") == {"  p", " pa", "pao", "ao "}
+    assert trigramas.trigramas("PAO") == trigramas.trigramas("pão")
+
+
+@pytest.mark.django_db
+class TestBuscaAproximada:
+    def test_encontra_nome_com_erro_de_digitacao(self, criar_produto):
+        chocolate = criar_produto(nome="Chocolate amargo")
+        criar_produto(nome="Banana")
+
+        ids = [pk for pk, _ in trigramas.parecidos("produto", "chocolat amrgo")]
+
+        assert ids == [chocolate.pk]
+
+    def test_signals_mantem_os_trigramas(self, criar_produto):
+        produto = criar_produto(nome="Maçã")
+        assert trigramas.parecidos("produto", "maca")
+
+        produto.nome = "Pera"
+        produto.save()
+        assert not trigramas.parecidos("produto", "maca")
+        assert trigramas.parecidos("produto", "pera")
+
+        produto.delete()
+        assert not TrigramaBusca.objects.exists()
+
+    def test_reconstruir(self, criar_produto):
+        criar_produto(nome="Queijo minas")
+        TrigramaBusca.objects.all().delete()
+
+        assert trigramas.reconstruir()["produto"] == 1
+        assert trigramas.parecidos("produto", "qeijo")
+
+    def test_vitrine_cai_na_busca_aproximada(self, client, criar_produto):
+        queijo = criar_produto(nome="Queijo minas")
+
+        resposta = client.get(reverse("core:produtos"), {"termo": "qeijo mnas"})
+
+        assert resposta.context["busca_aproximada"]
+        assert [i.pk for i in resposta.context["page_obj"]] == [queijo.pk]
+
+    def test_indisponiveis_nao_ocupam_as_vagas(self, criar_produto):
+        # Nomes mais parecidos com o termo, mas fora da vitrine.
+        for _ in range(trigramas.LIMITE_RESULTADOS + 5):
+            criar_produto(nome="Queijo")
+        Produto.objects.filter(nome="Queijo").update(ativo=False)
+        minas = criar_produto(nome="Queijo minas")
+
+        resultado = Produto.objects.buscar_aproximado("qeijo")
+
+        assert [p.pk for p in resultado] == [minas.pk]
+        assert resultado[0].relevancia > 0
+
+    def test_receitas_cai_na_busca_aproximada(self, client):
+        bolo = Receita.objects.create(
+            nome="Bolo de cenoura", tempo_preparo=40, rendimento="8 porções"
+        )
+        Receita.objects.create(nome="Torta de limão", tempo_preparo=60, rendimento="6")
+
+        exata = client.get(reverse("core:receitas"), {"termo": "cenoura"})
+        aproximada = client.get(reverse("core:receitas"), {"termo": "bolo de cenora"})
+
+        assert not exata.context["busca_aproximada"]
+        assert list(exata.context["page_obj"]) == [bolo]
+        assert aproximada.context["busca_aproximada"]
+        assert list(aproximada.context["page_obj"]) == [bolo]
@@ -0,0 +1,149 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import ReservaEstoque
+from core.models.carrinho import Carrinho, ItemCarrinho
+from core.services import estoque, facetas, pedidos, reservas, venda_relampago
+from core.services.estoque import EstoqueInsuficiente
+
+
+@pytest.fixture
+def pacote(criar_pacote):
+    return criar_pacote(preco="9.90", estoque=3, venda_relampago=True)
+
+
+@pytest.fixture
+def produto(criar_produto):
+    return criar_produto(preco="2.00", estoque=1)
+
+
+def _saldo(pacote):
+    return cache.get(venda_relampago.CHAVE_SALDO.format(pacote.pk))
+
+
+@pytest.mark.django_db
+class TestVendaRelampago:
+    def test_saldo_no_cache_barra_a_venda_sem_tocar_no_pacote(
+        self, pacote, django_capture_on_commit_callbacks
+    ):
+        assert _saldo(pacote) == 3
+
+        with CaptureQueriesContext(connection) as consultas:
+            with django_capture_on_commit_callbacks(execute=True):
+                estoque.debitar([(pacote, 2)])
+        assert not any("core_pacotesurpresa" in c["sql"] for c in consultas)
+
+        with pytest.raises(EstoqueInsuficiente) as erro:
+            estoque.debitar([(pacote, 2)])
+        assert erro.value.disponivel == 1
+        assert _saldo(pacote) == 1
+
+        pacote.refresh_from_db()
+        assert pacote.quantidade_estoque == 3
+
+    def test_falha_em_outro_item_devolve_o_saldo(self, pacote, produto):
+        with pytest.raises(EstoqueInsuficiente):
+            estoque.debitar([(pacote, 1), (produto, 5)])
+
+        assert _saldo(pacote) == 3
+
+    def test_descarga_leva_as_vendas_confirmadas_ao_banco(
+        self, pacote, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            estoque.debitar([(pacote, 3)])
+
+        call_command("descarregar_relampago")
+
+        pacote.refresh_from_db()
+        assert pacote.quantidade_estoque == 0
+        assert venda_relampago._vendidos([pacote.pk]) == {pacote.pk: 0}
+        assert _saldo(pacote) == 0
+
+    def test_descarga_de_pacote_ja_zerado_nao_desconta_facetas_de_novo(
+        self, pacote
+    ):
+        pacote.quantidade_estoque = 0
+        pacote.save()
+        cache.set(venda_relampago.CHAVE_VENDIDOS.format(pacote.pk), 2)
+
+        venda_relampago.descarregar()
+
+        assert facetas.divergencias() == {}
+
+    def test_checkout_desfeito_depois_do_debito_devolve_o_saldo(
+        self, pacote, cliente_fake, monkeypatch
+    ):
+        carrinho = Carrinho.objects.create(usuario=cliente_fake)
+        ItemCarrinho.objects.create(carrinho=carrinho, pacote=pacote, quantidade=2)
+
+        def falhar(*args, **kwargs):
+            raise RuntimeError("falha ao gravar o pedido")
+
+        monkeypatch.setattr(pedidos, "gravar_pedido", falhar)
+        api = APIClient()
+        api.force_authenticate(user=cliente_fake.usuario)
+
+        with pytest.raises(RuntimeError):
+            api.post("/api/pedido/", {}, format="json")
+
+        assert venda_relampago.saldo(pacote) == 3
+
+    def test_reserva_so_confere_o_saldo(self, pacote):
+        reservas.reservar("sessao:a", pacote, 3)
+
+        assert not ReservaEstoque.objects.exists()
+        with pytest.raises(EstoqueInsuficiente):
+            reservas.reservar("sessao:a", pacote, 4)
+
+    def test_edicao_do_vendedor_atualiza_o_saldo(self, pacote):
+        pacote.quantidade_estoque = 10
+        pacote.save()
+
+        assert _saldo(pacote) == 10
+
+
+@pytest.mark.django_db(transaction=True)
+def test_transacao_desfeita_sem_excecao_devolve_so_o_que_nao_confirmou(pacote):
+    with venda_relampago.devolver_se_desfeito():
+        with transaction.atomic():
+            estoque.debitar([(pacote, 1)])
+    with venda_relampago.devolver_se_desfeito():
+        with transaction.atomic():
+            estoque.debitar([(pacote, 2)])
+            transaction.set_rollback(True)
+
+    assert _saldo(pacote) == 2
+    assert venda_relampago._vendidos([pacote.pk]) == {pacote.pk: 1}
+
+
+@pytest.mark.django_db
+class TestReconciliar:
+    def test_saldo_acima_do_esperado_e_corrigido_na_hora(self, pacote):
+        cache.incr(venda_relampago.CHAVE_SALDO.format(pacote.pk), 5)
+
+        assert venda_relampago.reconciliar() == {pacote.pk: -5}
+        assert _saldo(pacote) == 3
+
+    def test_falta_so_e_devolvida_na_segunda_rodada(self, pacote):
+        # Pedido desfeito depois do débito: o saldo saiu e a venda não veio.
+        estoque.debitar([(pacote, 2)])
+
+        assert venda_relampago.reconciliar() == {}
+        assert _saldo(pacote) == 1
+        assert venda_relampago.reconciliar() == {pacote.pk: 2}
+        assert _saldo(pacote) == 3
+
+    def test_saldo_despejado_e_recriado_do_banco(
+        self, pacote, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            estoque.debitar([(pacote, 1)])
+        cache.delete(venda_relampago.CHAVE_SALDO.format(pacote.pk))
+
+        assert venda_relampago.reconciliar() == {pacote.pk: 2}
+        assert _saldo(pacote) == 2
@@ -0,0 +1,105 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import (
+    ItemPedido,
+    Pedido,
+    PedidoVendedor,
+    Perfil,
+    VendaDiariaVendedor,
+)
+from core.services import vendas_diarias
+from core.services.pedidos import gravar_pedido
+
+Status = PedidoVendedor.StatusPedidoVendedor
+
+
+def _hoje(vendedor):
+    return VendaDiariaVendedor.objects.get(vendedor=vendedor, dia=timezone.localdate())
+
+
+@pytest.mark.django_db
+class TestVendasDiarias:
+    def test_pedido_e_mudanca_de_status_somam_na_mesma_linha(
+        self, vendedor_fake, cliente_fake, criar_produto
+    ):
+        usuario = User.objects.create_user(username="outra", password="x")
+        outro = Perfil.objects.create(
+            usuario=usuario, tipo=Perfil.TipoUsuario.VENDEDOR, nome_negocio="Outra"
+        )
+        linhas = [(criar_produto(), 3), (criar_produto(outro, preco="2.00"), 1)]
+
+        gravar_pedido(cliente_fake, linhas, endereco_entrega="Rua A")
+        pedido = gravar_pedido(cliente_fake, linhas, endereco_entrega="Rua B")
+
+        venda = _hoje(vendedor_fake)
+        assert (venda.pedidos, venda.itens, venda.receita) == (2, 6, Decimal("30.00"))
+        assert _hoje(outro).receita == Decimal("4.00")
+
+        sub = pedido.sub_pedidos.get(vendedor=vendedor_fake)
+        sub.status = Status.CANCELADO
+        sub.save()
+
+        venda.refresh_from_db()
+        assert (venda.pedidos, venda.cancelados, venda.itens, venda.receita) == (
+            2,
+            1,
+            3,
+            Decimal("15.00"),
+        )
+        assert vendas_diarias.divergencias() == {}
+
+    def test_gravacoes_avulsas_e_exclusao_pelos_signals(
+        self, vendedor_fake, cliente_fake, criar_produto
+    ):
+        produto = criar_produto()
+        pedido = Pedido.objects.create(
+            cliente=cliente_fake, valor_total=Decimal("10.00"), endereco_entrega="Rua A"
+        )
+        sub = PedidoVendedor.objects.create(
+            pedido_principal=pedido, vendedor=vendedor_fake, valor_subtotal=Decimal("10.00")
+        )
+        item = ItemPedido.objects.create(
+            sub_pedido=sub, produto=produto, quantidade=2, preco_unitario=produto.preco
+        )
+        item.quantidade = 4
+        item.save()
+
+        venda = _hoje(vendedor_fake)
+        assert (venda.pedidos, venda.itens, venda.receita) == (1, 4, Decimal("10.00"))
+        assert vendas_diarias.divergencias() == {}
+
+        pedido.delete()
+
+        venda.refresh_from_db()
+        assert (venda.pedidos, venda.itens, venda.receita) == (0, 0, Decimal("0.00"))
+
+    def test_reconstrucao_corrige_divergencias(
+        self, vendedor_fake, cliente_fake, criar_produto
+    ):
+        gravar_pedido(cliente_fake, [(criar_produto(), 2)], endereco_entrega="Rua A")
+        VendaDiariaVendedor.objects.update(itens=99)
+
+        with pytest.raises(CommandError):
+            call_command("reconstruir_vendas_diarias", "--verificar")
+        call_command("reconstruir_vendas_diarias")
+
+        assert vendas_diarias.divergencias() == {}
+        assert _hoje(vendedor_fake).itens == 2
+
+    def test_painel_le_o_resumo(
+        self, client, vendedor_fake, cliente_fake, criar_produto
+    ):
+        gravar_pedido(cliente_fake, [(criar_produto(), 2)], endereco_entrega="Rua A")
+        client.force_login(vendedor_fake.usuario)
+
+        resposta = client.get(reverse("core:painel_pedidos_vendedor"))
+
+        assert resposta.context["vendas_hoje"].receita == Decimal("10.00")
+        assert len(resposta.context["vendas_semana"]) == 7
+        assert resposta.context["vendas_semana"][1].pedidos == 0
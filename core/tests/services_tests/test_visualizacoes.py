@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core.models import Produto
+from core.services import visualizacoes
+
+
+@pytest.fixture
+def produtos(vendedor_fake):
+    return [
+        Produto.objects.create(
+            vendedor=vendedor_fake,
+            nome=f"Produto {i}",
+            preco=Decimal("5.00"),
+            quantidade_estoque=3,
+            tipo_quantidade="QUANTIA",
+        )
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+class TestVisualizacoes:
+    def test_registrar_nao_toca_no_banco(self, produtos, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            for _ in range(3):
+                visualizacoes.registrar(produtos[0].pk)
+
+        produtos[0].refresh_from_db()
+        assert produtos[0].visualizacoes == 0
+        assert visualizacoes.total(produtos[0]) == 3
+
+    def test_descarga_grava_tudo_num_update(self, produtos, django_assert_num_queries):
+        for produto, vezes in zip(produtos, (3, 1, 0)):
+            for _ in range(vezes):
+                visualizacoes.registrar(produto.pk)
+
+        with django_assert_num_queries(1):
+            assert visualizacoes.descarregar() == 2
+
+        gravadas = dict(Produto.objects.values_list("pk", "visualizacoes"))
+        assert [gravadas[p.pk] for p in produtos] == [3, 1, 0]
+        assert visualizacoes.pendentes(p.pk for p in produtos) == {
+            p.pk: 0 for p in produtos
+        }
+        assert visualizacoes.descarregar() == 0
+
+    def test_visitas_depois_da_descarga_entram_na_proxima(self, produtos):
+        visualizacoes.registrar(produtos[0].pk)
+        visualizacoes.descarregar()
+        visualizacoes.registrar(produtos[0].pk)
+        visualizacoes.registrar(produtos[0].pk)
+
+        produtos[0].refresh_from_db()
+        assert visualizacoes.total(produtos[0]) == 3
+
+        call_command("descarregar_visualizacoes")
+        produtos[0].refresh_from_db()
+        assert produtos[0].visualizacoes == 3
+
+    def test_detalhe_conta_visita_e_api_soma_pendentes(self, client, produtos):
+        client.get(reverse("core:produto_detalhe", args=[produtos[0].pk]))
+        client.get(reverse("core:produto_detalhe", args=[produtos[0].pk]))
+
+        resposta = client.get(f"/api/produto/{produtos[0].pk}/")
+
+        assert resposta.json()["visualizacoes"] == 2
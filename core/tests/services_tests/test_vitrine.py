@@ -0,0 +1,177 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from core.models import PacoteSurpresa, Produto
+from core.services.vitrine import FeedVitrine, chave_fragmento
+
+
+@pytest.fixture
+def fontes(vendedor_fake):
+    # Preços repetidos entre as duas tabelas: o desempate por tipo e id
+    # precisa manter a ordem total.
+    for i in range(11):
+        Produto.objects.create(
+            vendedor=vendedor_fake,
+            nome=f"Produto {i:02d}",
+            preco=Decimal(10 + i % 3),
+            quantidade_estoque=5,
+            tipo_quantidade="QUANTIA",
+        )
+    for i in range(7):
+        PacoteSurpresa.objects.create(
+            vendedor=vendedor_fake,
+            nome=f"Pacote {i:02d}",
+            preco=Decimal(10 + i % 3),
+            quantidade_estoque=2,
+        )
+    return {
+        "produto": Produto.objects.disponiveis(),
+        "pacote": PacoteSurpresa.objects.disponiveis(),
+    }
+
+
+def _chave(obj):
+    return (obj.tipo_item, obj.pk)
+
+
+def _esperado(fontes, ordenacao):
+    campo = ordenacao.lstrip("-")
+    desc = ordenacao.startswith("-")
+    # Nome: minúsculas, comparadas por código (como a colação binária).
+    normalizar = str.lower if campo == "nome" else (lambda valor: valor)
+    itens = [obj for queryset in fontes.values() for obj in queryset]
+    itens.sort(key=lambda obj: obj.pk, reverse=desc)
+    itens.sort(key=lambda obj: obj.tipo_item != "produto")
+    itens.sort(key=lambda obj: normalizar(getattr(obj, campo)), reverse=desc)
+    return [_chave(obj) for obj in itens]
+
+
+@pytest.mark.django_db
+class TestFeedVitrine:
+    @pytest.mark.parametrize("ordenacao", ["-data_criacao", "preco", "-preco", "nome"])
+    def test_percorre_as_duas_tabelas_sem_repetir(self, fontes, ordenacao):
+        feed = FeedVitrine(fontes, ordenacao, 5)
+
+        vistos, pagina = [], feed.pagina()
+        while True:
+            vistos.extend(_chave(obj) for obj in pagina)
+            if not pagina.has_next():
+                break
+            pagina = feed.pagina(pagina.cursor_proximo)
+
+        assert vistos == _esperado(fontes, ordenacao)
+
+    def test_nome_com_caixa_e_acentos_misturados(self, fontes, vendedor_fake):
+        # Maiúsculas, minúsculas e acentos entre as duas tabelas: o cursor
+        # da página intercalada precisa bater com o filtro no banco.
+        for nome in ("abacate", "Ébano", "banana", "ÁGUA", "Zebra", "érica"):
+            PacoteSurpresa.objects.create(
+                vendedor=vendedor_fake,
+                nome=nome,
+                preco=Decimal("5.00"),
+                quantidade_estoque=1,
+            )
+        feed = FeedVitrine(fontes, "nome", 4)
+
+        vistos, pagina = [], feed.pagina()
+        while True:
+            vistos.extend(_chave(obj) for obj in pagina)
+            if not pagina.has_next():
+                break
+            pagina = feed.pagina(pagina.cursor_proximo)
+
+        inteira = FeedVitrine(fontes, "nome", 100).pagina()
+        assert vistos == [_chave(obj) for obj in inteira]
+
+    def test_volta_para_pagina_anterior(self, fontes):
+        feed = FeedVitrine(fontes, "preco", 5)
+        primeira = feed.pagina()
+        segunda = feed.pagina(primeira.cursor_proximo)
+
+        anterior = feed.pagina(segunda.cursor_anterior)
+
+        assert [_chave(o) for o in anterior] == [_chave(o) for o in primeira]
+        assert not anterior.has_previous()
+        assert segunda.total == 18
+
+    def test_cada_pagina_busca_no_maximo_uma_consulta_por_tabela(
+        self, fontes, django_assert_num_queries
+    ):
+        feed = FeedVitrine(fontes, "-data_criacao", 5)
+        cursor = feed.pagina().cursor_proximo
+
+        with django_assert_num_queries(2):
+            pagina = feed.pagina(cursor)
+
+        assert len(pagina) == 5
+
+
+@pytest.mark.django_db
+class TestCacheFragmento:
+    def _ajax(self, client, **parametros):
+        return client.get(
+            reverse("core:produtos"),
+            parametros,
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+
+    def test_chave_normaliza_filtros(self):
+        assert chave_fragmento(
+            {"termo": " pão  de mel ", "preco_min": "10"}, "relevancia"
+        ) == chave_fragmento(
+            {"termo": "pão de mel", "preco_min": "10.00", "categoria": ""},
+            "relevancia",
+        )
+        assert chave_fragmento({"preco_min": "abc"}, "nome") == chave_fragmento(
+            {}, "nome"
+        )
+
+    def test_repeticao_vem_do_cache_ate_o_catalogo_mudar(
+        self, client, vendedor_fake, django_assert_max_num_queries
+    ):
+        produto = Produto.objects.create(
+            vendedor=vendedor_fake,
+            nome="Banana",
+            preco=Decimal("3.00"),
+            quantidade_estoque=5,
+            tipo_quantidade="QUANTIA",
+        )
+        primeira = self._ajax(client, ordenacao="preco").json()["html"]
+        assert "Banana" in primeira
+
+        with django_assert_max_num_queries(0):
+            assert self._ajax(client, ordenacao="preco").json()["html"] == primeira
+
+        produto.nome = "Laranja"
+        produto.save()
+
+        atualizada = self._ajax(client, ordenacao="preco").json()["html"]
+        assert "Laranja" in atualizada
+        assert "Banana" not in atualizada
+
+    def test_links_do_fragmento_saem_dos_filtros_normalizados(
+        self, client, vendedor_fake
+    ):
+        for i in range(13):
+            Produto.objects.create(
+                vendedor=vendedor_fake,
+                nome=f"Produto {i:02d}",
+                preco=Decimal("10.00"),
+                quantidade_estoque=5,
+                tipo_quantidade="QUANTIA",
+            )
+
+        primeira = self._ajax(
+            client, ordenacao="preco", preco_min="10.00", utm_source="email"
+        ).json()["html"]
+        assert "cursor=" in primeira
+        assert "utm_source" not in primeira
+        assert "preco_min=10&" in primeira
+
+        # A mesma chave, sem o parâmetro estranho: mesmo HTML do cache.
+        assert (
+            self._ajax(client, ordenacao="preco", preco_min="10").json()["html"]
+            == primeira
+        )
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Avaliacao, Produto, Receita
+
+
+@pytest.fixture
+def avaliar(cliente_fake, vendedor_fake):
+    def _avaliar(quantidade):
+        for n in range(quantidade):
+            produto = Produto.objects.create(
+                vendedor=vendedor_fake,
+                nome=f"Produto {n}",
+                preco=Decimal("1.00"),
+                quantidade_estoque=5,
+            )
+            receita = Receita.objects.create(
+                autor=cliente_fake.usuario,
+                nome=f"Receita {n}",
+                tempo_preparo=10,
+                rendimento="2 porções",
+            )
+            for alvo in (produto, receita, vendedor_fake):
+                Avaliacao.objects.create(
+                    autor=cliente_fake.usuario, content_object=alvo, nota=3
+                )
+
+    return _avaliar
+
+
+def _consultas(client, url):
+    with CaptureQueriesContext(connection) as consultas:
+        resposta = client.get(url)
+    assert resposta.status_code == 200
+    return resposta, len(consultas)
+
+
+@pytest.mark.django_db
+class TestListagemDeAvaliacoes:
+    def test_pagina_mistura_alvos_sem_uma_consulta_por_avaliacao(
+        self, client, avaliar
+    ):
+        url = reverse("core:avaliacao")
+        avaliar(1)
+        _consultas(client, url)  # aquece o cache de ContentType
+        _, poucas = _consultas(client, url)
+
+        avaliar(2)
+        resposta, muitas = _consultas(client, url)
+
+        assert muitas == poucas
+        assert "Produto 1" in resposta.content.decode()
+        assert "Receita 1" in resposta.content.decode()
+
+    def test_perfil_do_vendedor_lista_o_que_entra_na_media(
+        self, client, avaliar, vendedor_fake
+    ):
+        avaliar(2)
+        client.force_login(vendedor_fake.usuario)
+
+        resposta = client.get(reverse("core:perfil"))
+
+        # Produtos e o próprio perfil; receitas não são do vendedor.
+        assert len(resposta.context["avaliacoes_produtos"]) == 4
+        assert resposta.context["total_avaliacoes"] == 4
@@ -78,8 +78,9 @@ def test_view_produtos_lista_apenas_ativos_com_estoque(client, db, setup_dados_b
 
     assert response.status_code == 200
 
-    # Produtos ficam em page_obj (paginado)
-    produtos_retornados = response.context["page_obj"].object_list
+    # Produtos e pacotes vêm juntos no feed paginado
+    itens = response.context["page_obj"].object_list
+    produtos_retornados = [i for i in itens if i.tipo_item == "produto"]
     assert (
         len(produtos_retornados) == 2
     )  # Maçã e Banana (Chocolate=estoque 0, Bombom=inativo)
@@ -90,8 +91,7 @@ def test_view_produtos_lista_apenas_ativos_com_estoque(client, db, setup_dados_b
     assert "Chocolate" not in nomes_produtos
     assert "Bombom" not in nomes_produtos
 
-    # Pacotes ficam em contexto separado
-    pacotes_retornados = list(response.context["pacotes"])
+    pacotes_retornados = [i for i in itens if i.tipo_item == "pacote"]
     assert len(pacotes_retornados) == 1  # só Pacote Doce (Pacote Salgado=inativo)
 
     nomes_pacotes = {p.nome for p in pacotes_retornados}
@@ -109,6 +109,11 @@ urlpatterns = [
     path("checkout/", checkout.checkout_page, name="checkout_page"),
     path("finalizar-pedido/", checkout.finalizar_pedido, name="finalizar_pedido"),
     path("aplicar-cupom/", checkout.aplicar_cupom, name="aplicar_cupom"),
+    path(
+        "checkout/aplicar-cupom/",
+        checkout.api_aplicar_cupom,
+        name="api_aplicar_cupom",
+    ),
     # ==============================================================================
     # ROTAS DE PEDIDOS
     # ==============================================================================
@@ -118,6 +123,11 @@ urlpatterns = [
         checkout.painel_pedidos_vendedor,
         name="painel_pedidos_vendedor",
     ),
+    path(
+        "vendedor/pedidos/export/",
+        checkout.exportar_pedidos_vendedor,
+        name="exportar_pedidos_vendedor",
+    ),
     # ==============================================================================
     # ROTAS DE CUPONS E PROMOÇÕES
     # ==============================================================================
@@ -22,7 +22,8 @@ from core.forms import (
     CompleteClientProfileForm,
     CompletePartnerProfileForm,
 )
-from core.models import Pedido, PedidoVendedor, Perfil, Produto
+from core.models import Pedido, Perfil, Produto
+from core.services import caixa_vendedor
 
 logger = logging.getLogger(__name__)
 
@@ -174,9 +175,9 @@ def perfil(request):
 
     dashboard_context = {}
     if perfil.tipo == Perfil.TipoUsuario.VENDEDOR:
-        dashboard_context["ultimos_pedidos"] = PedidoVendedor.objects.filter(
-            vendedor=perfil
-        ).order_by("-data_criacao")[:5]
+        dashboard_context["ultimos_pedidos"] = caixa_vendedor.caixa_de_entrada(
+            perfil
+        )[:5]
         dashboard_context["baixo_estoque"] = Produto.objects.filter(
             vendedor=perfil, ativo=True, quantidade_estoque__lte=F("estoque_minimo")
         ).order_by("quantidade_estoque")
@@ -10,7 +10,7 @@ from core.models import Avaliacao
 
 
 def avaliacao(request):
-    avaliacoes = Avaliacao.objects.all().order_by("-data_criacao")
+    avaliacoes = Avaliacao.objects.com_alvos().order_by("-data_criacao", "-pk")
     paginator = Paginator(avaliacoes, 10)
     page = paginator.get_page(request.GET.get("page"))
     return render(request, "core/avaliacao.html", {"page_obj": page})
@@ -1,4 +1,6 @@
+import datetime
 import json
+import uuid
 from decimal import Decimal
 
 from django.contrib import messages
@@ -6,21 +8,31 @@ from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db import transaction
 from django.db.models import Prefetch
-from django.http import JsonResponse
+from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from core.forms import CheckoutForm
+from core.idempotencia import idempotente
 from core.models import (
-    Cupom,
     ItemPedido,
-    PacoteSurpresa,
     Pedido,
     PedidoVendedor,
     Perfil,
-    Produto,
 )
+from core.pagination import paginar_keyset
+from core.services import (
+    caixa_vendedor,
+    cupons,
+    estoque,
+    exportacao,
+    pedidos,
+    venda_relampago,
+    vendas_diarias,
+)
+from core.services.carrinho import CarrinhoService
+from core.services.estoque import EstoqueInsuficiente
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -29,53 +41,18 @@ from core.models import (
 
 def _montar_carrinho(request):
     """
-    Constrói o carrinho detalhado a partir da sessão.
-    Retorna (carrinho_detalhado, total_carrinho, produtos_db, pacotes_db).
+    Resumo de preços do carrinho da sessão (``CarrinhoService.precos``):
+    só carrega produtos se o carrinho ou o catálogo mudou.
+    Retorna (linhas, total_carrinho).
     """
-    carrinho_session = request.session.get("carrinho", {})
-    if not carrinho_session:
-        return [], Decimal("0.00"), {}, {}
-
-    produto_ids = [
-        int(k.split("_")[1]) for k in carrinho_session if k.startswith("produto_")
-    ]
-    pacote_ids = [
-        int(k.split("_")[1]) for k in carrinho_session if k.startswith("pacote_")
-    ]
-
-    produtos_db = {
-        f"produto_{p.id}": p for p in Produto.objects.filter(id__in=produto_ids)
-    }
-    pacotes_db = {
-        f"pacote_{p.id}": p for p in PacoteSurpresa.objects.filter(id__in=pacote_ids)
-    }
-
-    carrinho_detalhado = []
-    total_carrinho = Decimal("0.00")
-
-    for item_key, item_data in carrinho_session.items():
-        item_obj = produtos_db.get(item_key) or pacotes_db.get(item_key)
-        if not item_obj:
-            continue
-        quantidade = int(item_data.get("quantidade", 0))
-        subtotal = item_obj.preco * quantidade
-        total_carrinho += subtotal
-        carrinho_detalhado.append(
-            {
-                "item_key": item_key,
-                "nome": item_obj.nome,
-                "quantidade": quantidade,
-                "preco": item_obj.preco,
-                "subtotal": subtotal,
-            }
-        )
+    resumo = CarrinhoService.da_sessao(request).precos()
+    return resumo.linhas, resumo.total
 
-    return carrinho_detalhado, total_carrinho, produtos_db, pacotes_db
 
-
-def _recuperar_cupom(request, total_base: Decimal):
+def _recuperar_cupom(request, linhas, total_base: Decimal):
     """
-    Recupera cupom da sessão e calcula desconto.
+    Recupera o cupom da sessão (regras compiladas, sem consulta) e calcula
+    o desconto sobre as linhas elegíveis.
     Retorna (cupom, valor_desconto, total_final).
     """
     cupom_id = request.session.get("cupom_id")
@@ -83,14 +60,10 @@ def _recuperar_cupom(request, total_base: Decimal):
     valor_desconto = Decimal("0.00")
 
     if cupom_id:
-        try:
-            cupom = Cupom.objects.get(id=cupom_id)
-            if cupom.esta_valido:
-                valor_desconto = cupom.calcular_desconto(total_base)
-            else:
-                del request.session["cupom_id"]
-                cupom = None
-        except Cupom.DoesNotExist:
+        cupom = cupons.por_id(cupom_id)
+        if cupom and cupom.valido():
+            valor_desconto = cupom.aplicar(linhas).total
+        else:
             request.session.pop("cupom_id", None)
             cupom = None
 
@@ -105,8 +78,7 @@ def _recuperar_cupom(request, total_base: Decimal):
 
 @login_required(login_url="/login/")
 def checkout_page(request):
-    carrinho_session = request.session.get("carrinho", {})
-    if not carrinho_session:
+    if not CarrinhoService.da_sessao(request):
         messages.warning(request, "Seu carrinho está vazio para iniciar o checkout.")
         return redirect("core:produtos")
 
@@ -116,9 +88,11 @@ def checkout_page(request):
         messages.error(request, "Você precisa completar seu perfil antes de comprar.")
         return redirect("core:perfil")
 
-    carrinho_detalhado, total_carrinho, _, _ = _montar_carrinho(request)
+    carrinho_detalhado, total_carrinho = _montar_carrinho(request)
 
-    cupom, valor_desconto, total_final = _recuperar_cupom(request, total_carrinho)
+    cupom, valor_desconto, total_final = _recuperar_cupom(
+        request, carrinho_detalhado, total_carrinho
+    )
 
     # <<< ADIÇÃO: pré-preenche também os campos "novos" do form >>>
     form = CheckoutForm(
@@ -143,6 +117,8 @@ def checkout_page(request):
         "valor_desconto": valor_desconto,
         "cupom": cupom,
         "usuario": perfil,  # usado pelo template para mostrar resumo de endereço
+        # Um clique duplo em "Finalizar" manda a mesma chave duas vezes.
+        "idempotency_key": uuid.uuid4().hex,
     }
     return render(request, "core/checkout.html", context)
 
@@ -153,6 +129,8 @@ def checkout_page(request):
 
 
 @login_required(login_url="/login/")
+@idempotente
+@venda_relampago.devolver_se_desfeito()
 @transaction.atomic
 def finalizar_pedido(request):
     """
@@ -161,8 +139,8 @@ def finalizar_pedido(request):
     if request.method != "POST":
         return redirect("core:checkout_page")
 
-    carrinho_session = request.session.get("carrinho", {})
-    if not carrinho_session:
+    carrinho = CarrinhoService.da_sessao(request)
+    if not carrinho:
         messages.error(request, "Seu carrinho está vazio.")
         return redirect("core:produtos")
 
@@ -172,59 +150,32 @@ def finalizar_pedido(request):
         messages.error(request, "Perfil de cliente não encontrado.")
         return redirect("core:perfil")
 
-    # Carrinho com travas de estoque
-    produto_ids = [
-        int(k.split("_")[1]) for k in carrinho_session if k.startswith("produto_")
-    ]
-    pacote_ids = [
-        int(k.split("_")[1]) for k in carrinho_session if k.startswith("pacote_")
-    ]
-
-    produtos_db = {
-        f"produto_{p.id}": p
-        for p in Produto.objects.select_for_update().filter(id__in=produto_ids)
-    }
-    pacotes_db = {
-        f"pacote_{p.id}": p
-        for p in PacoteSurpresa.objects.select_for_update().filter(id__in=pacote_ids)
-    }
-
-    total_pedido = Decimal("0.00")
-    pedidos_por_vendedor = {}
+    # Sem SELECT ... FOR UPDATE: a baixa condicional (estoque.debitar)
+    # é quem garante o estoque, na hora de gravar.
+    if carrinho.faltando():
+        messages.error(request, "Estoque insuficiente para 'item desconhecido'.")
+        return redirect("core:ver_carrinho")
 
-    for item_key, item_data in carrinho_session.items():
-        item_obj = produtos_db.get(item_key) or pacotes_db.get(item_key)
-        quantidade = item_data["quantidade"]
+    # Quem chegou aqui com as reservas válidas não disputa o estoque.
+    try:
+        carrinho.confirmar_reservas()
+    except EstoqueInsuficiente as erro:
+        messages.error(request, f"Estoque insuficiente para '{erro.objeto.nome}'.")
+        return redirect("core:ver_carrinho")
 
-        if not item_obj or quantidade > item_obj.quantidade_estoque:
+    for linha in carrinho.linhas():
+        if linha.quantidade > linha.objeto.quantidade_estoque:
             messages.error(
-                request,
-                f"Estoque insuficiente para "
-                f"'{item_obj.nome if item_obj else 'item desconhecido'}'.",
+                request, f"Estoque insuficiente para '{linha.nome}'."
             )
             return redirect("core:ver_carrinho")
 
-        subtotal = item_obj.preco * quantidade
-        total_pedido += subtotal
-
-        vendedor = item_obj.vendedor
-        if vendedor not in pedidos_por_vendedor:
-            pedidos_por_vendedor[vendedor] = {
-                "itens": [],
-                "subtotal": Decimal("0.00"),
-            }
-
-        pedidos_por_vendedor[vendedor]["itens"].append(
-            {
-                "item_obj": item_obj,
-                "quantidade": quantidade,
-                "preco_unitario": item_obj.preco,
-            }
-        )
-        pedidos_por_vendedor[vendedor]["subtotal"] += subtotal
+    total_pedido = carrinho.total()
 
     # Cupom
-    cupom, valor_desconto, total_final = _recuperar_cupom(request, total_pedido)
+    cupom, valor_desconto, total_final = _recuperar_cupom(
+        request, carrinho.linhas(), total_pedido
+    )
 
     form = CheckoutForm(request.POST)
     if form.is_valid():
@@ -242,13 +193,29 @@ def finalizar_pedido(request):
 
         forma_pagamento = form.cleaned_data["forma_pagamento"]
 
-        # 3. Cria o pedido com o endereço formatado
-        pedido_principal = Pedido.objects.create(
-            cliente=cliente_perfil,
-            valor_produtos=total_pedido,
+        # O uso do cupom é contado com UPDATE condicional: dois checkouts
+        # simultâneos não passam do limite.
+        if cupom and not cupons.resgatar(cupom.id):
+            request.session.pop("cupom_id", None)
+            messages.error(request, f"O cupom '{cupom.codigo}' esgotou.")
+            return redirect("core:checkout_page")
+
+        itens = [(linha.objeto, linha.quantidade) for linha in carrinho.linhas()]
+        try:
+            estoque.debitar(itens)
+        except EstoqueInsuficiente as erro:
+            # Devolve o uso do cupom contado acima.
+            transaction.set_rollback(True)
+            messages.error(request, f"Estoque insuficiente para '{erro.objeto.nome}'.")
+            return redirect("core:ver_carrinho")
+
+        # 3. Cria o pedido, os sub-pedidos e os itens (um INSERT por tabela)
+        pedido_principal = pedidos.gravar_pedido(
+            cliente_perfil,
+            itens,
             endereco_entrega=endereco_completo,
             forma_pagamento=forma_pagamento,
-            cupom_aplicado=cupom,
+            cupom_aplicado_id=cupom.id if cupom else None,
             valor_desconto=valor_desconto,
         )
 
@@ -261,36 +228,8 @@ def finalizar_pedido(request):
         cliente_perfil.save(update_fields=["endereco", "cep", "cidade", "estado"])
         # <<< FIM ADIÇÃO >>>
 
-        if cupom:
-            cupom.usar_cupom()
-
-        for vendedor, dados in pedidos_por_vendedor.items():
-            sub_pedido = PedidoVendedor.objects.create(
-                pedido_principal=pedido_principal,
-                vendedor=vendedor,
-                valor_subtotal=dados["subtotal"],
-            )
-            for item in dados["itens"]:
-                item_obj = item["item_obj"]
-
-                item_pedido_dados = {
-                    "sub_pedido": sub_pedido,
-                    "quantidade": item["quantidade"],
-                    "preco_unitario": item["preco_unitario"],
-                }
-                if isinstance(item_obj, Produto):
-                    item_pedido_dados["produto"] = item_obj
-                elif isinstance(item_obj, PacoteSurpresa):
-                    item_pedido_dados["pacote_surpresa"] = item_obj
-
-                ItemPedido.objects.create(**item_pedido_dados)
-
-                # Atualiza estoque
-                item_obj.quantidade_estoque -= item["quantidade"]
-                item_obj.save()
-
         # Limpa sessão
-        request.session.pop("carrinho", None)
+        carrinho.limpar()
         request.session.pop("cupom_id", None)
 
         messages.success(
@@ -299,13 +238,12 @@ def finalizar_pedido(request):
         )
         return redirect("core:meus_pedidos")
 
-    # Form inválido: re-renderiza checkout com erros
-    carrinho_detalhado, total_carrinho, _, _ = _montar_carrinho(request)
+    # Form inválido: re-renderiza checkout com erros (mesmo carrinho já carregado)
     perfil = cliente_perfil
 
     context = {
         "form": form,
-        "carrinho": carrinho_detalhado,
+        "carrinho": carrinho.linhas(),
         "total_carrinho": total_pedido,
         "total_final": total_final,
         "valor_desconto": valor_desconto,
@@ -321,96 +259,86 @@ def finalizar_pedido(request):
 
 
 @require_POST
+@idempotente
 def api_aplicar_cupom(request):
     """
     Endpoint da API para aplicar um cupom de desconto via AJAX.
+
+    Usa o resumo de preços do carrinho e as regras compiladas do cupom:
+    tentar vários códigos não recarrega produtos nem cupons do banco.
     """
     try:
-        data = json.loads(request.body)
-        codigo = data.get("codigo", "").strip()
-
-        carrinho_session = request.session.get("carrinho", {})
-        if not carrinho_session:
-            return JsonResponse(
-                {"success": False, "mensagem": "Seu carrinho está vazio."},
-                status=400,
-            )
-
-        produto_ids = [int(pid) for pid in carrinho_session.keys()]
-        produtos_map = {
-            str(p.id): p for p in Produto.objects.filter(id__in=produto_ids)
-        }
-        total_carrinho = sum(
-            produtos_map[pid].preco * item_data["quantidade"]
-            for pid, item_data in carrinho_session.items()
-            if pid in produtos_map
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse(
+            {"success": False, "mensagem": "Requisição inválida."}, status=400
         )
-        total_carrinho = Decimal(total_carrinho)
-
-        cupom = Cupom.objects.get(codigo__iexact=codigo)
-
-        if not cupom.esta_valido:
-            return JsonResponse(
-                {"success": False, "mensagem": "Este cupom não é mais válido."},
-                status=400,
-            )
-
-        valor_desconto = cupom.calcular_desconto(total_carrinho)
-
-        if valor_desconto <= 0:
-            msg = (
-                "O valor mínimo da compra para este cupom é de "
-                f"R$ {cupom.valor_minimo_compra:.2f}."
-            )
-            return JsonResponse({"success": False, "mensagem": msg}, status=400)
-
-        total_final = total_carrinho - valor_desconto
-        request.session["cupom_id"] = cupom.id
 
+    carrinho_detalhado, total_carrinho = _montar_carrinho(request)
+    if not carrinho_detalhado:
         return JsonResponse(
-            {
-                "success": True,
-                "mensagem": f"Cupom '{cupom.codigo}' aplicado!",
-                "cupom": {
-                    "codigo": cupom.codigo,
-                    "desconto": str(cupom),
-                },
-                "valores": {
-                    "valor_desconto_str": f"− R$ {valor_desconto:.2f}".replace(
-                        ".", ","
-                    ),
-                    "total_final_str": f"R$ {total_final:.2f}".replace(".", ","),
-                },
-            }
+            {"success": False, "mensagem": "Seu carrinho está vazio."},
+            status=400,
         )
 
-    except Cupom.DoesNotExist:
+    cupom = cupons.por_codigo(data.get("codigo"))
+    if cupom is None:
         request.session.pop("cupom_id", None)
         return JsonResponse(
             {"success": False, "mensagem": "Cupom inválido."}, status=404
         )
-    except Exception:
+
+    if not cupom.valido():
         return JsonResponse(
-            {"success": False, "mensagem": "Ocorreu um erro inesperado."}, status=500
+            {"success": False, "mensagem": "Este cupom não é mais válido."},
+            status=400,
         )
 
+    valor_desconto = cupom.aplicar(carrinho_detalhado).total
+
+    if valor_desconto <= 0:
+        if total_carrinho < cupom.valor_minimo_compra:
+            msg = (
+                "O valor mínimo da compra para este cupom é de "
+                f"R$ {cupom.valor_minimo_compra:.2f}."
+            )
+        else:
+            msg = "Nenhum item do carrinho é válido para este cupom."
+        return JsonResponse({"success": False, "mensagem": msg}, status=400)
+
+    total_final = total_carrinho - valor_desconto
+    request.session["cupom_id"] = cupom.id
+
+    return JsonResponse(
+        {
+            "success": True,
+            "mensagem": f"Cupom '{cupom.codigo}' aplicado!",
+            "cupom": {
+                "codigo": cupom.codigo,
+                "desconto": str(cupom),
+            },
+            "valores": {
+                "valor_desconto_str": f"− R$ {valor_desconto:.2f}".replace(
+                    ".", ","
+                ),
+                "total_final_str": f"R$ {total_final:.2f}".replace(".", ","),
+            },
+        }
+    )
+
 
 def aplicar_cupom(request):
     """
     Aplica cupom com recarregamento da página (fallback).
     """
     if request.method == "POST":
-        codigo = request.POST.get("codigo", "").strip()
-        try:
-            cupom = Cupom.objects.get(codigo__iexact=codigo)
-            if cupom.esta_valido:
-                request.session["cupom_id"] = cupom.id
-                messages.success(
-                    request, f"Cupom '{cupom.codigo}' aplicado com sucesso!"
-                )
-            else:
-                messages.error(request, "Cupom inválido ou expirado.")
-        except Cupom.DoesNotExist:
+        cupom = cupons.por_codigo(request.POST.get("codigo", ""))
+        if cupom and cupom.valido():
+            request.session["cupom_id"] = cupom.id
+            messages.success(
+                request, f"Cupom '{cupom.codigo}' aplicado com sucesso!"
+            )
+        else:
             request.session.pop("cupom_id", None)
             messages.error(request, "Cupom inválido ou expirado.")
     return redirect("core:checkout_page")
@@ -467,33 +395,69 @@ def meus_pedidos(request):
 @login_required
 def painel_pedidos_vendedor(request):
     """
-    Painel específico para vendedores verem seus pedidos.
+    Caixa de entrada do vendedor: sub-pedidos (produtos e pacotes) por
+    ``?status=`` (ver ``caixa_vendedor.filtros()``), paginados por cursor,
+    e o resumo dos últimos dias lido de ``VendaDiariaVendedor``.
     """
     vendedor = request.user.perfil
 
     if vendedor.tipo != Perfil.TipoUsuario.VENDEDOR:
         return redirect("core:perfil")
 
-    hoje = timezone.now().date()
+    filtro = request.GET.get("status", "abertos")
+    if filtro not in caixa_vendedor.filtros():
+        filtro = "todos"
 
-    pedidos_hoje = (
-        PedidoVendedor.objects.filter(
-            vendedor=vendedor, pedido_principal__data_criacao__date=hoje
-        )
-        .select_related("pedido_principal", "vendedor")
-        .prefetch_related("itens__produto", "itens__pacote_surpresa")
+    page_obj = paginar_keyset(
+        request,
+        caixa_vendedor.caixa_de_entrada(vendedor, filtro),
+        caixa_vendedor.POR_PAGINA,
     )
 
-    pedidos_anteriores = (
-        PedidoVendedor.objects.filter(vendedor=vendedor)
-        .exclude(pedido_principal__data_criacao__date=hoje)
-        .select_related("pedido_principal", "vendedor")
-        .prefetch_related("itens__produto", "itens__pacote_surpresa")
-    )
+    hoje = timezone.localdate()
+    vendas = vendas_diarias.resumo(vendedor, dias=7, hoje=hoje)
 
     context = {
-        "pedidos_hoje": pedidos_hoje,
-        "pedidos_anteriores": pedidos_anteriores,
+        "page_obj": page_obj,
+        "filtro": filtro,
+        "abas": caixa_vendedor.abas(vendedor),
+        "hoje": hoje,
+        "vendas_hoje": vendas[0],
+        "vendas_semana": vendas,
     }
 
-    return render(request, "core/painel_pedidos_vendedor.html", context)
\ No newline at end of file
+    return render(request, "core/painel_pedidos_vendedor.html", context)
+
+
+@login_required
+def exportar_pedidos_vendedor(request):
+    """
+    Sub-pedidos e itens do vendedor em ``?formato=csv|ndjson``, filtrados
+    por ``?status=`` (como no painel, padrão "todos") e pelo período
+    ``?desde=`` / ``?ate=`` (AAAA-MM-DD, inclusivo). A resposta é gerada
+    em streaming (ver ``core.services.exportacao``).
+    """
+    vendedor = request.user.perfil
+
+    if vendedor.tipo != Perfil.TipoUsuario.VENDEDOR:
+        return redirect("core:perfil")
+
+    try:
+        desde, ate = (
+            datetime.date.fromisoformat(request.GET[campo])
+            if request.GET.get(campo)
+            else None
+            for campo in ("desde", "ate")
+        )
+    except ValueError:
+        return HttpResponseBadRequest("Datas devem estar no formato AAAA-MM-DD.")
+
+    queryset = exportacao.filtrar(
+        PedidoVendedor.objects.filter(vendedor=vendedor),
+        desde=desde,
+        ate=ate,
+        status=caixa_vendedor.filtros().get(request.GET.get("status")),
+    )
+    return exportacao.resposta(
+        queryset, request.GET.get("formato", "csv"), nome=f"pedidos-{vendedor.pk}"
+    )
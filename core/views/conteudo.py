@@ -6,13 +6,31 @@ from django.shortcuts import get_object_or_404, redirect, render
 
 from core.forms import EtapaPreparoFormSet, IngredienteFormSet, ReceitaForm
 from core.models import Dica, Receita
+from core.services.avaliacoes import agregado_de
+from core.services.trigramas import ranquear_aproximado
 
 
 def receitas(request):
+    termo = request.GET.get("termo", "").strip()
     lista_receitas = Receita.objects.filter(disponivel=True).order_by("-data_criacao")
+    busca_aproximada = False
+    if termo:
+        encontradas = lista_receitas.filter(nome__icontains=termo)
+        if encontradas.exists():
+            lista_receitas = encontradas
+        else:
+            # Nada com o nome exato: tenta nomes parecidos (erros de digitação).
+            lista_receitas = ranquear_aproximado(lista_receitas, termo)
+            busca_aproximada = True
+
     paginator = Paginator(lista_receitas, 9)
     page_obj = paginator.get_page(request.GET.get("page"))
-    return render(request, "core/receitas.html", {"page_obj": page_obj})
+    context = {
+        "page_obj": page_obj,
+        "termo": termo,
+        "busca_aproximada": busca_aproximada,
+    }
+    return render(request, "core/receitas.html", context)
 
 
 def receita_detalhe(request, receita_id):
@@ -27,6 +45,7 @@ def receita_detalhe(request, receita_id):
         "receita": receita,
         "content_type_id": content_type.id,
         "avaliacoes": avaliacoes,  # 2. ADICIONE AO CONTEXTO
+        "agregado_avaliacoes": agregado_de(receita),
     }
     return render(request, "core/receita_detalhe.html", context)
 
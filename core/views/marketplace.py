@@ -3,13 +3,31 @@ from decimal import Decimal
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
-from django.core.paginator import Paginator
-from django.db.models import Count, Q
+from django.core.cache import cache
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from core.forms import ProdutoForm,CadastroPacoteSurpresa, PacoteSurpresaForm
 from core.models import CategoriaProduto, Perfil, Produto, PacoteSurpresa
+from core.pagination import paginar_keyset
+from core.services import facetas, recomendacoes, relacionados, visualizacoes
+from core.services.avaliacoes import agregado_de
+from core.services.vitrine import (
+    TIMEOUT_FRAGMENTO,
+    chave_fragmento,
+    paginar_vitrine,
+    parametros_fragmento,
+)
+
+# Chaves do keyset de cada ordenação permitida na vitrine (sempre com o id
+# no final para desempatar).
+ORDENACOES_KEYSET = {
+    "-data_criacao": ("-data_criacao", "-id"),
+    "preco": ("preco", "id"),
+    "-preco": ("-preco", "-id"),
+    "nome": ("nome", "id"),
+    "relevancia": ("-relevancia", "-id"),
+}
 
 def pacote(request):
     queryset = PacoteSurpresa.objects.all().filter(
@@ -30,40 +48,14 @@ def pacote(request):
     return render(request, "core/pacote.html",context={"form":form})
 
 
-def produtos(request):
-  
-    produtos = Produto.objects.select_related(
-        "vendedor", "categoria"
-    ).filter(
-        ativo=True,
-        quantidade_estoque__gt=0
-    )
-
-    pacotes = PacoteSurpresa.objects.filter(
-        ativo=True,
-        quantidade_estoque__gt=0
-    )
-
-    termo = request.GET.get("termo")
-    if termo:
-        produtos = produtos.filter(
-            Q(nome__icontains=termo)
-            | Q(descricao__icontains=termo)
-            | Q(categoria__nome__icontains=termo)
-            | Q(vendedor__nome_negocio__icontains=termo)
-        ).distinct()
-
-        pacotes = pacotes.filter(
-            Q(nome__icontains=termo)
-            | Q(descricao__icontains=termo)
-        ).distinct()
-
-   
+def _filtrar_vitrine(request, produtos, pacotes):
+    """Aplica os filtros de categoria e preço da barra lateral."""
     categoria_slug = request.GET.get("categoria")
     if categoria_slug:
         produtos = produtos.filter(categoria__slug=categoria_slug)
+        # Pacotes não têm categoria: com o filtro ativo, só entram produtos.
+        pacotes = pacotes.none()
 
-  
     preco_min = request.GET.get("preco_min")
     if preco_min:
         try:
@@ -81,45 +73,107 @@ def produtos(request):
             pacotes = pacotes.filter(preco__lte=preco_max)
         except:
             pass
-    ordenacao = request.GET.get("ordenacao", "-data_criacao")
+    filtros = {
+        "categoria": categoria_slug,
+        "preco_min": preco_min,
+        "preco_max": preco_max,
+    }
+    return produtos, pacotes, filtros
+
+
+def produtos(request):
+    termo = request.GET.get("termo", "").strip()
+    # Com termo de busca e sem ordenação explícita, mantém a relevância.
+    ordenacao = request.GET.get("ordenacao", "" if termo else "-data_criacao")
     ordenacoes_validas = ["-data_criacao", "preco", "-preco", "nome"]
-    if ordenacao in ordenacoes_validas:
-        produtos = produtos.order_by(ordenacao)
-        pacotes = pacotes.order_by(ordenacao)
+    if ordenacao not in ordenacoes_validas:
+        ordenacao = "relevancia" if termo else "-data_criacao"
+
+    ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+    if ajax:
+        # A mesma combinação de filtros se repete entre usuários: o HTML
+        # fica em cache até a próxima mudança no catálogo.
+        # O fragmento sai só dos filtros normalizados (os mesmos da
+        # chave), nunca do GET cru: os links de paginação guardados no
+        # cache não podem levar parâmetros de quem pediu primeiro.
+        request.GET = parametros_fragmento(request.GET, ordenacao)
+        termo = request.GET.get("termo", "")
+        chave_cache = chave_fragmento(request.GET, ordenacao)
+        html = cache.get(chave_cache)
+        if html is not None:
+            return JsonResponse({"html": html})
 
- 
-    paginator = Paginator(produtos, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    if termo:
+        # Busca pelo índice full-text: já vem ordenada por relevância.
+        produtos = Produto.objects.buscar(termo).select_related(
+            "vendedor", "categoria"
+        )
+        pacotes = PacoteSurpresa.objects.buscar(termo)
+    else:
+        produtos = Produto.objects.disponiveis().select_related(
+            "vendedor", "categoria"
+        )
+        pacotes = PacoteSurpresa.objects.disponiveis()
+
+    produtos, pacotes, filtros = _filtrar_vitrine(request, produtos, pacotes)
+    categoria_slug = filtros["categoria"]
+
+    busca_aproximada = False
+    if termo and not produtos.exists() and not pacotes.exists():
+        # Nenhum resultado exato: tenta nomes parecidos (erros de digitação).
+        # Decidido antes de paginar para que os cursores sigam a mesma busca.
+        produtos, pacotes, _ = _filtrar_vitrine(
+            request,
+            Produto.objects.buscar_aproximado(termo).select_related(
+                "vendedor", "categoria"
+            ),
+            PacoteSurpresa.objects.buscar_aproximado(termo),
+        )
+        busca_aproximada = True
+
+    # Produtos e pacotes intercalados num único feed paginado por cursor.
+    page_obj = paginar_vitrine(
+        request,
+        {"produto": produtos, "pacote": pacotes},
+        ORDENACOES_KEYSET[ordenacao][0],
+        12,
+    )
 
  
-    if request.headers.get("x-requested-with") == "XMLHttpRequest":
+    if ajax:
         html = render_to_string(
             "core/_lista_produtos.html",
             {
                 "page_obj": page_obj,
-                "pacotes": pacotes,
+                "busca_aproximada": busca_aproximada,
+                "termo_busca": termo,
                 "request": request,
             },
         )
+        cache.set(chave_cache, html, TIMEOUT_FRAGMENTO)
         return JsonResponse({"html": html})
 
    
-    categorias = CategoriaProduto.objects.annotate(
-        produtos_count=Count(
-            "produtos",
-            filter=Q(produtos__ativo=True, produtos__quantidade_estoque__gt=0),
+    # Contagens da barra lateral vêm da tabela de facetas (mantida pelos
+    # signals), em vez de um COUNT sobre todos os produtos a cada acesso.
+    contagens = facetas.contagens("produto", "categoria")
+    categorias = list(
+        CategoriaProduto.objects.filter(
+            pk__in=[int(valor) for valor in contagens if valor]
         )
-    ).filter(produtos_count__gt=0)
+    )
+    for categoria in categorias:
+        categoria.produtos_count = contagens[str(categoria.pk)]
 
     context = {
         "page_obj": page_obj,
-        "pacotes": pacotes,
         "categorias": categorias,
         "categoria_atual": categoria_slug,
+        "termo_busca": termo,
+        "busca_aproximada": busca_aproximada,
         "filtros": {
-            "preco_min": preco_min,
-            "preco_max": preco_max,
+            "preco_min": filtros["preco_min"],
+            "preco_max": filtros["preco_max"],
             "ordenacao": ordenacao,
         },
     }
@@ -134,31 +188,26 @@ def buscar_produtos(request):
 
     if not termo:
         return render(
-            request, "core/resultados_busca.html", {"resultados": [], "termo": termo}
+            request, "core/resultados_busca.html", {"page_obj": [], "termo": termo}
         )
 
-    resultados = (
-        Produto.objects.select_related("vendedor", "categoria")
-        .filter(
-            Q(nome__icontains=termo)
-            | Q(descricao__icontains=termo)
-            | Q(categoria__nome__icontains=termo)
-            | Q(vendedor__nome_negocio__icontains=termo),
-            ativo=True,
-            quantidade_estoque__gt=0,
-        )
-        .distinct()
-        .order_by("-data_criacao")
+    resultados = Produto.objects.buscar(termo)
+    busca_aproximada = not resultados.exists()
+    if busca_aproximada:
+        # Nenhum resultado exato: tenta nomes parecidos (erros de digitação).
+        resultados = Produto.objects.buscar_aproximado(termo)
+    page_obj = paginar_keyset(
+        request,
+        resultados.select_related("vendedor", "categoria"),
+        12,
+        ordenacao=ORDENACOES_KEYSET["relevancia"],
     )
 
-    paginator = Paginator(resultados, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-
     context = {
         "page_obj": page_obj,
         "termo": termo,
-        "total_resultados": paginator.count,
+        "total_resultados": page_obj.total,
+        "busca_aproximada": busca_aproximada,
     }
     return render(request, "core/resultados_busca.html", context)
 
@@ -170,10 +219,14 @@ def produto_detalhe(request, produto_id):
         id=produto_id,
         ativo=True,
     )
+    visualizacoes.registrar(produto.id)
 
-    produtos_relacionados = Produto.objects.filter(
-        categoria=produto.categoria, ativo=True, quantidade_estoque__gt=0
-    ).exclude(id=produto.id)[:4]
+    produtos_relacionados = relacionados.relacionados_de(produto)
+    if not produtos_relacionados:
+        # Produto novo, ainda sem linhas pré-calculadas.
+        produtos_relacionados = Produto.objects.disponiveis().filter(
+            categoria=produto.categoria
+        ).exclude(id=produto.id).order_by("-data_criacao")[:4]
 
     content_type = ContentType.objects.get_for_model(Produto)
 
@@ -181,8 +234,10 @@ def produto_detalhe(request, produto_id):
     context = {
         "produto": produto,
         "produtos_relacionados": produtos_relacionados,
+        "quem_comprou_tambem": recomendacoes.quem_comprou_tambem(produto),
         "content_type_id": content_type.id,
         "avaliacoes": avaliacoes,
+        "agregado_avaliacoes": agregado_de(produto),
     }
     return render(request, "core/produto_detalhe.html", context)
 
@@ -1,10 +1,10 @@
-from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.db.models import Prefetch, F
 from core.models import Perfil, Produto, Avaliacao, Pedido, PedidoVendedor, ItemPedido
 from core.forms import CompleteClientProfileForm, CompletePartnerProfileForm
+from core.services import caixa_vendedor
 
 @login_required
 def perfil_detail(request):
@@ -61,25 +61,7 @@ def perfil_detail(request):
             ativo=True
         )
 
-        produtos_ids = produtos_vendedor.values_list("id", flat=True)
-        pedidos_qs = (
-            Pedido.objects.filter(sub_pedidos__itens__produto_id__in=produtos_ids)
-            .distinct()
-            .prefetch_related(
-                Prefetch(
-                    "sub_pedidos",
-                    queryset=PedidoVendedor.objects.prefetch_related(
-                        Prefetch(
-                            "itens",
-                            queryset=ItemPedido.objects.filter(produto_id__in=produtos_ids).select_related("produto")
-                        )
-                    ).select_related("vendedor")
-                )
-            )
-            .select_related("cliente")
-            .order_by("-data_criacao")
-        )
-        ultimos_pedidos = pedidos_qs[:5]
+        ultimos_pedidos = caixa_vendedor.caixa_de_entrada(perfil)[:5]
 
     dashboard_data = {
         "baixo_estoque": baixo_estoque,
@@ -87,27 +69,10 @@ def perfil_detail(request):
     }
 
     avaliacoes_produtos = Avaliacao.objects.none()
-    total_avaliacoes = 0
-    media_avaliacoes = 0
 
     if perfil.tipo == 'VENDEDOR':
-        produtos = Produto.objects.filter(vendedor=perfil)
-        if produtos.exists():
-            produto_content_type = ContentType.objects.get_for_model(Produto)
-            avaliacoes_produtos = Avaliacao.objects.filter(
-                content_type=produto_content_type,
-                object_id__in=produtos.values_list('id', flat=True)
-            ).select_related('autor')
-
-            produtos_dict = {p.id: p for p in produtos}
-            for avaliacao in avaliacoes_produtos:
-                avaliacao.produto = produtos_dict.get(avaliacao.object_id)
-
-            total_avaliacoes = avaliacoes_produtos.count()
-            media_avaliacoes = (
-                sum(a.nota for a in avaliacoes_produtos) / total_avaliacoes
-                if total_avaliacoes > 0 else 0
-            )
+        # As mesmas avaliações que compõem perfil.avaliacao_media.
+        avaliacoes_produtos = Avaliacao.objects.do_vendedor(perfil)
 
     context = {
         "perfil": perfil,
@@ -115,8 +80,9 @@ def perfil_detail(request):
         "form": form,
         "user": request.user,
         "avaliacoes_produtos": avaliacoes_produtos,
-        "total_avaliacoes": total_avaliacoes,
-        "media_avaliacoes": media_avaliacoes,
+        # Mantidos pelos signals de Avaliacao (core.services.avaliacoes).
+        "total_avaliacoes": perfil.total_avaliacoes,
+        "media_avaliacoes": perfil.avaliacao_media,
     }
 
     return render(request, "core/perfil.html", context)
\ No newline at end of file
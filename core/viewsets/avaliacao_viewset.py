@@ -3,7 +3,7 @@ from core.models import Avaliacao
 from core.serializers import AvaliacaoSerializer
 
 class AvaliacaoViewSet(viewsets.ModelViewSet):
-    queryset = Avaliacao.objects.all().order_by('-data_criacao')
+    queryset = Avaliacao.objects.com_alvos().order_by('-data_criacao')
     serializer_class = AvaliacaoSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
@@ -1,28 +1,41 @@
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from core.models.carrinho import Carrinho, ItemCarrinho
+from core.idempotencia import idempotente
+from core.models.carrinho import Carrinho
 from core.models.produto import PacoteSurpresa, Produto
-from core.serializers.carrinho_serializer import CarrinhoSerializer
+from core.serializers.carrinho_serializer import (
+    CarrinhoSerializer,
+    OperacaoCarrinhoSerializer,
+)
+from core.services.carrinho import CarrinhoService, ItemInexistente
+from core.services.estoque import EstoqueInsuficiente
 
 
 class CarrinhoViewSet(viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = CarrinhoSerializer
+    # Limite de operações por chamada de lote.
+    maximo_operacoes = 100
 
     def get_queryset(self):
         return Carrinho.objects.filter(usuario=self.request.user.perfil)
 
+    def _resposta(self, servico, status_code=status.HTTP_200_OK):
+        serializer = self.get_serializer(servico.armazenamento.carrinho)
+        return Response(serializer.data, status=status_code)
+
     def list(self, request, *args, **kwargs):
-        carrinho, _ = Carrinho.objects.get_or_create(usuario=request.user.perfil)
-        serializer = self.get_serializer(carrinho)
-        return Response(serializer.data)
+        return self._resposta(CarrinhoService.do_usuario(request))
 
     @action(detail=False, methods=["post"])
+    @method_decorator(idempotente)
     def adicionar_item(self, request):
-        carrinho, _ = Carrinho.objects.get_or_create(usuario=request.user.perfil)
         produto_id = request.data.get("produto_id")
         pacote_id = request.data.get("pacote_id")
         quantidade = int(request.data.get("quantidade", 1))
@@ -33,47 +46,73 @@ class CarrinhoViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        item = None
-        item_obj = None
-
         if produto_id:
-            item_obj = Produto.objects.get(id=produto_id)
-            item, created = ItemCarrinho.objects.get_or_create(
-                carrinho=carrinho, produto=item_obj
-            )
-        elif pacote_id:
-            item_obj = PacoteSurpresa.objects.get(id=pacote_id)
-            item, created = ItemCarrinho.objects.get_or_create(
-                carrinho=carrinho, pacote=item_obj
-            )
-
-        if not created:
-            item.quantidade += quantidade
+            item_obj = get_object_or_404(Produto, id=produto_id)
         else:
-            item.quantidade = quantidade
+            item_obj = get_object_or_404(PacoteSurpresa, id=pacote_id)
 
-        if item.quantidade > item_obj.quantidade_estoque:
+        servico = CarrinhoService.do_usuario(request)
+        try:
+            servico.adicionar(item_obj, quantidade)
+        except EstoqueInsuficiente:
             return Response(
                 {"error": "Estoque insuficiente."}, status=status.HTTP_400_BAD_REQUEST
             )
+        return self._resposta(servico)
+
+    @action(detail=False, methods=["post"])
+    @method_decorator(idempotente)
+    @transaction.atomic
+    def lote(self, request):
+        """
+        Várias operações ``{produto_id|pacote_id, quantidade, op}`` numa
+        chamada (``op``: ``adicionar``, ``definir`` ou ``remover``). Vale
+        tudo ou nada; o carrinho volta uma vez, no fim.
+        """
+        serializer = OperacaoCarrinhoSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=self.maximo_operacoes,
+        )
+        serializer.is_valid(raise_exception=True)
+        operacoes = [
+            (
+                dados["op"],
+                "produto" if "produto_id" in dados else "pacote",
+                dados.get("produto_id") or dados.get("pacote_id"),
+                dados["quantidade"],
+            )
+            for dados in serializer.validated_data
+        ]
 
-        item.save()
-        serializer = self.get_serializer(carrinho)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        servico = CarrinhoService.do_usuario(request)
+        try:
+            servico.aplicar_lote(operacoes)
+        except ItemInexistente as erro:
+            return Response(
+                {"error": str(erro), "itens": erro.chaves},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except EstoqueInsuficiente as erro:
+            return Response(
+                {
+                    "error": f"Estoque insuficiente para '{erro.objeto.nome}'. "
+                    f"Disponível: {erro.disponivel}."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return self._resposta(servico)
 
     @action(detail=True, methods=["post"], url_path="remover-item")
     def remover_item(self, request, pk=None):
         # O pk aqui seria o ID do ItemCarrinho
-        try:
-            item = ItemCarrinho.objects.get(
-                id=pk, carrinho__usuario=request.user.perfil
-            )
-            item.delete()
-            carrinho = Carrinho.objects.get(usuario=request.user.perfil)
-            serializer = self.get_serializer(carrinho)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except ItemCarrinho.DoesNotExist:
+        servico = CarrinhoService.do_usuario(request)
+        item = servico.armazenamento.item_do_registro(pk)
+        if item is None:
             return Response(
                 {"error": "Item não encontrado no carrinho."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        servico.remover(*item)
+        return self._resposta(servico)
@@ -2,10 +2,19 @@ from rest_framework import permissions, viewsets
 
 from core.models.produto import PacoteSurpresa
 from core.serializers.pacote_surpresa_serializer import PacoteSurpresaSerializer
+from core.serializers.perfil_serializer import prefetch_perfil
 
 
 class PacoteSurpresaViewSet(viewsets.ModelViewSet):
-    queryset = PacoteSurpresa.objects.all().order_by("-data_criacao")
+    queryset = (
+        PacoteSurpresa.objects.select_related("vendedor")
+        .prefetch_related(
+            *prefetch_perfil("vendedor__"),
+            "produtos_possiveis__categoria",
+            *prefetch_perfil("produtos_possiveis__vendedor__"),
+        )
+        .order_by("-data_criacao")
+    )
     serializer_class = PacoteSurpresaSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
@@ -1,14 +1,19 @@
 from django.db import transaction
+from django.utils.decorators import method_decorator
 from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from core.models import ItemPedido, Pedido, PedidoVendedor
+from core.idempotencia import idempotente
+from core.models import Pedido
 from core.models.carrinho import Carrinho
 from core.serializers import (
     PedidoListSerializer,
     PedidoSerializer,
 )
+from core.services import estoque, pedidos, reservas, venda_relampago
+from core.services.carrinho import LinhaCarrinho
+from core.services.estoque import EstoqueInsuficiente
 
 
 class PedidoViewSet(viewsets.ModelViewSet):
@@ -24,6 +29,8 @@ class PedidoViewSet(viewsets.ModelViewSet):
             return PedidoListSerializer
         return PedidoSerializer
 
+    @method_decorator(idempotente)
+    @venda_relampago.devolver_se_desfeito()
     @transaction.atomic
     def create(self, request, *args, **kwargs):
         cliente_perfil = request.user.perfil
@@ -72,55 +79,62 @@ class PedidoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        linhas = [(item.produto or item.pacote, item.quantidade) for item in itens_carrinho]
+
         # ------------------------------------------------------------------
-        # AGRUPAMENTO por vendedor
+        # RESERVAS: como no checkout web, renova as reservas do carrinho e
+        # refaz as que venceram. Unidades seguradas por outros carrinhos
+        # não podem ser levadas por aqui.
         # ------------------------------------------------------------------
-        total_pedido = sum(item.subtotal for item in itens_carrinho)
-        pedidos_por_vendedor = {}
+        dono = reservas.dono_do_perfil(cliente_perfil)
+        try:
+            reservas.confirmar(
+                dono,
+                [
+                    LinhaCarrinho(objeto.tipo_item, objeto, quantidade)
+                    for objeto, quantidade in linhas
+                ],
+            )
+        except EstoqueInsuficiente as erro:
+            return self._estoque_insuficiente(erro)
 
-        for item in itens_carrinho:
-            item_obj = item.produto or item.pacote
-            vendedor = item_obj.vendedor
-            if vendedor not in pedidos_por_vendedor:
-                pedidos_por_vendedor[vendedor] = {"itens": [], "subtotal": 0}
-            pedidos_por_vendedor[vendedor]["itens"].append(item)
-            pedidos_por_vendedor[vendedor]["subtotal"] += item.subtotal
+        # ------------------------------------------------------------------
+        # BAIXA DE ESTOQUE: UPDATE condicional por item, sem travar antes.
+        # Se outro checkout levou o estoque entre a validação e aqui, nada
+        # foi gravado ainda e o cliente recebe o mesmo 400.
+        # ------------------------------------------------------------------
+        try:
+            estoque.debitar(linhas)
+        except EstoqueInsuficiente as erro:
+            return self._estoque_insuficiente(erro)
 
         # ------------------------------------------------------------------
-        # ESCRITA: Pedido principal
+        # ESCRITA: pedido, sub-pedidos e itens (um INSERT por tabela)
         # ------------------------------------------------------------------
-        pedido_principal = Pedido.objects.create(
-            cliente=cliente_perfil,
-            valor_produtos=total_pedido,
+        pedido_principal = pedidos.gravar_pedido(
+            cliente_perfil,
+            linhas,
             endereco_entrega=request.data.get(
                 "endereco_entrega", cliente_perfil.endereco
             ),
             forma_pagamento=request.data.get("forma_pagamento", "PIX"),
         )
 
-        # ------------------------------------------------------------------
-        # ESCRITA: Sub-pedidos, itens e debit de estoque
-        # ------------------------------------------------------------------
-        for vendedor, dados in pedidos_por_vendedor.items():
-            sub_pedido = PedidoVendedor.objects.create(
-                pedido_principal=pedido_principal,
-                vendedor=vendedor,
-                valor_subtotal=dados["subtotal"],
-            )
-            for item_carrinho in dados["itens"]:
-                item_obj = item_carrinho.produto or item_carrinho.pacote
-                ItemPedido.objects.create(
-                    sub_pedido=sub_pedido,
-                    produto=item_carrinho.produto,
-                    pacote_surpresa=item_carrinho.pacote,
-                    quantidade=item_carrinho.quantidade,
-                    preco_unitario=item_obj.preco,
-                )
-                item_obj.quantidade_estoque -= item_carrinho.quantidade
-                item_obj.save()
-
-        # Limpa o carrinho após checkout bem-sucedido
+        # Limpa o carrinho (e as reservas dele) após checkout bem-sucedido
         carrinho.itens.all().delete()
+        reservas.liberar(dono)
 
         serializer = PedidoSerializer(pedido_principal)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _estoque_insuficiente(self, erro):
+        return Response(
+            {
+                "error": "Pedido não pode ser finalizado.",
+                "detalhes": [
+                    f"Estoque insuficiente para '{erro.objeto.nome}': "
+                    f"disponível={erro.disponivel}."
+                ],
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
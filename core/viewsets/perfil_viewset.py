@@ -4,6 +4,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from core.models import Perfil
 from core.serializers import PerfilSerializer
+from core.serializers.perfil_serializer import prefetch_perfil
 
 class PerfilViewSet(viewsets.ModelViewSet):
     """
@@ -15,9 +16,10 @@ class PerfilViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        queryset = Perfil.objects.prefetch_related(*prefetch_perfil())
         if self.request.user.is_staff:
-            return Perfil.objects.all()
-        return Perfil.objects.filter(ativo=True)
+            return queryset
+        return queryset.filter(ativo=True)
 
     @action(detail=False, methods=['get', 'put', 'patch'], url_path='me')
     def me(self, request):
@@ -1,13 +1,19 @@
 from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
 from ..models import Produto
+from ..services.sugestoes import LIMITE_MAXIMO, LIMITE_PADRAO, sugerir
 from ..serializers import ProdutoListSerializer, ProdutoDetailSerializer
+from ..serializers.perfil_serializer import prefetch_perfil
 
 class ProdutoViewSet(viewsets.ModelViewSet):
     """
     ViewSet para visualizar e gerenciar Produtos.
     """
-    queryset = Produto.objects.disponiveis()
+    queryset = Produto.objects.disponiveis().select_related(
+        "vendedor", "categoria"
+    ).prefetch_related(*prefetch_perfil("vendedor__"))
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_serializer_class(self):
@@ -16,4 +22,20 @@ class ProdutoViewSet(viewsets.ModelViewSet):
         return ProdutoDetailSerializer
 
     def perform_create(self, serializer):
-        serializer.save(vendedor=self.request.user.perfil)
\ No newline at end of file
+        serializer.save(vendedor=self.request.user.perfil)
+
+    @action(detail=False, methods=["get"], permission_classes=[AllowAny])
+    def sugestoes(self, request):
+        """
+        Sugestões para a caixa de busca: ``?q=<prefixo>&limite=<n>``.
+        Responde do índice em memória, sem consultar o banco.
+        """
+        termo = request.query_params.get("q", "")
+        try:
+            limite = int(request.query_params.get("limite", LIMITE_PADRAO))
+        except ValueError:
+            limite = LIMITE_PADRAO
+        limite = max(1, min(limite, LIMITE_MAXIMO))
+        return Response(
+            {"q": termo, "resultados": sugerir(termo, limite)}
+        )